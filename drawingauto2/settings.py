@@ -86,6 +86,90 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Rendered site plan previews; LocMemCache evicts least recently used
+    # entries once MAX_ENTRIES is reached (1/CULL_FREQUENCY at a time).
+    'siteplans_renders': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'siteplans-renders',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 256,
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+SITEPLANS_RENDER_CACHE = 'siteplans_renders'
+SITEPLANS_RENDER_CACHE_TIMEOUT = 60 * 60 * 24
+SITEPLANS_RENDER_CACHE_MAX_BYTES = 8 * 1024 * 1024  # skip caching renders larger than this
+
+# Full renders larger than this many pixels fall back to tiles
+SITEPLANS_MAX_CANVAS_PIXELS = 16_000_000
+SITEPLANS_TILE_MAX_ZOOM = 8
+
+# Serve previews from async views (set when running under ASGI, e.g. uvicorn)
+SITEPLANS_ASYNC_VIEWS = False
+SITEPLANS_RENDER_THREADS = 4  # render pool size for async views
+SITEPLANS_RENDER_CONCURRENCY = 4  # renders in flight per event loop
+SITEPLANS_RENDER_QUEUE_TIMEOUT = 10.0  # seconds to wait for a render slot before answering 503
+
+# Background render jobs, processed by `manage.py renderworker`. New plans
+# are only queued for it when SITEPLANS_RENDER_JOBS is set; otherwise their
+# preview renders on request
+SITEPLANS_RENDER_JOBS = False
+SITEPLANS_RENDER_JOB_MAX_ATTEMPTS = 3
+SITEPLANS_RENDER_JOB_STALE_AFTER = 10 * 60  # seconds before a running job is presumed dead and requeued
+
+# Render profiling: each hook is called with every finished RenderProfile.
+# Turning it off also drops the Server-Timing header from preview responses.
+# Left unset it follows DEBUG; setting True in production exposes render timings
+SITEPLANS_PROFILING = DEBUG
+SITEPLANS_PROFILE_HOOKS = [
+    'siteplans.utils.profiling.log_profile',
+    'siteplans.utils.profiling.record_profile',
+    'siteplans.utils.profiling.dump_cprofile',
+]
+SITEPLANS_PROFILE_CPROFILE = False  # dump cProfile stats for every profiled request
+SITEPLANS_PROFILE_DIR = BASE_DIR / 'profiles'
+
+# Maximum number of boundary courses accepted for one site plan
+SITEPLANS_MAX_COURSES = 500
+
+# Site plan listing API (keyset paginated)
+SITEPLANS_LIST_PAGE_SIZE = 100
+SITEPLANS_LIST_MAX_PAGE_SIZE = 1000
+
+# Parcel spatial index, persisted here and loaded on first use (None keeps it in memory only)
+SITEPLANS_SPATIAL_INDEX_PATH = BASE_DIR / 'spatial_index.npz'
+SITEPLANS_SPATIAL_INDEX_SYNC_INTERVAL = 5.0  # seconds between checks for plans changed by other processes
+
+# Render resources, built once per process (see gunicorn.conf.py for per-worker zoning preload)
+SITEPLANS_PRELOAD_RENDER_RESOURCES = True
+SITEPLANS_FONT_PATH = None  # TrueType/OpenType font for the legend; None uses Pillow's built-in font
+SITEPLANS_LEGEND_FONT_SIZE = 20
+SITEPLANS_LABEL_FONT_SIZE = None  # None keeps Pillow's small bitmap font for vertex and easement labels
+
+# Raster canvas and encoder settings; see siteplans.utils.drawing.RenderOptions
+SITEPLANS_RENDER_OPTIONS = {
+    'compact': True,  # indexed six-color canvas: a third of the memory of RGB and smaller files
+    'simplify_tolerance': 0.5,  # pixels; Douglas-Peucker tolerance for boundary and easement lines
+    'declutter': True,  # skip vertex markers and labels that would overlap at the render scale
+    'marker_sprites': False,  # stamp markers from cached masks; pays off only without declutter
+    'png_compress_level': 6,
+    'png_optimize': False,
+    'webp_lossless': True,
+    'webp_quality': 80,
+    'webp_method': 4,
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
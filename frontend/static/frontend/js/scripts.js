@@ -1,2 +1,153 @@
 // frontend/static/frontend/js/scripts.js
-console.log("JavaScript is working!");
\ No newline at end of file
+
+// Live site plan preview for the drawing board: the server returns the
+// geometry of the typed courses as JSON (siteplans:drawing_board_geometry)
+// and the plan is drawn here on a canvas, so typing never waits on a
+// server-side render.
+
+const PREVIEW_DEBOUNCE_MS = 300;
+const PREVIEW_MARGIN = 40; // pixels around the plan
+const COURSE_FIELD = /^(D|AD|AM|AS|DO|L)\d+$/;
+
+function debounce(func, wait) {
+    let timer = null;
+    return (...args) => {
+        clearTimeout(timer);
+        timer = setTimeout(() => func(...args), wait);
+    };
+}
+
+// Query string of the city and every course field, in form order
+function previewQuery(form) {
+    const params = new URLSearchParams();
+    for (const [name, value] of new FormData(form)) {
+        if (name === 'city' || COURSE_FIELD.test(name)) {
+            params.append(name, value.trim());
+        }
+    }
+    return params.toString();
+}
+
+// Draws a flat [x0, y0, x1, y1, ...] array in feet as one path
+function tracePath(ctx, packed, toCanvas, close) {
+    ctx.beginPath();
+    for (let i = 0; i < packed.length; i += 2) {
+        const [x, y] = toCanvas(packed[i], packed[i + 1]);
+        if (i === 0) {
+            ctx.moveTo(x, y);
+        } else {
+            ctx.lineTo(x, y);
+        }
+    }
+    if (close) {
+        ctx.closePath();
+    }
+}
+
+function drawSitePlan(canvas, geometry) {
+    const ctx = canvas.getContext('2d');
+    ctx.clearRect(0, 0, canvas.width, canvas.height);
+
+    // Fit the boundary bbox into the canvas; y points north in the geometry
+    const [minX, minY, maxX, maxY] = geometry.bbox;
+    const scale = Math.min(
+        (canvas.width - 2 * PREVIEW_MARGIN) / Math.max(maxX - minX, 1e-6),
+        (canvas.height - 2 * PREVIEW_MARGIN) / Math.max(maxY - minY, 1e-6),
+    );
+    const toCanvas = (x, y) => [PREVIEW_MARGIN + (x - minX) * scale, PREVIEW_MARGIN + (maxY - y) * scale];
+
+    ctx.font = '11px sans-serif';
+    ctx.textBaseline = 'top';
+
+    const boundary = geometry.styles.boundary;
+    ctx.strokeStyle = boundary.color;
+    ctx.lineWidth = 3;
+    ctx.setLineDash(boundary.dash);
+    tracePath(ctx, geometry.points, toCanvas, false);
+    ctx.stroke();
+
+    for (const easement of geometry.easements) {
+        const style = geometry.styles.easements[easement.kind];
+        ctx.strokeStyle = style.color;
+        ctx.lineWidth = 2;
+        ctx.setLineDash(style.dash);
+        for (const ring of easement.rings) {
+            tracePath(ctx, ring, toCanvas, true);
+            ctx.stroke();
+        }
+        if (easement.label_point) {
+            const [x, y] = toCanvas(...easement.label_point);
+            ctx.fillStyle = 'black';
+            ctx.fillText(easement.label, x + 10, y - 10);
+        }
+    }
+
+    ctx.setLineDash([]);
+    ctx.lineWidth = 1;
+    for (let i = 0; i < geometry.points.length; i += 2) {
+        const [x, y] = toCanvas(geometry.points[i], geometry.points[i + 1]);
+        ctx.beginPath();
+        ctx.arc(x, y, 4, 0, 2 * Math.PI);
+        ctx.fillStyle = 'red';
+        ctx.fill();
+        ctx.strokeStyle = 'black';
+        ctx.stroke();
+        ctx.fillStyle = 'blue';
+        ctx.fillText(`P${i / 2}`, x + 8, y - 8);
+    }
+}
+
+function initLivePreview(canvas) {
+    const form = canvas.closest('form');
+    const status = document.getElementById('livePreviewStatus');
+    const url = canvas.dataset.geometryUrl;
+    let lastQuery = null;
+    let controller = null;
+
+    const setStatus = (text) => {
+        if (status) {
+            status.textContent = text;
+        }
+    };
+
+    const refresh = async () => {
+        const query = previewQuery(form);
+        if (query === lastQuery) {
+            return;
+        }
+        lastQuery = query;
+        // Only the latest courses matter; drop a request still in flight
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        try {
+            // The browser revalidates with the ETag and reuses its copy on 304
+            const response = await fetch(`${url}?${query}`, { signal: controller.signal, cache: 'no-cache' });
+            const payload = await response.json();
+            if (!response.ok) {
+                const errors = Object.values(payload.errors || {}).flat();
+                setStatus(errors.join(' ') || 'The plan cannot be drawn yet.');
+                return;
+            }
+            drawSitePlan(canvas, payload);
+            setStatus(`${payload.points.length / 2 - 1} courses`);
+        } catch (error) {
+            if (error.name !== 'AbortError') {
+                setStatus('The preview could not be loaded.');
+            }
+        }
+    };
+
+    const scheduleRefresh = debounce(refresh, PREVIEW_DEBOUNCE_MS);
+    form.addEventListener('input', scheduleRefresh);
+    form.addEventListener('change', scheduleRefresh);
+    scheduleRefresh();
+}
+
+document.addEventListener('DOMContentLoaded', () => {
+    const canvas = document.getElementById('livePreview');
+    if (canvas && canvas.dataset.geometryUrl) {
+        initLivePreview(canvas);
+    }
+});
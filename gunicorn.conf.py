@@ -0,0 +1,14 @@
+# gunicorn.conf.py
+#
+# Read by gunicorn from the working directory: gunicorn drawingauto2.wsgi
+
+def post_worker_init(worker):
+    # Runs in every worker once the Django application is loaded, so fonts
+    # and the legend tile (built in AppConfig.ready) are ready and the zoning
+    # of every city can be loaded and compiled before the first request
+    from django.db import connections
+    from siteplans.utils.resources import preload_render_resources
+
+    preload_render_resources(include_zoning=True)
+    # Requests open their own connections
+    connections.close_all()
@@ -1,2 +1,21 @@
 # siteplans/admin.py
 
+from django.contrib import admin
+from .models import City, RenderJob, ZoningRule
+
+class ZoningRuleInline(admin.TabularInline):
+    model = ZoningRule
+    extra = 0
+
+@admin.register(City)
+class CityAdmin(admin.ModelAdmin):
+    list_display = ('name', 'state', 'country')
+    search_fields = ('name',)
+    inlines = [ZoningRuleInline]
+
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'site_plan', 'status', 'attempts', 'worker', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    exclude = ('png', 'webp')
+    readonly_fields = ('site_plan_updated_at', 'render_key', 'started_at', 'finished_at')
@@ -1,6 +1,19 @@
+# siteplans/apps.py
+
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class SiteplansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'siteplans'
+
+    def ready(self):
+        # Register render cache invalidation receivers
+        from . import signals
+
+        # Build fonts and the legend tile once per process, before the first
+        # render; with gunicorn's preload_app the workers inherit them
+        if getattr(settings, 'SITEPLANS_PRELOAD_RENDER_RESOURCES', True):
+            from .utils.resources import preload_render_resources
+            preload_render_resources()
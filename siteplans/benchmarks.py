@@ -0,0 +1,318 @@
+# siteplans/benchmarks.py
+
+import json
+import logging
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, replace
+from typing import Optional
+from django.core.cache import caches
+from django.conf import settings
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image, ImageDraw
+from .models import City, SitePlan, BoundaryPoint
+from .utils.drawing import (
+    RenderOptions, apply_zoning_rules, draw_dashed_line, encode_image, generate_site_plan_image, place_easements,
+    quadrant_to_azimuth, render_site_plan,
+)
+from .utils.traverse import azimuth_to_bearing, traverse_from_boundary_points
+from .utils.zoning import ALL_CITY_ZONINGS
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [4, 50, 500, 5000]  # courses per synthetic parcel
+DEFAULT_REPEAT = 3
+DEFAULT_THRESHOLD = 0.25  # allowed relative slowdown or memory growth before a case counts as regressed
+PARCEL_RADIUS = 300.0  # feet; synthetic parcels are jittered regular polygons of this size
+
+# Encoder settings compared by the encoding cases: (label, image format, RenderOptions fields)
+ENCODER_CASES = [
+    ('png-fast', 'PNG', {'png_compress_level': 1}),
+    ('png', 'PNG', {}),
+    ('png-optimize', 'PNG', {'png_optimize': True}),
+    ('webp-lossless', 'WEBP', {}),
+    ('webp-lossy', 'WEBP', {'webp_lossless': False}),
+]
+
+# Absolute differences below these are treated as noise
+MIN_WALL_MS_DELTA = 1.0
+MIN_PEAK_KB_DELTA = 64.0
+MIN_SIZE_KB_DELTA = 1.0
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    wall_ms: float  # median wall time of the timed runs
+    peak_kb: float  # peak traced Python/numpy allocation of one run
+    queries: int  # database queries of one run
+    size_kb: Optional[float] = None  # encoded output, or canvas memory for rasterize cases
+
+def synthetic_boundary_points(courses, seed=0):
+    """
+    Returns unsaved BoundaryPoint instances for a closed, jittered regular polygon.
+
+    The same (courses, seed) always yields the same parcel.
+    """
+    rng = random.Random(seed * 100003 + courses)
+    perimeter = 2 * math.pi * PARCEL_RADIUS
+    boundary_points = []
+    for i in range(courses):
+        azimuth = 360 * i / courses + rng.uniform(-0.1, 0.1) * 360 / courses
+        direction1, degrees, minutes, seconds, direction2 = azimuth_to_bearing(azimuth)
+        boundary_points.append(BoundaryPoint(
+            direction1=direction1,
+            angle_degrees=degrees,
+            angle_minutes=minutes,
+            angle_seconds=seconds,
+            direction2=direction2,
+            length=round(perimeter / courses * rng.uniform(0.95, 1.05), 2),
+        ))
+    return boundary_points
+
+def measure(name, func, repeat=DEFAULT_REPEAT, setup=None):
+    """
+    Benchmarks func after one warm-up call.
+
+    Wall time is the median of `repeat` calls; peak memory and query count come
+    from one extra call under tracemalloc, so tracing does not skew the timing.
+
+    Parameters:
+    - name: Case name
+    - func: Callable taking no arguments
+    - repeat: Number of timed calls
+    - setup: Optional callable run untimed before every call (e.g. clearing caches)
+
+    Returns:
+    - BenchmarkResult
+    """
+    def call():
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        func()
+        return time.perf_counter() - started
+
+    call()
+    timings = [call() for _ in range(max(1, repeat))]
+
+    if setup is not None:
+        setup()
+    with CaptureQueriesContext(connection) as queries:
+        tracemalloc.start()
+        try:
+            func()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    return BenchmarkResult(
+        name=name,
+        wall_ms=round(statistics.median(timings) * 1000, 3),
+        peak_kb=round(peak / 1024, 1),
+        queries=len(queries),
+    )
+
+def _benchmark_primitives(courses, boundary_points, repeat):
+    results = []
+
+    def azimuths():
+        for bp in boundary_points:
+            quadrant_to_azimuth(bp.direction1, bp.direction2, bp.angle_degrees, bp.angle_minutes, bp.angle_seconds)
+
+    results.append(measure(f"quadrant_to_azimuth[{courses}]", azimuths, repeat))
+
+    # One 500 ft line per course at 3.2 px/ft, cycling through the dash styles
+    canvas = Image.new('RGB', (1800, 1800), color='white')
+    draw = ImageDraw.Draw(canvas)
+    styles = ['dotted', 'dashed', 'dashdot']
+
+    def dashed_lines():
+        for idx in range(courses):
+            angle = 2 * math.pi * idx / courses
+            start = (900, 900)
+            end = (900 + 800 * math.cos(angle), 900 + 800 * math.sin(angle))
+            draw_dashed_line(draw, start, end, fill='blue', width=2, dash_type=styles[idx % len(styles)])
+
+    results.append(measure(f"draw_dashed_line[{courses}]", dashed_lines, repeat))
+    return results
+
+def _benchmark_encoding(city_name, courses, boundary_points, repeat):
+    """
+    Measures the RGB and compact canvases, and every ENCODER_CASES entry on
+    each, reporting time alongside canvas memory or encoded size.
+    """
+    results = []
+    site_plan = SitePlan(city=City(name=city_name), site_name=f"Benchmark {courses}", address="1 Benchmark Way")
+    for mode, compact in (('rgb', False), ('compact', True)):
+        options = RenderOptions(compact=compact)
+
+        def rasterize():
+            return render_site_plan(site_plan, boundary_points, ALL_CITY_ZONINGS, options=options)
+
+        img = rasterize()
+        canvas_kb = round(img.width * img.height * len(img.getbands()) / 1024, 1)
+        result = measure(f"rasterize[{mode}-{city_name}-{courses}]", rasterize, repeat)
+        results.append(replace(result, size_kb=canvas_kb))
+
+        for label, image_format, fields in ENCODER_CASES:
+            encoder_options = replace(options, **fields)
+            size_kb = round(len(encode_image(img, image_format, encoder_options)) / 1024, 1)
+            result = measure(
+                f"encode[{mode}-{label}-{city_name}-{courses}]",
+                lambda: encode_image(img, image_format, encoder_options),
+                repeat,
+            )
+            results.append(replace(result, size_kb=size_kb))
+    return results
+
+def _benchmark_city(city_name, courses, boundary_points, repeat, client):
+    results = []
+    city_zoning = ALL_CITY_ZONINGS[city_name]
+    site_plan = SitePlan(city=City(name=city_name), site_name=f"Benchmark {courses}", address="1 Benchmark Way")
+
+    points = traverse_from_boundary_points(boundary_points).points
+    results.append(measure(
+        f"place_easements[{city_name}-{courses}]",
+        lambda: place_easements(points, apply_zoning_rules(city_zoning)),
+        repeat,
+    ))
+    results.append(measure(
+        f"generate_site_plan_image[{city_name}-{courses}]",
+        lambda: generate_site_plan_image(site_plan, boundary_points, ALL_CITY_ZONINGS),
+        repeat,
+    ))
+
+    # End to end through the views, against saved rows
+    city = City.objects.filter(name__iexact=city_name).first() or City.objects.create(name=city_name)
+    saved_plan = SitePlan.objects.create(city=city, site_name=f"Benchmark {courses}", address="1 Benchmark Way")
+    saved_points = synthetic_boundary_points(courses)
+    for bp in saved_points:
+        bp.site_plan = saved_plan
+    BoundaryPoint.objects.bulk_create(saved_points)
+
+    render_cache = caches[getattr(settings, 'SITEPLANS_RENDER_CACHE', 'default')]
+    preview_url = reverse('siteplans:drawing_preview', kwargs={'site_plan_id': saved_plan.pk})
+    image_url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': saved_plan.pk, 'image_format': 'png'})
+
+    def get(url):
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    results.append(measure(f"drawing_preview[{city_name}-{courses}]", lambda: get(preview_url), repeat))
+    results.append(measure(
+        f"drawing_preview_image[{city_name}-{courses}]", lambda: get(image_url), repeat, setup=render_cache.clear,
+    ))
+    return results
+
+def run_benchmarks(sizes=None, cities=None, repeat=DEFAULT_REPEAT, progress=None):
+    """
+    Runs the benchmark suite over synthetic parcels.
+
+    Rows created for the view benchmarks are rolled back afterwards.
+
+    Parameters:
+    - sizes: Courses per parcel (defaults to DEFAULT_SIZES)
+    - cities: City names from ALL_CITY_ZONINGS (defaults to all of them)
+    - repeat: Timed calls per case
+    - progress: Optional callable receiving each BenchmarkResult as it completes
+
+    Returns:
+    - List of BenchmarkResult
+    """
+    sizes = sizes or DEFAULT_SIZES
+    cities = cities or list(ALL_CITY_ZONINGS)
+    client = Client(SERVER_NAME=settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else 'testserver')
+    results = []
+
+    def collect(batch):
+        for result in batch:
+            results.append(result)
+            if progress is not None:
+                progress(result)
+
+    # Per-course warnings (e.g. directions without a zoning rule) would swamp the timings
+    logging.disable(logging.WARNING)
+    try:
+        with transaction.atomic():
+            for courses in sizes:
+                boundary_points = synthetic_boundary_points(courses)
+                collect(_benchmark_primitives(courses, boundary_points, repeat))
+                for city_name in cities:
+                    collect(_benchmark_city(city_name, courses, boundary_points, repeat, client))
+                # Canvas and encoder costs barely depend on the zoning; one city is enough
+                collect(_benchmark_encoding(cities[0], courses, boundary_points, repeat))
+            transaction.set_rollback(True)
+    finally:
+        logging.disable(logging.NOTSET)
+    return results
+
+def results_to_baseline(results):
+    """
+    Returns a JSON-serializable baseline document for the results.
+    """
+    import django
+    import numpy
+    import PIL
+
+    return {
+        'created': timezone.now().isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'django': django.get_version(),
+            'numpy': numpy.__version__,
+            'pillow': PIL.__version__,
+        },
+        'results': {result.name: asdict(result) for result in results},
+    }
+
+def load_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump(results_to_baseline(results), f, indent=2, sort_keys=True)
+
+def compare_to_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares results with a baseline document.
+
+    A case regresses when its wall time, peak memory or output size grows by
+    more than `threshold` (and past the noise floor), or when it issues more
+    queries.
+    Cases missing from the baseline are ignored.
+
+    Returns:
+    - List of regression messages; empty if nothing regressed
+    """
+    regressions = []
+    baseline_results = baseline.get('results', {})
+    for result in results:
+        previous = baseline_results.get(result.name)
+        if previous is None:
+            continue
+        if (result.wall_ms > previous['wall_ms'] * (1 + threshold)
+                and result.wall_ms - previous['wall_ms'] > MIN_WALL_MS_DELTA):
+            regressions.append(f"{result.name}: wall time {previous['wall_ms']:.3f}ms -> {result.wall_ms:.3f}ms")
+        if (result.peak_kb > previous['peak_kb'] * (1 + threshold)
+                and result.peak_kb - previous['peak_kb'] > MIN_PEAK_KB_DELTA):
+            regressions.append(f"{result.name}: peak memory {previous['peak_kb']:.1f}KB -> {result.peak_kb:.1f}KB")
+        previous_size = previous.get('size_kb')
+        if (result.size_kb is not None and previous_size is not None
+                and result.size_kb > previous_size * (1 + threshold)
+                and result.size_kb - previous_size > MIN_SIZE_KB_DELTA):
+            regressions.append(f"{result.name}: size {previous_size:.1f}KB -> {result.size_kb:.1f}KB")
+        if result.queries > previous['queries']:
+            regressions.append(f"{result.name}: queries {previous['queries']} -> {result.queries}")
+    return regressions
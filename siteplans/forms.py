@@ -1,5 +1,5 @@
 from django import forms
-from .models import SitePlan
+from .models import City, SitePlan
 
 class SitePlanForm(forms.ModelForm):
     class Meta:
@@ -16,4 +16,69 @@ class SitePlanForm(forms.ModelForm):
                 'placeholder': 'Enter address',
                 'required': 'required'
             }),
+            'city': forms.Select(attrs={'class': 'form-select'}),
         }
+
+class SurveyImportForm(forms.Form):
+    FORMAT_CHOICES = [
+        ('', 'Detect from file name'),
+        ('csv', 'CSV'),
+        ('landxml', 'LandXML'),
+    ]
+
+    file = forms.FileField()
+    file_format = forms.ChoiceField(choices=FORMAT_CHOICES, required=False)
+    city = forms.ModelChoiceField(queryset=City.objects.all(), required=False)
+
+class GeometryPreviewForm(forms.Form):
+    # The courses themselves use the drawing board's D/AD/AM/AS/DO/L fields
+    city = forms.ModelChoiceField(queryset=City.objects.all())
+
+class SitePlanListForm(forms.Form):
+    ORDERING_CHOICES = [
+        ('id', 'Creation order'),
+        ('updated_at', 'Last update'),
+    ]
+
+    city = forms.CharField(required=False)  # City id or name
+    address = forms.CharField(required=False)  # Address prefix (see filter_site_plans)
+    updated_after = forms.DateTimeField(required=False)
+    updated_before = forms.DateTimeField(required=False)
+    ordering = forms.ChoiceField(choices=ORDERING_CHOICES, required=False)
+    limit = forms.IntegerField(required=False, min_value=1)
+    cursor = forms.CharField(required=False)
+
+class SpatialQueryForm(forms.Form):
+    # Survey grid coordinates in feet, comma-separated
+    bbox = forms.CharField(required=False)  # min_x,min_y,max_x,max_y
+    point = forms.CharField(required=False)  # x,y
+    limit = forms.IntegerField(required=False, min_value=1)
+
+    def _parse_numbers(self, name, count):
+        value = self.cleaned_data[name]
+        if not value:
+            return None
+        try:
+            numbers = [float(part) for part in value.split(',')]
+        except ValueError:
+            raise forms.ValidationError("Enter comma-separated numbers.")
+        if len(numbers) != count:
+            raise forms.ValidationError(f"Enter exactly {count} comma-separated numbers.")
+        return numbers
+
+    def clean_bbox(self):
+        bbox = self._parse_numbers('bbox', 4)
+        if bbox and (bbox[0] > bbox[2] or bbox[1] > bbox[3]):
+            raise forms.ValidationError("The minimum corner must come before the maximum corner.")
+        return bbox
+
+    def clean_point(self):
+        return self._parse_numbers('point', 2)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if self.errors:
+            return cleaned_data
+        if (cleaned_data.get('bbox') is None) == (cleaned_data.get('point') is None):
+            raise forms.ValidationError("Give either bbox or point.")
+        return cleaned_data
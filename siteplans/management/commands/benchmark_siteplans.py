@@ -0,0 +1,56 @@
+# siteplans/management/commands/benchmark_siteplans.py
+
+import os
+from pathlib import Path
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from siteplans.benchmarks import (
+    DEFAULT_REPEAT, DEFAULT_SIZES, DEFAULT_THRESHOLD, compare_to_baseline, load_baseline, run_benchmarks, save_baseline,
+)
+from siteplans.utils.zoning import ALL_CITY_ZONINGS
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'siteplans_baseline.json'
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the site plan drawing and zoning hot paths on synthetic parcels and "
+        "compares wall time, peak memory, query counts and output sizes with a JSON baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Courses per synthetic parcel.")
+        parser.add_argument('--cities', nargs='+', choices=sorted(ALL_CITY_ZONINGS), help="Cities to benchmark (default: all).")
+        parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help="Timed runs per case.")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE), help="Baseline JSON file.")
+        parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                            help="Allowed relative regression, e.g. 0.25 for 25%%.")
+        parser.add_argument('--save-baseline', action='store_true', help="Write the results as the new baseline.")
+
+    def handle(self, *args, **options):
+        def report(result):
+            size = f" {result.size_kb:>10.1f} KB out" if result.size_kb is not None else ""
+            self.stdout.write(
+                f"{result.name:<48} {result.wall_ms:>10.3f} ms {result.peak_kb:>10.1f} KB {result.queries:>4} queries{size}"
+            )
+
+        results = run_benchmarks(options['sizes'], options['cities'], options['repeat'], progress=report)
+        baseline_path = options['baseline']
+
+        if options['save_baseline']:
+            os.makedirs(os.path.dirname(baseline_path) or '.', exist_ok=True)
+            save_baseline(baseline_path, results)
+            self.stdout.write(self.style.SUCCESS(f"Saved baseline for {len(results)} case(s) to {baseline_path}."))
+            return
+
+        if not os.path.exists(baseline_path):
+            self.stdout.write(self.style.WARNING(
+                f"No baseline at {baseline_path}; run with --save-baseline to record one."
+            ))
+            return
+
+        regressions = compare_to_baseline(results, load_baseline(baseline_path), options['threshold'])
+        if regressions:
+            for message in regressions:
+                self.stderr.write(self.style.ERROR(message))
+            raise CommandError(f"{len(regressions)} benchmark regression(s) past {options['threshold']:.0%}.")
+        self.stdout.write(self.style.SUCCESS(f"No regressions past {options['threshold']:.0%} against {baseline_path}."))
@@ -0,0 +1,21 @@
+# siteplans/management/commands/build_spatial_index.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+from siteplans.utils.spatial import get_index_path, save_parcel_index
+
+class Command(BaseCommand):
+    help = "Rebuilds the parcel spatial index from stored plan geometry and writes it to disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help="Output file; defaults to SITEPLANS_SPATIAL_INDEX_PATH.")
+
+    def handle(self, *args, **options):
+        path = options['path'] or get_index_path()
+        if not path:
+            raise CommandError("No output path: pass --path or set SITEPLANS_SPATIAL_INDEX_PATH.")
+        started = time.perf_counter()
+        index = save_parcel_index(path)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(index)} parcel(s) into {path} in {time.perf_counter() - started:.3f}s."
+        ))
@@ -0,0 +1,45 @@
+# siteplans/management/commands/import_survey.py
+
+from django.core.management.base import BaseCommand, CommandError
+from siteplans.models import City
+from siteplans.utils.importers import detect_format, import_survey
+
+class Command(BaseCommand):
+    help = "Imports site plans from a CSV or LandXML survey file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Survey file to import.")
+        parser.add_argument('--format', dest='file_format', choices=['csv', 'landxml'], help="File format (detected from the extension by default).")
+        parser.add_argument('--city', help="City for parcels without one (required for LandXML).")
+        parser.add_argument('--chunk-size', type=int, help="Boundary points per bulk insert.")
+
+    def handle(self, *args, **options):
+        file_format = options['file_format'] or detect_format(options['path'])
+        if not file_format:
+            raise CommandError("Could not detect the file format; pass --format.")
+
+        city = None
+        if options['city']:
+            city = City.objects.filter(name__iexact=options['city']).first()
+            if city is None:
+                raise CommandError(f"Unknown city: {options['city']}")
+
+        try:
+            with open(options['path'], 'rb') as stream:
+                result = import_survey(stream, file_format, default_city=city, chunk_size=options['chunk_size'])
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        for location, message in result.errors:
+            self.stderr.write(self.style.WARNING(f"{location}: {message}"))
+        if result.error_count > len(result.errors):
+            self.stderr.write(self.style.WARNING(f"... and {result.error_count - len(result.errors)} more error(s)"))
+        summary = (
+            f"Imported {result.site_plans} site plan(s) with {result.boundary_points} boundary point(s); "
+            f"{result.error_count} error(s)."
+        )
+        if not result.complete:
+            raise CommandError(
+                f"Import stopped early. {summary} Parcels through {result.committed_through or 'the start'} were saved."
+            )
+        self.stdout.write(self.style.SUCCESS(summary))
@@ -0,0 +1,149 @@
+# siteplans/management/commands/render_siteplans.py
+
+import os
+import time
+from dataclasses import replace
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, time as dt_time
+from pathlib import Path
+import django
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from siteplans.models import SitePlan
+from siteplans.utils.drawing import encode_image, get_render_options, render_site_plan
+from siteplans.utils.dxf import generate_site_plan_dxf
+
+FORMAT_EXTENSIONS = {
+    'png': 'PNG',
+    'webp': 'WEBP',
+    'dxf': 'DXF',
+}
+
+def _init_worker():
+    # Spawned (non-forked) workers start without Django configured
+    if not apps.ready:
+        django.setup()
+
+def _render_plan(site_plan_id, output_dir, image_format, scale, ppi, margin, options):
+    """
+    Renders one site plan to an image or DXF file inside a pool worker.
+
+    Returns:
+    - Tuple (site_plan_id, path or None, elapsed seconds, error message or None)
+    """
+    started = time.perf_counter()
+    try:
+        site_plan = SitePlan.objects.select_related('city').get(pk=site_plan_id)
+        boundary_points = list(site_plan.boundary_points.order_by('id'))
+        if len(boundary_points) < 2:
+            raise ValueError("Insufficient boundary points to generate a preview.")
+
+        if image_format == 'dxf':
+            content = generate_site_plan_dxf(site_plan, boundary_points)
+        else:
+            img = render_site_plan(site_plan, boundary_points, scale=scale, ppi=ppi, margin=margin, options=options)
+            content = encode_image(img, FORMAT_EXTENSIONS[image_format], options)
+        path = Path(output_dir) / f"siteplan_{site_plan_id}.{image_format}"
+        path.write_bytes(content)
+        return site_plan_id, str(path), time.perf_counter() - started, None
+    except Exception as e:
+        return site_plan_id, None, time.perf_counter() - started, str(e)
+
+def _parse_since(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        parsed_date = parse_date(value)
+        if parsed_date is None:
+            raise CommandError(f"Invalid --updated-since value: {value}")
+        parsed = datetime.combine(parsed_date, dt_time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+class Command(BaseCommand):
+    help = "Renders site plans to image or DXF files in parallel across a process pool."
+
+    def add_arguments(self, parser):
+        parser.add_argument('output_dir', help="Directory the rendered files are written to.")
+        parser.add_argument('--city', help="Only render plans in this city (case-insensitive).")
+        parser.add_argument('--min-id', type=int, help="Only render plans with id >= this value.")
+        parser.add_argument('--max-id', type=int, help="Only render plans with id <= this value.")
+        parser.add_argument('--updated-since', help="Only render plans updated at or after this ISO date/datetime.")
+        parser.add_argument('--format', dest='image_format', choices=sorted(FORMAT_EXTENSIONS), default='png')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of worker processes; 1 renders in this process.")
+        parser.add_argument('--scale', type=float, default=30, help="Scale in feet per inch.")
+        parser.add_argument('--ppi', type=int, default=96, help="Pixels per inch.")
+        parser.add_argument('--margin', type=int, default=100, help="Margin in pixels.")
+        parser.add_argument('--full-color', action='store_true', help="Render on an RGB canvas instead of the compact palette.")
+        parser.add_argument('--compress-level', type=int, choices=range(10), help="PNG zlib level (default from settings).")
+        parser.add_argument('--optimize', action='store_true', help="Search for the smallest PNG encoding; slower.")
+        parser.add_argument('--lossy-webp', action='store_true', help="Write lossy WebP instead of lossless.")
+
+    def handle(self, *args, **options):
+        site_plans = SitePlan.objects.order_by('id')
+        if options['city']:
+            site_plans = site_plans.filter(city__name__iexact=options['city'])
+        if options['min_id'] is not None:
+            site_plans = site_plans.filter(id__gte=options['min_id'])
+        if options['max_id'] is not None:
+            site_plans = site_plans.filter(id__lte=options['max_id'])
+        if options['updated_since']:
+            site_plans = site_plans.filter(updated_at__gte=_parse_since(options['updated_since']))
+        site_plan_ids = list(site_plans.values_list('id', flat=True))
+
+        render_options = get_render_options()
+        if options['full_color']:
+            render_options = replace(render_options, compact=False)
+        if options['compress_level'] is not None:
+            render_options = replace(render_options, png_compress_level=options['compress_level'])
+        if options['optimize']:
+            render_options = replace(render_options, png_optimize=True)
+        if options['lossy_webp']:
+            render_options = replace(render_options, webp_lossless=False)
+
+        if not site_plan_ids:
+            self.stdout.write("No site plans matched.")
+            return
+
+        output_dir = Path(options['output_dir'])
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        render_args = (
+            str(output_dir), options['image_format'], options['scale'], options['ppi'], options['margin'], render_options,
+        )
+        started = time.perf_counter()
+        failures = []
+        for site_plan_id, path, elapsed, error in self._render_all(site_plan_ids, render_args, options['workers']):
+            if error:
+                failures.append(site_plan_id)
+                self.stderr.write(self.style.ERROR(f"Site Plan {site_plan_id}: failed after {elapsed:.3f}s: {error}"))
+            else:
+                self.stdout.write(f"Site Plan {site_plan_id}: {elapsed:.3f}s -> {path}")
+
+        rendered = len(site_plan_ids) - len(failures)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered} of {len(site_plan_ids)} site plan(s) in {time.perf_counter() - started:.2f}s."
+        ))
+        if failures:
+            raise CommandError(f"{len(failures)} site plan(s) failed to render: {', '.join(map(str, sorted(failures)))}")
+
+    def _render_all(self, site_plan_ids, render_args, workers):
+        """
+        Yields the _render_plan result of every site plan, as each finishes.
+
+        A single worker renders in this process, with no pool to start.
+        """
+        if workers <= 1:
+            for site_plan_id in site_plan_ids:
+                yield _render_plan(site_plan_id, *render_args)
+            return
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+            futures = [executor.submit(_render_plan, site_plan_id, *render_args) for site_plan_id in site_plan_ids]
+            for future in as_completed(futures):
+                yield future.result()
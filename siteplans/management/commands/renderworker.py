@@ -0,0 +1,43 @@
+# siteplans/management/commands/renderworker.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from siteplans.models import RENDER_JOB_DONE
+from siteplans.utils.jobs import claim_next_job, default_worker_name, requeue_stale_jobs, run_job
+
+class Command(BaseCommand):
+    help = "Processes queued site plan render jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty instead of polling.")
+        parser.add_argument('--max-jobs', type=int, help="Exit after processing this many jobs.")
+        parser.add_argument('--name', default=default_worker_name(), help="Worker name recorded on claimed jobs.")
+
+    def handle(self, *args, **options):
+        worker = options['name']
+        processed = 0
+        self.stdout.write(f"Render worker {worker} started.")
+        try:
+            while options['max_jobs'] is None or processed < options['max_jobs']:
+                close_old_connections()
+                requeue_stale_jobs()
+                job = claim_next_job(worker)
+                if job is None:
+                    if options['burst']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                started = time.perf_counter()
+                job = run_job(job)
+                processed += 1
+                message = f"Job {job.id} (Site Plan {job.site_plan_id}): {job.status} in {time.perf_counter() - started:.3f}s"
+                if job.status == RENDER_JOB_DONE:
+                    self.stdout.write(message)
+                else:
+                    self.stderr.write(self.style.ERROR(f"{message}: {job.error}"))
+        except KeyboardInterrupt:
+            self.stdout.write("Interrupted.")
+        self.stdout.write(self.style.SUCCESS(f"Render worker {worker} processed {processed} job(s)."))
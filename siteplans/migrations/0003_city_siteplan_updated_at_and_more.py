@@ -0,0 +1,84 @@
+# Generated by Django 5.1.1 on 2026-10-18 09:12
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def assign_default_city(apps, schema_editor):
+    """
+    Site plans created before City existed get attached to a 'Default' city,
+    which resolves to the default zoning rules.
+    """
+    City = apps.get_model('siteplans', 'City')
+    SitePlan = apps.get_model('siteplans', 'SitePlan')
+    if SitePlan.objects.filter(city__isnull=True).exists():
+        city, _ = City.objects.get_or_create(name='Default')
+        SitePlan.objects.filter(city__isnull=True).update(city=city)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0002_alter_boundarypoint_direction1_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='City',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('state', models.CharField(blank=True, max_length=100, null=True)),
+                ('country', models.CharField(default='USA', max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='siteplan',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='angle_degrees',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(360)]),
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='angle_minutes',
+            field=models.IntegerField(validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(59)]),
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='angle_seconds',
+            field=models.IntegerField(default=0, validators=[django.core.validators.MinValueValidator(0), django.core.validators.MaxValueValidator(59)]),
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='direction1',
+            field=models.CharField(choices=[('N', 'North'), ('S', 'South'), ('E', 'East'), ('W', 'West')], max_length=1),
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='direction2',
+            field=models.CharField(choices=[('N', 'North'), ('S', 'South'), ('E', 'East'), ('W', 'West')], max_length=1),
+        ),
+        migrations.AlterField(
+            model_name='boundarypoint',
+            name='length',
+            field=models.FloatField(validators=[django.core.validators.MinValueValidator(0.0)]),
+        ),
+        migrations.AddField(
+            model_name='siteplan',
+            name='city',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='site_plans', to='siteplans.city'),
+        ),
+        migrations.RunPython(assign_default_city, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='siteplan',
+            name='city',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='site_plans', to='siteplans.city'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:20
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Zoning previously hard-coded in siteplans/utils/zoning.py:
+# city -> {direction: (setback_landscape, easement_landscape, easement_utility)}
+INITIAL_ZONING = {
+    'Prosper': {direction: (5.0, 15.0, 10.0) for direction in 'NSEW'},
+    'CityX': {direction: (7.0, 20.0, 12.0) for direction in 'NS'},
+    'Default': {direction: (5.0, 10.0, 8.0) for direction in 'NSEW'},
+}
+
+
+def seed_zoning_rules(apps, schema_editor):
+    City = apps.get_model('siteplans', 'City')
+    ZoningRule = apps.get_model('siteplans', 'ZoningRule')
+    for city_name, rules in INITIAL_ZONING.items():
+        city = City.objects.filter(name__iexact=city_name).first()
+        if city is None:
+            city = City.objects.create(name=city_name)
+        for direction, (setback_landscape, easement_landscape, easement_utility) in rules.items():
+            ZoningRule.objects.get_or_create(
+                city=city,
+                boundary_direction=direction,
+                defaults={
+                    'setback_landscape': setback_landscape,
+                    'easement_landscape': easement_landscape,
+                    'easement_utility': easement_utility,
+                },
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0003_city_siteplan_updated_at_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZoningRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('boundary_direction', models.CharField(choices=[('N', 'North'), ('S', 'South'), ('E', 'East'), ('W', 'West')], max_length=1)),
+                ('setback_landscape', models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)])),
+                ('easement_landscape', models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)])),
+                ('easement_utility', models.FloatField(default=0.0, validators=[django.core.validators.MinValueValidator(0.0)])),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='zoning_rules', to='siteplans.city')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['city', 'boundary_direction'], name='zoning_city_direction_idx')],
+                'constraints': [models.UniqueConstraint(fields=('city', 'boundary_direction'), name='unique_zoning_rule_per_direction')],
+            },
+        ),
+        migrations.RunPython(seed_zoning_rules, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:47
+
+import math
+import struct
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# Bearing quadrant (direction1, direction2) -> azimuth from the bearing angle,
+# as in siteplans/utils/traverse.py at the time of this migration
+QUADRANT_AZIMUTHS = {
+    ('N', 'E'): lambda angle: angle,
+    ('N', 'W'): lambda angle: 360 - angle,
+    ('S', 'E'): lambda angle: 180 - angle,
+    ('S', 'W'): lambda angle: 180 + angle,
+}
+
+
+def plan_geometry_values(boundary_points):
+    """
+    Computes the PlanGeometry field values for boundary points in traverse order.
+
+    A frozen copy of the traverse, area and closure computation, so the
+    backfill does not change with the application code. Courses with an
+    invalid bearing are skipped, as the traverse does.
+    """
+    points = [(0.0, 0.0)]
+    perimeter = 0.0
+    for bp in boundary_points:
+        to_azimuth = QUADRANT_AZIMUTHS.get((bp.direction1.upper(), bp.direction2.upper()))
+        if to_azimuth is None:
+            continue
+        angle = bp.angle_degrees + bp.angle_minutes / 60 + bp.angle_seconds / 3600
+        azimuth = math.radians(to_azimuth(angle) % 360)
+        length = float(bp.length)
+        x, y = points[-1]
+        points.append((x + length * math.sin(azimuth), y + length * math.cos(azimuth)))
+        perimeter += abs(length)
+
+    xs = [x for x, _ in points]
+    ys = [y for _, y in points]
+    # Shoelace formula, closing the traverse back to its first point
+    area = 0.0
+    if len(points) >= 3:
+        following = points[1:] + points[:1]
+        area = abs(sum(x1 * y2 - y1 * x2 for (x1, y1), (x2, y2) in zip(points, following))) / 2
+    error = math.hypot(xs[-1] - xs[0], ys[-1] - ys[0])
+    return {
+        'coordinates': struct.pack(f'<{2 * len(points)}d', *(value for point in points for value in point)),
+        'vertex_count': len(points),
+        'min_x': min(xs),
+        'min_y': min(ys),
+        'max_x': max(xs),
+        'max_y': max(ys),
+        'perimeter': perimeter,
+        'area': area,
+        'closure_error': error,
+        'closure_precision': perimeter / error if error > 1e-9 else None,
+    }
+
+
+def backfill_plan_geometry(apps, schema_editor):
+    SitePlan = apps.get_model('siteplans', 'SitePlan')
+    BoundaryPoint = apps.get_model('siteplans', 'BoundaryPoint')
+    PlanGeometry = apps.get_model('siteplans', 'PlanGeometry')
+    for site_plan in SitePlan.objects.iterator():
+        boundary_points = list(BoundaryPoint.objects.filter(site_plan_id=site_plan.pk).order_by('id'))
+        PlanGeometry.objects.create(
+            site_plan_id=site_plan.pk,
+            source_updated_at=site_plan.updated_at,
+            **plan_geometry_values(boundary_points),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0005_renderjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanGeometry',
+            fields=[
+                ('site_plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='geometry', serialize=False, to='siteplans.siteplan')),
+                ('coordinates', models.BinaryField()),
+                ('vertex_count', models.PositiveIntegerField(default=0)),
+                ('min_x', models.FloatField(default=0.0)),
+                ('min_y', models.FloatField(default=0.0)),
+                ('max_x', models.FloatField(default=0.0)),
+                ('max_y', models.FloatField(default=0.0)),
+                ('perimeter', models.FloatField(default=0.0)),
+                ('area', models.FloatField(default=0.0)),
+                ('closure_error', models.FloatField(default=0.0)),
+                ('closure_precision', models.FloatField(blank=True, null=True)),
+                ('source_updated_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_plan_geometry, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0006_plangeometry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='siteplan',
+            index=models.Index(fields=['city', 'id'], name='siteplan_city_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siteplan',
+            index=models.Index(fields=['updated_at', 'id'], name='siteplan_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siteplan',
+            index=models.Index(fields=['address'], name='siteplan_address_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0007_siteplan_listing_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteplan',
+            name='origin_x',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.AddField(
+            model_name='siteplan',
+            name='origin_y',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0008_siteplan_origin'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='renderjob',
+            name='render_key',
+            field=models.CharField(blank=True, max_length=100),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0009_renderjob_render_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='city',
+            name='zoning_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
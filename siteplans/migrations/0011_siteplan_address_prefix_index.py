@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0010_city_zoning_updated_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='siteplan',
+            name='siteplan_address_idx',
+        ),
+        migrations.AddIndex(
+            model_name='siteplan',
+            index=models.Index(fields=['address'], name='siteplan_address_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
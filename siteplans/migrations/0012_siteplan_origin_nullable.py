@@ -0,0 +1,38 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:41
+
+from django.db import migrations, models
+
+
+def clear_untied_origins(apps, schema_editor):
+    """
+    Plans at exactly (0, 0) got the old default rather than a survey tie.
+    """
+    SitePlan = apps.get_model('siteplans', 'SitePlan')
+    SitePlan.objects.filter(origin_x=0.0, origin_y=0.0).update(origin_x=None, origin_y=None)
+
+
+def zero_untied_origins(apps, schema_editor):
+    SitePlan = apps.get_model('siteplans', 'SitePlan')
+    SitePlan.objects.filter(origin_x__isnull=True).update(origin_x=0.0)
+    SitePlan.objects.filter(origin_y__isnull=True).update(origin_y=0.0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('siteplans', '0011_siteplan_address_prefix_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='siteplan',
+            name='origin_x',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='siteplan',
+            name='origin_y',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(clear_untied_origins, zero_untied_origins),
+    ]
@@ -15,17 +15,53 @@ class City(models.Model):
     # Additional fields for future-proofing
     state = models.CharField(max_length=100, blank=True, null=True)
     country = models.CharField(max_length=100, default='USA')
+    zoning_updated_at = models.DateTimeField(null=True, blank=True)  # bumped whenever the city or its zoning rules change
 
     def __str__(self):
         return self.name
 
+class ZoningRule(models.Model):
+    """
+    Setback and easement widths a city applies along boundaries facing one direction.
+    """
+    city = models.ForeignKey(City, on_delete=models.CASCADE, related_name='zoning_rules')
+    boundary_direction = models.CharField(max_length=1, choices=DIRECTION_CHOICES)
+    setback_landscape = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])  # in feet
+    easement_landscape = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])  # in feet
+    easement_utility = models.FloatField(default=0.0, validators=[MinValueValidator(0.0)])  # in feet
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['city', 'boundary_direction'], name='unique_zoning_rule_per_direction'),
+        ]
+        indexes = [
+            models.Index(fields=['city', 'boundary_direction'], name='zoning_city_direction_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.city} {self.boundary_direction}: setback {self.setback_landscape} ft, landscape {self.easement_landscape} ft, utility {self.easement_utility} ft"
+
 class SitePlan(models.Model):
     city = models.ForeignKey(City, on_delete=models.PROTECT, related_name='site_plans')
     site_name = models.CharField(max_length=255)
     address = models.CharField(max_length=255)
+    # Point of beginning in the city's survey grid, in feet (x east, y north);
+    # places the plan's geometry among its neighbors. Null for plans with no
+    # survey tie, e.g. drawn on the board, which spatial search leaves out
+    origin_x = models.FloatField(null=True, blank=True)
+    origin_y = models.FloatField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Keyset pagination and filters of the site plan listing API
+        indexes = [
+            models.Index(fields=['city', 'id'], name='siteplan_city_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='siteplan_updated_id_idx'),
+            # Pattern operators let PostgreSQL serve LIKE 'prefix%' whatever the collation
+            models.Index(fields=['address'], name='siteplan_address_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ]
+
     def __str__(self):
         return self.site_name
 
@@ -40,3 +76,66 @@ class BoundaryPoint(models.Model):
 
     def __str__(self):
         return f"{self.direction1}{self.angle_degrees}°{self.angle_minutes}'{self.angle_seconds}\"{self.direction2} - {self.length} ft"
+
+class PlanGeometry(models.Model):
+    """
+    Traverse-derived geometry of a site plan, kept in sync with its boundary points.
+
+    Coordinates are in feet from the first boundary point (x east, y north),
+    packed as little-endian float64 (x, y) pairs.
+    """
+    site_plan = models.OneToOneField(SitePlan, on_delete=models.CASCADE, primary_key=True, related_name='geometry')
+    coordinates = models.BinaryField()
+    vertex_count = models.PositiveIntegerField(default=0)
+    min_x = models.FloatField(default=0.0)
+    min_y = models.FloatField(default=0.0)
+    max_x = models.FloatField(default=0.0)
+    max_y = models.FloatField(default=0.0)
+    perimeter = models.FloatField(default=0.0)  # in feet
+    area = models.FloatField(default=0.0)  # in square feet
+    closure_error = models.FloatField(default=0.0)  # in feet, from the last vertex back to the first
+    closure_precision = models.FloatField(null=True, blank=True)  # perimeter / closure_error; null when closed exactly
+    source_updated_at = models.DateTimeField(null=True, blank=True)  # SitePlan.updated_at the geometry was computed from
+
+    def __str__(self):
+        return f"Geometry of {self.site_plan_id}: {self.area:.1f} sq ft"
+
+RENDER_JOB_QUEUED = 'queued'
+RENDER_JOB_RUNNING = 'running'
+RENDER_JOB_DONE = 'done'
+RENDER_JOB_FAILED = 'failed'
+
+RENDER_JOB_STATUS_CHOICES = [
+    (RENDER_JOB_QUEUED, 'Queued'),
+    (RENDER_JOB_RUNNING, 'Running'),
+    (RENDER_JOB_DONE, 'Done'),
+    (RENDER_JOB_FAILED, 'Failed'),
+]
+
+class RenderJob(models.Model):
+    """
+    A queued preview render, processed by `manage.py renderworker`.
+
+    The encoded images are stored on the job so any web process can serve
+    them, whatever cache backend it uses.
+    """
+    site_plan = models.ForeignKey(SitePlan, on_delete=models.CASCADE, related_name='render_jobs')
+    status = models.CharField(max_length=10, choices=RENDER_JOB_STATUS_CHOICES, default=RENDER_JOB_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    error = models.TextField(blank=True)
+    site_plan_updated_at = models.DateTimeField(null=True, blank=True)  # SitePlan.updated_at the images were rendered from
+    render_key = models.CharField(max_length=100, blank=True)  # render_cache_key of the stored images (geometry, zoning, options)
+    png = models.BinaryField(null=True, blank=True)
+    webp = models.BinaryField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='renderjob_status_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Render of {self.site_plan_id} ({self.status})"
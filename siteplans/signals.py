@@ -0,0 +1,55 @@
+# siteplans/signals.py
+
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import City, SitePlan, BoundaryPoint, PlanGeometry, ZoningRule
+from .utils.cache import invalidate_site_plan_renders
+from .utils.plan_geometry import refresh_plan_geometry
+from .utils.spatial import note_site_plan_changed
+from .utils.zoning import invalidate_city_zoning
+
+@receiver([post_save, post_delete], sender=SitePlan)
+def site_plan_changed(sender, instance, **kwargs):
+    invalidate_site_plan_renders(instance.pk)
+    note_site_plan_changed(instance.pk)
+
+@receiver(post_save, sender=SitePlan)
+def site_plan_saved(sender, instance, created, raw=False, **kwargs):
+    # Saving bumps updated_at, which stored geometry is checked against; new
+    # plans get theirs once their boundary points are saved
+    if not created and not raw:
+        transaction.on_commit(partial(refresh_plan_geometry, instance.pk))
+
+@receiver(post_save, sender=PlanGeometry)
+def plan_geometry_changed(sender, instance, **kwargs):
+    note_site_plan_changed(instance.site_plan_id)
+
+@receiver([post_save, post_delete], sender=BoundaryPoint)
+def boundary_point_changed(sender, instance, **kwargs):
+    # Bump the plan's updated_at so preview image ETags change with its geometry
+    SitePlan.objects.filter(pk=instance.site_plan_id).update(updated_at=timezone.now())
+    invalidate_site_plan_renders(instance.site_plan_id)
+    # After commit, so a cascading plan delete is finished (refresh skips missing plans)
+    transaction.on_commit(partial(refresh_plan_geometry, instance.site_plan_id))
+
+@receiver(post_save, sender=City)
+def city_saved(sender, instance, raw=False, **kwargs):
+    # The stamp tells other processes to reload the city's zoning (see get_city_zoning)
+    if not raw:
+        instance.zoning_updated_at = timezone.now()
+        City.objects.filter(pk=instance.pk).update(zoning_updated_at=instance.zoning_updated_at)
+    invalidate_city_zoning(instance.pk)
+
+@receiver(post_delete, sender=City)
+def city_deleted(sender, instance, **kwargs):
+    invalidate_city_zoning(instance.pk)
+
+@receiver([post_save, post_delete], sender=ZoningRule)
+def zoning_rule_changed(sender, instance, **kwargs):
+    # Every rendering of the city's plans changes, so their ETags must too, and
+    # other processes reload the city's zoning
+    City.objects.filter(pk=instance.city_id).update(zoning_updated_at=timezone.now())
+    invalidate_city_zoning(instance.city_id)
@@ -1,3 +1,1185 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import importlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.client import AsyncRequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from .benchmarks import BenchmarkResult, compare_to_baseline, results_to_baseline, run_benchmarks
+from . import views
+from .models import City, SitePlan, BoundaryPoint, PlanGeometry, RenderJob, ZoningRule, RENDER_JOB_DONE
+from PIL import Image
+from .utils.cache import _index_key, render_cache_key
+from .utils.dashes import DASH_PATTERNS, dash_segments
+from .utils.drawing import (
+    RASTER_PALETTE, RenderOptions, apply_zoning_rules, encode_image, place_easements, render_site_plan, visible_markers,
+)
+from .utils.importers import import_csv, import_landxml
+from .utils.jobs import claim_next_job, enqueue_render, requeue_stale_jobs
+from .utils.offset import edge_directions, inset_polygon, signed_area
+from .utils import offload, profiling, resources, spatial
+from .utils.plan_geometry import get_plan_geometry, plan_geometry_values, unpack_coordinates
+from .utils.simplify import declutter_boxes, simplify_polyline
+from .utils.tiles import TILE_SIZE, tile_pixel_transform
+from .utils.traverse import traverse_from_boundary_points
+from .utils.zoning import CITYX_ZONING, LANDSCAPE_EASEMENT, LANDSCAPE_SETBACK, UTILITY_EASEMENT, get_city_zoning, invalidate_city_zoning
 
-# Create your tests here.
+def create_site_plan_with_courses(city, courses):
+    """
+    Creates a SitePlan whose boundary is a closed, regular polygon with the given number of courses.
+    """
+    site_plan = SitePlan.objects.create(city=city, site_name=f"Lot {courses}", address="1 Test Way")
+    for i in range(courses):
+        azimuth = (360 / courses) * i
+        if azimuth < 90:
+            direction1, angle, direction2 = 'N', azimuth, 'E'
+        elif azimuth < 180:
+            direction1, angle, direction2 = 'S', 180 - azimuth, 'E'
+        elif azimuth < 270:
+            direction1, angle, direction2 = 'S', azimuth - 180, 'W'
+        else:
+            direction1, angle, direction2 = 'N', 360 - azimuth, 'W'
+        BoundaryPoint.objects.create(
+            site_plan=site_plan,
+            direction1=direction1,
+            angle_degrees=int(angle),
+            angle_minutes=int(angle * 60) % 60,
+            angle_seconds=0,
+            direction2=direction2,
+            length=50.0,
+        )
+    return site_plan
+
+class RenderQueryCountTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(
+                city=self.city,
+                boundary_direction=direction,
+                setback_landscape=5.0,
+                easement_landscape=15.0,
+                easement_utility=10.0,
+            )
+        # Pick up the zoning stamp the rules just set, as a freshly loaded plan would
+        self.city.refresh_from_db()
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+
+    def test_zoning_is_queried_once_per_city(self):
+        with self.assertNumQueries(1):
+            get_city_zoning(self.city)
+            get_city_zoning(self.city)
+
+        ZoningRule.objects.filter(city=self.city, boundary_direction='N').first().save()
+        with self.assertNumQueries(1):
+            get_city_zoning(self.city)
+
+    def test_render_issues_one_query_regardless_of_courses(self):
+        get_city_zoning(self.city)
+        for courses in (4, 40):
+            site_plan = SitePlan.objects.select_related('city').get(
+                pk=create_site_plan_with_courses(self.city, courses).pk
+            )
+            with self.assertNumQueries(1):
+                render_site_plan(site_plan, site_plan.boundary_points.order_by('id'))
+
+    def test_preview_image_query_count_is_constant(self):
+        get_city_zoning(self.city)
+        for courses in (4, 40):
+            site_plan = create_site_plan_with_courses(self.city, courses)
+            url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.pk, 'image_format': 'png'})
+            # Plan, boundary points and the stored render-job lookup
+            with self.assertNumQueries(3):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response['Content-Type'], 'image/png')
+
+    def test_svg_preview_is_streamed(self):
+        site_plan = create_site_plan_with_courses(self.city, 12)
+        url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.pk, 'image_format': 'svg'})
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        self.assertTrue(response.streaming)
+        document = b''.join(response.streaming_content).decode()
+        self.assertTrue(document.rstrip().endswith('</svg>'))
+        self.assertEqual(document.count('class="easement-'), 3 + 3)  # one ring per kind, plus the legend
+        self.assertIn('Utility Easement 10.0ft', document)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_zoning_change_revalidates_renders(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        urls = [
+            reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.pk, 'image_format': image_format})
+            for image_format in ('png', 'svg')
+        ] + [
+            reverse('siteplans:drawing_preview_dxf', kwargs={'site_plan_id': site_plan.pk}),
+            reverse('siteplans:drawing_preview_geometry', kwargs={'site_plan_id': site_plan.pk}),
+        ]
+        before = {url: self.client.get(url) for url in urls}
+
+        rule = ZoningRule.objects.get(city=self.city, boundary_direction='N')
+        rule.setback_landscape = 20.0
+        rule.save()
+
+        for url, previous in before.items():
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=previous['ETag'])
+            self.assertEqual(response.status_code, 200, url)
+            self.assertNotEqual(response['ETag'], previous['ETag'])
+            self.assertGreaterEqual(parse_http_date(response['Last-Modified']), parse_http_date(previous['Last-Modified']))
+        self.assertNotEqual(self.client.get(urls[0]).content, before[urls[0]].content)
+
+        with override_settings(SITEPLANS_RENDER_OPTIONS={'compact': False}):
+            response = self.client.get(urls[0])
+        self.assertNotEqual(response['ETag'], self.client.get(urls[0])['ETag'])
+
+    def test_preview_format_negotiation(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        url = reverse('siteplans:drawing_preview_image_negotiated', kwargs={'site_plan_id': site_plan.pk})
+        for accept, content_type in [
+            ('image/avif,image/webp,image/svg+xml,image/*,*/*;q=0.8', 'image/svg+xml'),
+            ('image/webp,image/svg+xml;q=0.5', 'image/webp'),
+            ('*/*', 'image/png'),
+            ('image/*,image/svg+xml;q=0', 'image/png'),
+        ]:
+            response = self.client.get(url, HTTP_ACCEPT=accept)
+            self.assertEqual(response['Content-Type'], content_type, accept)
+            self.assertIn('Accept', response['Vary'])
+        self.assertEqual(self.client.get(url, HTTP_ACCEPT='application/json').status_code, 406)
+
+    def test_geometry_json(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        url = reverse('siteplans:drawing_preview_geometry', kwargs={'site_plan_id': site_plan.pk})
+        response = self.client.get(url)
+        payload = response.json()
+        self.assertEqual(len(payload['points']), 2 * 5)
+        self.assertEqual([e['kind'] for e in payload['easements']], [LANDSCAPE_SETBACK, LANDSCAPE_EASEMENT, UTILITY_EASEMENT])
+        self.assertEqual(payload['styles']['easements'][UTILITY_EASEMENT], {'color': 'blue', 'dash': [15, 5, 5, 5]})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_drawing_board_geometry(self):
+        board = self.client.get(reverse('siteplans:create_site_plan'))
+        self.assertContains(board, 'data-geometry-url')
+        url = reverse('siteplans:drawing_board_geometry')
+        courses = {'city': self.city.pk}
+        for i, (direction1, direction2) in enumerate([('N', 'E'), ('S', 'E'), ('S', 'W'), ('N', 'W')], start=1):
+            courses.update({f'D{i}': direction1, f'AD{i}': 0 if i % 2 else 90, f'AM{i}': 0, f'DO{i}': direction2, f'L{i}': 100})
+        response = self.client.get(url, courses)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bbox'], [0.0, 0.0, 100.0, 100.0])
+        self.assertFalse(SitePlan.objects.exists())
+        # Conditional requests are answered before any geometry is computed; only the city is looked up
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, courses, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url, {'city': self.city.pk, 'D1': 'N'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {**courses, 'city': ''}).status_code, 400)
+
+# Server-Timing shows whether a request rasterized
+@override_settings(SITEPLANS_PROFILING=True)
+class RenderCacheTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction, setback_landscape=5.0)
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+        self.site_plan = create_site_plan_with_courses(self.city, 4)
+        self.image_url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': self.site_plan.pk, 'image_format': 'png'})
+
+    def get_image(self):
+        """
+        Returns (PNG bytes, whether the request rendered rather than read the cache).
+        """
+        response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, 200)
+        return response.content, 'rasterize;' in response['Server-Timing']
+
+    def test_second_render_is_served_from_cache(self):
+        first, rendered = self.get_image()
+        self.assertTrue(rendered)
+        second, rendered = self.get_image()
+        self.assertFalse(rendered)
+        self.assertEqual(first, second)
+
+    def test_boundary_point_save_evicts_renders(self):
+        first, _ = self.get_image()
+        boundary_point = self.site_plan.boundary_points.order_by('id').first()
+        boundary_point.length = 80.0
+        boundary_point.save()
+        second, rendered = self.get_image()
+        self.assertTrue(rendered)
+        self.assertNotEqual(first, second)
+
+    def test_zoning_rule_save_rerenders(self):
+        first, _ = self.get_image()
+        for rule in ZoningRule.objects.filter(city=self.city):
+            rule.setback_landscape = 12.0
+            rule.save()
+        second, rendered = self.get_image()
+        self.assertTrue(rendered)
+        self.assertNotEqual(first, second)
+
+    def test_city_save_reloads_zoning(self):
+        self.get_image()
+        # Changed without signals, then picked up on the city's next save
+        ZoningRule.objects.filter(city=self.city).update(setback_landscape=12.0)
+        self.assertEqual(get_city_zoning(self.city).rules['N'].setback_landscape, 5.0)
+        self.city.save()
+        self.assertEqual(get_city_zoning(City.objects.get(pk=self.city.pk)).rules['N'].setback_landscape, 12.0)
+        _, rendered = self.get_image()
+        self.assertTrue(rendered)
+
+    def test_zoning_saved_by_another_process_is_reloaded(self):
+        self.assertEqual(get_city_zoning(self.city).rules['N'].setback_landscape, 5.0)
+        # Another process saves the rules: its signals bump the stamp but clear only its own cache
+        ZoningRule.objects.filter(city=self.city).update(setback_landscape=12.0)
+        City.objects.filter(pk=self.city.pk).update(zoning_updated_at=timezone.now())
+
+        fresh_city = City.objects.get(pk=self.city.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_city_zoning(fresh_city).rules['N'].setback_landscape, 12.0)
+        with self.assertNumQueries(0):
+            get_city_zoning(fresh_city)
+            # An instance loaded before the change does not force another reload
+            get_city_zoning(self.city)
+
+class BenchmarkSuiteTests(TestCase):
+    def test_suite_runs_and_rolls_back(self):
+        site_plans_before = SitePlan.objects.count()
+        results = run_benchmarks(sizes=[4], cities=['Default'], repeat=1)
+        names = {result.name for result in results}
+        self.assertIn('generate_site_plan_image[Default-4]', names)
+        self.assertIn('drawing_preview_image[Default-4]', names)
+        self.assertEqual(SitePlan.objects.count(), site_plans_before)
+        self.assertEqual(compare_to_baseline(results, results_to_baseline(results)), [])
+
+    def test_regressions_are_reported(self):
+        baseline = results_to_baseline([BenchmarkResult('case', wall_ms=10.0, peak_kb=100.0, queries=2)])
+        self.assertEqual(compare_to_baseline([BenchmarkResult('case', 12.0, 110.0, 2)], baseline, threshold=0.25), [])
+        regressions = compare_to_baseline([BenchmarkResult('case', 20.0, 500.0, 3)], baseline, threshold=0.25)
+        self.assertEqual(len(regressions), 3)
+
+class RenderJobTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction)
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+
+    def test_worker_renders_queued_job(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        job = enqueue_render(site_plan)
+        self.assertEqual(enqueue_render(site_plan), job)
+
+        status_url = reverse('siteplans:render_job_status_json', kwargs={'job_id': job.pk})
+        self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+
+        call_command('renderworker', '--burst', stdout=io.StringIO())
+        payload = self.client.get(status_url).json()
+        self.assertEqual(payload['status'], RENDER_JOB_DONE)
+
+        job.refresh_from_db()
+        response = self.client.get(payload['image_url'])
+        self.assertEqual(response.content, bytes(job.png))
+
+    def test_stored_render_goes_stale_with_zoning(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        enqueue_render(site_plan)
+        call_command('renderworker', '--burst', stdout=io.StringIO())
+        job = RenderJob.objects.get(site_plan=site_plan)
+        image_url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.pk, 'image_format': 'png'})
+        self.assertEqual(self.client.get(image_url).content, bytes(job.png))
+
+        ZoningRule.objects.filter(city=self.city).update(setback_landscape=20.0)
+        invalidate_city_zoning()
+        caches['siteplans_renders'].clear()
+        self.assertNotEqual(self.client.get(image_url).content, bytes(job.png))
+
+    @override_settings(SITEPLANS_RENDER_JOB_MAX_ATTEMPTS=2)
+    def test_stale_jobs_fail_once_out_of_attempts(self):
+        site_plan = create_site_plan_with_courses(self.city, 4)
+        job = enqueue_render(site_plan)
+        for attempt, requeued, status in ((1, 1, 'queued'), (2, 0, 'failed')):
+            self.assertEqual(claim_next_job('dead-worker'), job)
+            RenderJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - datetime.timedelta(hours=1))
+            self.assertEqual(requeue_stale_jobs(stale_after=60), requeued)
+            job.refresh_from_db()
+            self.assertEqual((job.attempts, job.status), (attempt, status))
+        self.assertIsNone(claim_next_job('dead-worker'))
+        self.assertIsNotNone(job.finished_at)
+
+class TiledPreviewTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction)
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+        self.site_plan = create_site_plan_with_courses(self.city, 4)
+
+    def tile_url(self, z, x, y):
+        return reverse('siteplans:drawing_preview_tile', kwargs={'site_plan_id': self.site_plan.pk, 'z': z, 'x': x, 'y': y})
+
+    def test_tile_is_a_png_tile(self):
+        response = self.client.get(self.tile_url(1, 1, 0))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(Image.open(io.BytesIO(response.content)).size, (TILE_SIZE, TILE_SIZE))
+
+    def test_tile_outside_the_pyramid_is_404(self):
+        self.assertEqual(self.client.get(self.tile_url(1, 2, 0)).status_code, 404)
+        with override_settings(SITEPLANS_TILE_MAX_ZOOM=2):
+            self.assertEqual(self.client.get(self.tile_url(3, 0, 0)).status_code, 404)
+
+    def test_adjacent_tiles_share_pixel_edges(self):
+        traverse = traverse_from_boundary_points(self.site_plan.boundary_points.all())
+        left, right = tile_pixel_transform(traverse, 1, 0, 0), tile_pixel_transform(traverse, 1, 1, 0)
+        min_x, min_y, max_x, max_y = traverse.bbox
+        for fraction in np.linspace(0, 1, 41):
+            point = (min_x + (max_x - min_x) * fraction, max_y)
+            x, y = left(*point)
+            self.assertEqual(right(*point), (x - TILE_SIZE, y))
+
+    def test_small_plan_downloads_png(self):
+        response = self.client.get(reverse('siteplans:drawing_preview', kwargs={'site_plan_id': self.site_plan.pk}))
+        self.assertFalse(response.context['tiled'])
+        self.assertContains(response, f'href="{response.context["png_url"]}" class="btn btn-primary ms-3" download')
+
+    @override_settings(SITEPLANS_MAX_CANVAS_PIXELS=10_000)
+    def test_plan_over_the_canvas_cap_is_tiled(self):
+        response = self.client.get(reverse('siteplans:drawing_preview', kwargs={'site_plan_id': self.site_plan.pk}))
+        self.assertTrue(response.context['tiled'])
+        self.assertNotContains(response, f'href="{response.context["png_url"]}"')
+        self.assertContains(response, f'href="{response.context["svg_url"]}" class="btn btn-primary ms-3" download')
+
+        image_url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': self.site_plan.pk, 'image_format': 'png'})
+        self.assertRedirects(self.client.get(image_url), self.tile_url(0, 0, 0))
+
+class RenderSiteplansCommandTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        other_city = City.objects.create(name='Otherville')
+        for city in (self.city, other_city):
+            for direction in 'NSEW':
+                ZoningRule.objects.create(city=city, boundary_direction=direction)
+        invalidate_city_zoning()
+        self.plans = [create_site_plan_with_courses(self.city, courses) for courses in (4, 5, 6)]
+        self.other_plan = create_site_plan_with_courses(other_city, 4)
+        self.output_dir = self.make_output_dir()
+
+    def make_output_dir(self):
+        output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, output_dir, ignore_errors=True)
+        return output_dir
+
+    def render(self, *args):
+        stdout = io.StringIO()
+        call_command('render_siteplans', self.output_dir, '--workers', '1', *args, stdout=stdout, stderr=io.StringIO())
+        return stdout.getvalue()
+
+    def rendered_files(self):
+        return sorted(os.listdir(self.output_dir))
+
+    def test_writes_one_image_per_plan(self):
+        output = self.render()
+        self.assertIn("Rendered 4 of 4 site plan(s)", output)
+        self.assertEqual(self.rendered_files(), sorted(f"siteplan_{plan.pk}.png" for plan in self.plans + [self.other_plan]))
+        with Image.open(os.path.join(self.output_dir, f"siteplan_{self.plans[0].pk}.png")) as img:
+            self.assertEqual(img.format, 'PNG')
+
+    def test_city_and_id_filters(self):
+        self.render('--city', 'TESTVILLE', '--min-id', str(self.plans[1].pk), '--format', 'webp')
+        self.assertEqual(self.rendered_files(), sorted(f"siteplan_{plan.pk}.webp" for plan in self.plans[1:]))
+
+        self.output_dir = self.make_output_dir()
+        self.render('--max-id', str(self.plans[0].pk), '--format', 'dxf')
+        self.assertEqual(self.rendered_files(), [f"siteplan_{self.plans[0].pk}.dxf"])
+
+    def test_updated_since_filter(self):
+        SitePlan.objects.exclude(pk=self.plans[2].pk).update(updated_at=datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc))
+        self.render('--updated-since', '2021-06-01')
+        self.assertEqual(self.rendered_files(), [f"siteplan_{self.plans[2].pk}.png"])
+        self.assertIn("No site plans matched.", self.render('--updated-since', '2999-01-01T00:00:00'))
+        with self.assertRaises(CommandError):
+            self.render('--updated-since', 'yesterday')
+
+    def test_failed_plans_are_reported(self):
+        BoundaryPoint.objects.filter(site_plan=self.other_plan).delete()
+        with self.assertRaisesMessage(CommandError, f"1 site plan(s) failed to render: {self.other_plan.pk}"):
+            self.render()
+        self.assertEqual(len(self.rendered_files()), 3)
+
+# A closed 50 ft square as (direction1, angle_degrees, direction2) bearings
+SQUARE_COURSES = [('N', 0, 'E'), ('N', 90, 'E'), ('S', 0, 'W'), ('N', 90, 'W')]
+
+class CreateSitePlanTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction)
+        invalidate_city_zoning()
+        caches['siteplans_renders'].clear()
+
+    def post_plan(self, courses):
+        data = {'site_name': 'Lot 1', 'address': '1 Test Way', 'city': self.city.pk}
+        for index, (direction1, angle_degrees, direction2) in enumerate(courses, start=1):
+            data.update({
+                f'D{index}': direction1, f'AD{index}': angle_degrees, f'AM{index}': 0, f'AS{index}': 0,
+                f'DO{index}': direction2, f'L{index}': 50,
+            })
+        return self.client.post(reverse('siteplans:create_site_plan'), data)
+
+    @override_settings(SITEPLANS_MAX_COURSES=3)
+    def test_courses_over_the_cap_save_nothing(self):
+        response = self.post_plan(SQUARE_COURSES)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['form'].non_field_errors(), ["A site plan can have at most 3 boundary points."])
+        self.assertFalse(SitePlan.objects.exists())
+        self.assertFalse(BoundaryPoint.objects.exists())
+
+    @override_settings(SITEPLANS_MAX_COURSES=4)
+    def test_courses_at_the_cap_are_bulk_inserted(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_plan(SQUARE_COURSES)
+        site_plan = SitePlan.objects.get()
+        self.assertRedirects(response, reverse('siteplans:drawing_preview', kwargs={'site_plan_id': site_plan.pk}), fetch_redirect_response=False)
+        self.assertFalse(RenderJob.objects.exists())
+        self.assertEqual(site_plan.boundary_points.count(), 4)
+        point_inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "siteplans_boundarypoint"')]
+        self.assertEqual(len(point_inserts), 1)
+
+    @override_settings(SITEPLANS_RENDER_JOBS=True)
+    def test_new_plans_are_queued_for_the_worker(self):
+        response = self.post_plan(SQUARE_COURSES)
+        job = RenderJob.objects.get(site_plan=SitePlan.objects.get())
+        self.assertRedirects(response, reverse('siteplans:render_job_status', kwargs={'job_id': job.pk}), fetch_redirect_response=False)
+
+    def test_bulk_insert_refreshes_geometry_and_evicts_renders(self):
+        # A plan id's render index may outlive the plan in a shared cache
+        next_id = create_site_plan_with_courses(self.city, 3).pk + 1
+        render_cache = caches['siteplans_renders']
+        render_cache.set_many({_index_key(next_id): ['siteplans:stale-render'], 'siteplans:stale-render': b'stale'})
+
+        self.post_plan(SQUARE_COURSES)
+        site_plan = SitePlan.objects.latest('id')
+        self.assertEqual(site_plan.pk, next_id)
+        geometry = PlanGeometry.objects.get(pk=site_plan.pk)
+        self.assertEqual(geometry.source_updated_at, site_plan.updated_at)
+        self.assertEqual(geometry.vertex_count, 5)
+        self.assertAlmostEqual(geometry.area, 2500.0)
+        self.assertIsNone(render_cache.get(_index_key(next_id)))
+        self.assertIsNone(render_cache.get('siteplans:stale-render'))
+
+        # Stored geometry is current, so reading it needs no recomputation
+        with self.assertNumQueries(1):
+            self.assertEqual(get_plan_geometry(SitePlan.objects.select_related('geometry').get(pk=site_plan.pk)).pk, site_plan.pk)
+
+class AsyncPreviewTests(TransactionTestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction, setback_landscape=5.0)
+        self.site_plan = create_site_plan_with_courses(self.city, 4)
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+        offload._semaphores.clear()
+
+    async def _get_image(self):
+        request = AsyncRequestFactory().get('/')
+        return await views.drawing_preview_image_async(request, site_plan_id=self.site_plan.pk, image_format='png')
+
+    async def test_async_image_matches_sync_render(self):
+        response = await self._get_image()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+
+        caches['siteplans_renders'].clear()
+        sync_response = await sync_to_async(self.client.get)(
+            reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': self.site_plan.pk, 'image_format': 'png'})
+        )
+        self.assertEqual(response.content, sync_response.content)
+
+    @override_settings(SITEPLANS_RENDER_CONCURRENCY=1, SITEPLANS_RENDER_QUEUE_TIMEOUT=0.001)
+    async def test_busy_renderer_answers_503(self):
+        responses = await asyncio.gather(*[self._get_image() for _ in range(3)])
+        self.assertIn(200, [response.status_code for response in responses])
+        self.assertIn(503, [response.status_code for response in responses])
+
+    async def _hold_slot(self, held, release):
+        async with offload.render_slot():
+            held.set()
+            await release.wait()
+
+    @override_settings(SITEPLANS_RENDER_CONCURRENCY=1, SITEPLANS_RENDER_QUEUE_TIMEOUT=0.01)
+    async def test_timed_out_or_cancelled_waits_keep_no_slot(self):
+        held, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(self._hold_slot(held, release))
+        await held.wait()
+
+        with self.assertRaises(offload.RenderBusyError):
+            async with offload.render_slot():
+                pass
+        # Cancel a waiter after the slot is handed to it but before it runs
+        waiter = asyncio.create_task(self._hold_slot(asyncio.Event(), asyncio.Event()))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+        self.assertTrue(holder.done())
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            async with asyncio.timeout(1):
+                await waiter
+
+        semaphore = offload._loop_semaphore()
+        self.assertFalse(semaphore.locked())
+        async with offload.render_slot():
+            self.assertTrue(semaphore.locked())
+
+class PlanGeometryTests(TestCase):
+    def test_geometry_follows_boundary_point_changes(self):
+        city = City.objects.create(name='Testville')
+        with self.captureOnCommitCallbacks(execute=True):
+            site_plan = create_site_plan_with_courses(city, 4)
+        geometry = PlanGeometry.objects.get(pk=site_plan.pk)
+        self.assertEqual(geometry.vertex_count, 5)
+        self.assertAlmostEqual(geometry.perimeter, 200.0)
+        self.assertAlmostEqual(geometry.area, 2500.0)
+        self.assertIsNone(geometry.closure_precision)
+        self.assertEqual(unpack_coordinates(geometry.coordinates).shape, (5, 2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site_plan.boundary_points.order_by('id').last().delete()
+        geometry = PlanGeometry.objects.get(pk=site_plan.pk)
+        self.assertAlmostEqual(geometry.closure_error, 50.0)
+        self.assertAlmostEqual(geometry.closure_precision, 3.0)
+
+    def test_stale_geometry_is_recomputed_on_read(self):
+        city = City.objects.create(name='Testville')
+        site_plan = create_site_plan_with_courses(city, 4)
+        site_plan = SitePlan.objects.get(pk=site_plan.pk)
+        self.assertAlmostEqual(get_plan_geometry(site_plan).area, 2500.0)
+
+    def test_migration_backfill_matches_current_geometry(self):
+        backfill = importlib.import_module('siteplans.migrations.0006_plangeometry')
+        site_plan = create_site_plan_with_courses(City.objects.create(name='Testville'), 7)
+        BoundaryPoint.objects.create(
+            site_plan=site_plan, direction1='X', angle_degrees=10, angle_minutes=0, direction2='E', length=20.0,
+        )
+        boundary_points = list(site_plan.boundary_points.order_by('id'))
+        expected = plan_geometry_values(boundary_points)
+        values = backfill.plan_geometry_values(boundary_points)
+        self.assertEqual(values.keys(), expected.keys())
+        np.testing.assert_allclose(unpack_coordinates(values.pop('coordinates')), unpack_coordinates(expected.pop('coordinates')), atol=1e-9)
+        for field, value in expected.items():
+            self.assertAlmostEqual(values[field], value, msg=field)
+
+class SitePlanListTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        self.other_city = City.objects.create(name='Otherton')
+        for courses in range(3, 10):
+            create_site_plan_with_courses(self.city, courses)
+        SitePlan.objects.create(city=self.other_city, site_name="Elsewhere", address="9 Far Road")
+
+    def walk(self, params):
+        ids, url = [], reverse('siteplans:site_plan_list')
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(result['id'] for result in data['results'])
+            url, params = data['next'], None
+        return ids
+
+    def test_pages_cover_every_plan_once_at_one_query_each(self):
+        expected = list(SitePlan.objects.order_by('id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'limit': 3}), expected)
+        expected = list(SitePlan.objects.order_by('updated_at', 'id').values_list('id', flat=True))
+        self.assertEqual(self.walk({'limit': 2, 'ordering': 'updated_at'}), expected)
+
+    def test_editing_a_plan_keeps_its_geometry(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            site_plan = create_site_plan_with_courses(self.city, 4)
+        url = reverse('siteplans:site_plan_list')
+        summary = lambda: next(r for r in self.client.get(url, {'limit': 100}).json()['results'] if r['id'] == site_plan.pk)
+        self.assertAlmostEqual(summary()['area'], 2500.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site_plan.address = "2 Test Way"
+            site_plan.save()
+        self.assertEqual(summary()['address'], "2 Test Way")
+        self.assertAlmostEqual(summary()['area'], 2500.0)
+
+    def test_filters_and_counts(self):
+        response = self.client.get(reverse('siteplans:site_plan_list'), {'city': 'testville', 'address': '1 Test'})
+        results = response.json()['results']
+        self.assertEqual(len(results), 7)
+        self.assertEqual(results[0]['boundary_point_count'], 3)
+        self.assertEqual(results[0]['city'], {'id': self.city.id, 'name': 'Testville'})
+
+        response = self.client.get(reverse('siteplans:site_plan_list'), {'city': self.other_city.id})
+        self.assertEqual([r['boundary_point_count'] for r in response.json()['results']], [0])
+
+    def test_rejects_foreign_cursor(self):
+        url = reverse('siteplans:site_plan_list')
+        cursor = self.client.get(url, {'limit': 1}).json()['next_cursor']
+        response = self.client.get(url, {'cursor': cursor, 'ordering': 'updated_at'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+@override_settings(SITEPLANS_SPATIAL_INDEX_PATH=None)
+class SpatialIndexTests(TestCase):
+    def setUp(self):
+        spatial.reset_parcel_index()
+        self.addCleanup(spatial.reset_parcel_index)
+        self.city = City.objects.create(name='Testville')
+        # 50 ft squares whose first corner is their south-west corner
+        self.plans = []
+        for i in range(3):
+            with self.captureOnCommitCallbacks(execute=True):
+                site_plan = create_site_plan_with_courses(self.city, 4)
+            SitePlan.objects.filter(pk=site_plan.pk).update(origin_x=i * 100.0, origin_y=0.0)
+            site_plan.refresh_from_db()
+            self.plans.append(site_plan)
+
+    def test_packed_tree_matches_brute_force(self):
+        rng = np.random.default_rng(0)
+        corners = rng.uniform(0, 10000, (500, 2))
+        boxes = np.hstack((corners, corners + rng.uniform(1, 200, (500, 2))))
+        index = spatial.ParcelIndex(np.arange(500), boxes, node_capacity=4)
+        index.upsert(7, (0, 0, 1, 1))
+        index.remove(8)
+        boxes[7] = (0, 0, 1, 1)
+        for query in [(0, 0, 1000, 1000), (5000, 5000, 5000, 5000), (2500, 0, 2600, 10000)]:
+            expected = set(np.flatnonzero(
+                (boxes[:, 0] <= query[2]) & (boxes[:, 2] >= query[0]) & (boxes[:, 1] <= query[3]) & (boxes[:, 3] >= query[1])
+            )) - {8}
+            self.assertEqual(set(index.query_bbox(*query).tolist()), expected)
+
+        path = os.path.join(tempfile.mkdtemp(), 'index.npz')
+        index.save(path)
+        loaded = spatial.ParcelIndex.load(path)
+        self.assertEqual(set(loaded.query_bbox(0, 0, 1000, 1000).tolist()), set(index.query_bbox(0, 0, 1000, 1000).tolist()))
+
+    def test_point_and_bbox_queries_follow_plan_changes(self):
+        first, second, third = self.plans
+        self.assertEqual(spatial.plans_containing_point(125, 25), [second.id])
+        self.assertEqual(spatial.plans_containing_point(75, 25), [])
+        self.assertEqual(spatial.plans_intersecting_bbox(40, 40, 110, 45), [first.id, second.id])
+
+        third.origin_x = 110.0
+        third.save()
+        self.assertEqual(spatial.plans_containing_point(125, 25), [second.id, third.id])
+        second.delete()
+        self.assertEqual(spatial.plans_containing_point(125, 25), [third.id])
+
+    def test_plans_without_a_survey_tie_are_left_out(self):
+        first = self.plans[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            drawn = create_site_plan_with_courses(self.city, 4)
+        self.assertIsNone(drawn.origin_x)
+        self.assertEqual(spatial.plans_containing_point(25, 25), [first.id])
+        self.assertEqual(len(spatial.get_parcel_index()), 3)
+
+        first.origin_x = first.origin_y = None
+        first.save()
+        self.assertEqual(spatial.plans_containing_point(25, 25), [])
+        self.assertEqual(len(spatial.get_parcel_index()), 2)
+
+    def test_exact_matches_are_read_in_batches(self):
+        # Candidates can be every plan in view; each query binds one batch of ids
+        with self.assertNumQueries(3):
+            spatial._exact_matches(np.arange(1, 2 * spatial.EXACT_MATCH_BATCH + 2), lambda points: True)
+
+    def test_endpoint(self):
+        url = reverse('siteplans:site_plan_spatial_search')
+        data = self.client.get(url, {'bbox': '0,0,160,10'}).json()
+        self.assertEqual([r['id'] for r in data['results']], [p.id for p in self.plans[:2]])
+        self.assertEqual(self.client.get(url, {'point': '1'}).status_code, 400)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+class PolygonInsetTests(TestCase):
+    square = [(0, 0), (100, 0), (100, 100), (0, 100)]
+    # Two 50 by 60 ft lots joined by a 10 ft wide neck
+    dumbbell = [(0, 0), (50, 0), (50, 20), (100, 20), (100, 0), (150, 0), (150, 60), (100, 60), (100, 30), (50, 30), (50, 60), (0, 60)]
+
+    def areas(self, rings):
+        return sorted(round(signed_area(ring), 6) for ring in rings)
+
+    def test_uniform_inset(self):
+        self.assertEqual(self.areas(inset_polygon(self.square, 10)), [6400.0])
+        # Clockwise input gives the same result
+        self.assertEqual(self.areas(inset_polygon(self.square[::-1], 10)), [6400.0])
+        self.assertEqual(inset_polygon(self.square, 50), [])
+        ring = inset_polygon(self.square, 10)[0]
+        np.testing.assert_array_equal(ring[0], ring[-1])
+
+    def test_per_direction_distances(self):
+        self.assertEqual(edge_directions(self.square).tolist(), ['S', 'E', 'N', 'W'])
+        (ring,) = inset_polygon(self.square, [0, 0, 20, 0])
+        self.assertEqual(round(signed_area(ring), 6), 8000.0)
+        self.assertEqual(ring[:, 1].max(), 80.0)
+
+    def test_narrow_neck_splits_and_collapses(self):
+        self.assertEqual(len(inset_polygon(self.dumbbell, 4)), 1)
+        self.assertEqual(self.areas(inset_polygon(self.dumbbell, 20)), [200.0, 200.0])
+        self.assertEqual(inset_polygon(self.dumbbell, 31), [])
+
+    def test_many_courses(self):
+        angles = np.linspace(0, 2 * np.pi, 2000, endpoint=False)
+        radii = 1000 + np.random.default_rng(0).uniform(-30, 30, len(angles))
+        circle = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+        (ring,) = inset_polygon(circle, 10)
+        # Every vertex of the inset lies at least 10 ft inside the boundary
+        edges = np.roll(circle, -1, axis=0) - circle
+        offsets = ring[:, None, :] - circle[None, :, :]
+        t = np.clip(np.einsum('ijk,jk->ij', offsets, edges) / np.einsum('jk,jk->j', edges, edges), 0, 1)
+        distances = np.linalg.norm(offsets - t[..., None] * edges[None], axis=2).min(axis=1)
+        self.assertGreater(distances.min(), 10 - 1e-6)
+
+    def test_wavy_lots_with_many_short_courses(self):
+        for courses, amplitude, waves, radius, distance in [
+            (500, 30, 13, 300, 10), (800, 1, 37, 300, 10), (1000, 5, 13, 300, 10),
+            (1500, 5, 13, 1000, 15), (3000, 5, 13, 1000, 15), (5000, 5, 13, 1000, 15),
+        ]:
+            angles = np.linspace(0, 2 * np.pi, courses, endpoint=False)
+            radii = radius + amplitude * np.cos(waves * angles)
+            lot = np.column_stack((radii * np.cos(angles), radii * np.sin(angles)))
+            (ring,) = inset_polygon(lot, distance)
+            # A boundary curving less sharply than the inset loses its perimeter times the distance, less a circle
+            perimeter = np.hypot(*(np.roll(lot, -1, axis=0) - lot).T).sum()
+            expected = signed_area(lot) - perimeter * distance + np.pi * distance ** 2
+            self.assertAlmostEqual(signed_area(ring) / expected, 1, places=5, msg=(courses, amplitude, waves))
+
+    def test_reflex_corners_are_mitered(self):
+        (ring,) = inset_polygon([(0, 0), (100, 0), (100, 50), (50, 50), (50, 100), (0, 100)], 10)
+        self.assertEqual(round(signed_area(ring), 6), 3900.0)
+        self.assertIn([40.0, 40.0], ring.tolist())
+        # A sharp notch is beveled four times the inset below its tip
+        (ring,) = inset_polygon([(0, 0), (100, 0), (100, 200), (51, 200), (50, 100), (49, 200), (0, 200)], 5)
+        self.assertEqual(np.isclose(ring[:-1, 1], 80).sum(), 2)
+
+    def test_dense_concave_arc_stays_bounded(self):
+        # A 200 ft lot with a 50 ft cul-de-sac bite in 400 chords
+        angles = np.linspace(0, np.pi, 401)
+        bite = np.column_stack((100 + 50 * np.cos(angles), 200 - 50 * np.sin(angles)))
+        lot = [(0, 0), (200, 0), (200, 200), *bite.tolist(), (0, 200)]
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            (ring,) = inset_polygon(lot, 5)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(time.perf_counter() - started, 5)
+        self.assertLess(peak, 64 * 2 ** 20)
+        # The 55 ft circle of the offset bite cuts below the 195 ft line of the top offset
+        bite_area = 55 ** 2 * np.arccos(5 / 55) - 5 * np.sqrt(55 ** 2 - 5 ** 2)
+        self.assertAlmostEqual(signed_area(ring), 190 ** 2 - bite_area, delta=1)
+
+    def test_falls_back_to_untrimmed_offsets(self):
+        # Every offset of a 1 ft fillet in 3000 chords crosses every other one at a 10 ft inset
+        angles = np.linspace(0, np.pi / 2, 3001)
+        fillet = np.column_stack((99 + np.cos(angles), 99 + np.sin(angles)))
+        lot = [(0, 0), (100, 0), *fillet.tolist(), (0, 100)]
+        with self.assertLogs('siteplans.utils.offset', 'WARNING'):
+            (ring,) = inset_polygon(lot, 10)
+        np.testing.assert_array_equal(ring[0], ring[-1])
+        np.testing.assert_allclose(ring[:2], [(0, 10), (100, 10)])
+
+    def test_one_easement_per_type(self):
+        city = City.objects.create(name='Easementville')
+        for direction in ['N', 'E', 'S', 'W']:
+            ZoningRule.objects.create(city=city, boundary_direction=direction, setback_landscape=5.0, easement_utility=10.0)
+        zoning = get_city_zoning(city)
+        easements = place_easements(np.array(self.square, dtype=float), apply_zoning_rules(zoning))
+        self.assertEqual([e['kind'] for e in easements], [LANDSCAPE_SETBACK, UTILITY_EASEMENT])
+        self.assertEqual([e['type'] for e in easements], ['Landscape Setback', 'Utility Easement'])
+        self.assertEqual([self.areas(e['rings']) for e in easements], [[8100.0], [6400.0]])
+        self.assertEqual(easements[1]['label'], 'Utility Easement 10.0ft')
+
+    def test_compiled_zoning_table(self):
+        compiled = apply_zoning_rules(CITYX_ZONING)
+        self.assertIs(apply_zoning_rules(CITYX_ZONING), compiled)
+        self.assertEqual(compiled.missing_sides, ('E', 'W'))
+        self.assertEqual(compiled.kinds, (LANDSCAPE_SETBACK, LANDSCAPE_EASEMENT, UTILITY_EASEMENT))
+        # Columns are N, E, S, W
+        self.assertEqual(compiled.offsets[UTILITY_EASEMENT].tolist(), [12.0, 0.0, 12.0, 0.0])
+        (setback, _, _) = place_easements(np.array(self.square, dtype=float), compiled)
+        self.assertEqual(self.areas(setback['rings']), [8600.0])
+
+class DashSegmentsTests(TestCase):
+    dashed = DASH_PATTERNS['dashed']  # 10 on, 5 off
+
+    def assertSegments(self, segments, expected):
+        self.assertEqual(segments.shape, (len(expected), 4))
+        np.testing.assert_allclose(segments, np.array(expected, dtype=float).reshape(-1, 4), atol=1e-9)
+
+    def test_phase_carries_across_vertices(self):
+        # The same straight line, with and without intermediate vertices
+        self.assertSegments(dash_segments([(0, 0), (30, 0)], self.dashed), [(0, 0, 10, 0), (15, 0, 25, 0)])
+        self.assertSegments(
+            dash_segments([(0, 0), (4, 0), (9, 0), (30, 0)], self.dashed),
+            [(0, 0, 4, 0), (4, 0, 9, 0), (9, 0, 10, 0), (15, 0, 25, 0)],
+        )
+        self.assertSegments(
+            dash_segments([(0, 0), (30, 0)], self.dashed, phase=3),
+            [(0, 0, 7, 0), (12, 0, 22, 0), (27, 0, 30, 0)],
+        )
+
+    def test_dash_is_split_at_a_corner(self):
+        self.assertSegments(
+            dash_segments([(0, 0), (7, 0), (7, 14)], self.dashed),
+            [(0, 0, 7, 0), (7, 0, 7, 3), (7, 8, 7, 14)],
+        )
+
+    def test_zero_length_edges_are_skipped(self):
+        segments = dash_segments([(0, 0), (5, 0), (5, 0), (20, 0)], self.dashed)
+        self.assertTrue(np.isfinite(segments).all())
+        self.assertSegments(segments, [(0, 0, 5, 0), (5, 0, 10, 0), (15, 0, 20, 0)])
+        self.assertSegments(dash_segments([(3, 3), (3, 3)], self.dashed), [])
+
+    def test_visible_range_keeps_overlapping_dashes_whole(self):
+        line = [(0, 0), (100, 0)]
+        self.assertSegments(dash_segments(line, self.dashed, visible_range=(32, 50)), [(30, 0, 40, 0), (45, 0, 55, 0)])
+        self.assertSegments(dash_segments(line, self.dashed, visible_range=(-20, 4)), [(0, 0, 10, 0)])
+        self.assertSegments(dash_segments(line, self.dashed, visible_range=(11, 14)), [])
+        self.assertSegments(dash_segments(line, self.dashed, visible_range=(150, 200)), [])
+
+# Profiles passed to record_test_profile, with the profile current while each hook ran
+recorded_profiles = []
+
+def record_test_profile(profile):
+    recorded_profiles.append((profile, profiling.current_profile()))
+
+@override_settings(SITEPLANS_PROFILING=True, SITEPLANS_PROFILE_HOOKS=['siteplans.tests.record_test_profile'])
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction)
+        self.site_plan = create_site_plan_with_courses(self.city, 4)
+        self.image_url = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': self.site_plan.pk, 'image_format': 'png'})
+        caches['siteplans_renders'].clear()
+        invalidate_city_zoning()
+        recorded_profiles.clear()
+        profiling.reset_profile_stats()
+        self.addCleanup(profiling.reset_profile_stats)
+
+    def test_server_timing_only_while_profiling(self):
+        response = self.client.get(self.image_url)
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertIn('rasterize;dur=', response['Server-Timing'])
+        self.assertEqual(len(recorded_profiles), 1)
+
+        caches['siteplans_renders'].clear()
+        recorded_profiles.clear()
+        with override_settings(SITEPLANS_PROFILING=False):
+            response = self.client.get(self.image_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(recorded_profiles, [])
+
+    def test_profiling_follows_debug_unless_set(self):
+        for debug in (False, True):
+            with override_settings(DEBUG=debug):
+                del settings.SITEPLANS_PROFILING
+                self.assertIs(profiling.profiling_enabled(), debug)
+
+    def test_each_request_gets_its_own_profile(self):
+        self.client.get(self.image_url)
+        self.client.get(self.image_url)
+        (first, first_current), (second, second_current) = recorded_profiles
+        self.assertIsNot(first, second)
+        self.assertEqual(first.name, 'drawing_preview_image')
+        # Hooks run after the profile is closed, and none leaks past the request
+        self.assertIsNone(first_current)
+        self.assertIsNone(second_current)
+        self.assertIsNone(profiling.current_profile())
+
+    def test_concurrent_tasks_keep_separate_profiles(self):
+        async def profiled(name):
+            with profiling.render_profile(name) as profile:
+                with profiling.stage(name):
+                    await asyncio.sleep(0.01)
+                self.assertIs(profiling.current_profile(), profile)
+            return profile
+
+        async def both():
+            return await asyncio.gather(profiled('first'), profiled('second'))
+
+        first, second = asyncio.run(both())
+        self.assertEqual(list(first.stages), ['first'])
+        self.assertEqual(list(second.stages), ['second'])
+        self.assertEqual(sorted(profile.name for profile, _ in recorded_profiles), ['first', 'second'])
+
+    @override_settings(SITEPLANS_PROFILE_HOOKS=['siteplans.utils.profiling.record_profile'])
+    def test_render_stats_is_staff_only(self):
+        self.client.get(self.image_url)
+        stats_url = reverse('siteplans:render_stats')
+        response = self.client.get(stats_url)
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response['Location'])
+
+        user = get_user_model().objects.create_user('surveyor', password='secret')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(stats_url).status_code, 302)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(stats_url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['profiles']['drawing_preview_image']['count'], 1)
+
+class RenderResourcesTests(TestCase):
+    def setUp(self):
+        resources.reset_render_resources()
+        self.addCleanup(resources.reset_render_resources)
+
+    def test_resources_are_built_once(self):
+        first = resources.get_render_resources()
+        self.assertIs(resources.get_render_resources(), first)
+        self.assertEqual(first.legend_tile.mode, 'RGBA')
+        self.assertEqual(first.compact_legend_tile.mode, 'P')
+        self.assertEqual(first.legend_font.size, 20)
+
+    @override_settings(SITEPLANS_FONT_PATH='/nonexistent/font.ttf', SITEPLANS_LEGEND_FONT_SIZE=14)
+    def test_missing_font_falls_back_to_default(self):
+        with self.assertLogs('siteplans.utils.resources', 'WARNING'):
+            legend_font = resources.get_render_resources().legend_font
+        self.assertEqual(legend_font.size, 14)
+
+    def test_preloaded_zoning_needs_no_queries(self):
+        city = City.objects.create(name='Preloadville')
+        for direction in ['N', 'E', 'S', 'W']:
+            ZoningRule.objects.create(city=city, boundary_direction=direction, easement_utility=10.0)
+        invalidate_city_zoning()
+        self.addCleanup(invalidate_city_zoning)
+        with self.assertNumQueries(1):
+            resources.preload_render_resources(include_zoning=True)
+        with self.assertNumQueries(0):
+            compiled = get_city_zoning(city).compiled
+        self.assertEqual(compiled.kinds, (UTILITY_EASEMENT,))
+
+class RasterOptionsTests(TestCase):
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=self.city, boundary_direction=direction, setback_landscape=5.0, easement_utility=10.0)
+        invalidate_city_zoning()
+        self.site_plan = create_site_plan_with_courses(self.city, 12)
+        self.boundary_points = list(self.site_plan.boundary_points.order_by('id'))
+
+    def test_compact_canvas_matches_rgb(self):
+        rgb = render_site_plan(self.site_plan, self.boundary_points, options=RenderOptions(compact=False))
+        compact = render_site_plan(self.site_plan, self.boundary_points, options=RenderOptions(compact=True))
+        self.assertEqual((rgb.mode, compact.mode), ('RGB', 'P'))
+        self.assertEqual(rgb.size, compact.size)
+        self.assertLessEqual({index for _, index in compact.getcolors()}, set(range(len(RASTER_PALETTE))))
+
+        # Only the edges of antialiased labels and legend text may differ
+        drawn_rgb = np.asarray(rgb.convert('L')) < 128
+        drawn_compact = np.asarray(compact.convert('L')) < 128
+        self.assertLess((drawn_rgb ^ drawn_compact).sum(), 0.1 * drawn_rgb.sum())
+
+        compact_png = encode_image(compact, 'PNG')
+        self.assertLess(len(compact_png), len(encode_image(rgb, 'PNG')))
+        self.assertEqual(Image.open(io.BytesIO(compact_png)).mode, 'P')
+        self.assertGreater(
+            len(encode_image(compact, 'PNG', RenderOptions(png_compress_level=0))),
+            len(encode_image(compact, 'PNG', RenderOptions(png_compress_level=9))),
+        )
+        self.assertEqual(Image.open(io.BytesIO(encode_image(compact, 'WEBP'))).format, 'WEBP')
+
+    def test_options_are_part_of_the_cache_key(self):
+        city_zoning = get_city_zoning(self.city)
+        key = render_cache_key(self.boundary_points, city_zoning)
+        with override_settings(SITEPLANS_RENDER_OPTIONS={'png_compress_level': 9}):
+            self.assertNotEqual(render_cache_key(self.boundary_points, city_zoning), key)
+
+class LevelOfDetailTests(TestCase):
+    def test_simplify_polyline(self):
+        line = [(0, 0), (1, 0.1), (2, 0), (2, 0), (3, -0.2), (4, 0), (4, 5), (4.2, 0), (6, 0)]
+        kept = simplify_polyline(line, 0.5).tolist()
+        self.assertEqual(kept, [0, 5, 6, 7, 8])
+        self.assertEqual(simplify_polyline(line, 0).tolist(), list(range(len(line))))
+
+        # No dropped vertex strays farther than the tolerance from the simplified line
+        angles = np.linspace(0, 2 * np.pi, 2001)
+        ring = np.column_stack((300 * np.cos(angles), 300 * np.sin(angles)))
+        kept = simplify_polyline(ring, 0.5)
+        self.assertLess(len(kept), 100)
+        self.assertEqual((kept[0], kept[-1]), (0, 2000))
+        radius = 300 * np.cos(np.diff(angles[kept]).max() / 2)
+        self.assertGreater(radius, 299.5)
+
+    def test_declutter_boxes(self):
+        boxes = [(0, 0, 10, 10), (5, 5, 15, 15), (10, 0, 20, 10), (100, 100, 130, 110), (125, 105, 126, 106)]
+        self.assertEqual(declutter_boxes(boxes), [0, 2, 3])
+        self.assertEqual(declutter_boxes([]), [])
+
+    def test_dense_parcel_markers_and_sprites(self):
+        city = City.objects.create(name='Testville')
+        for direction in 'NSEW':
+            ZoningRule.objects.create(city=city, boundary_direction=direction, setback_landscape=5.0)
+        invalidate_city_zoning()
+        site_plan = create_site_plan_with_courses(city, 360)
+        boundary_points = list(site_plan.boundary_points.order_by('id'))
+
+        # Vertices 3 pixels apart: every fourth marker fits, and fewer labels
+        shifted_points = [(3 * i, 0) for i in range(200)]
+        markers, labels = visible_markers(shifted_points, resources.get_render_resources().label_font)
+        self.assertEqual(markers, list(range(0, 200, 4)))
+        self.assertLess(len(labels), len(markers))
+        self.assertLessEqual(set(labels), set(markers))
+        self.assertEqual(visible_markers(shifted_points, None, declutter=False), (list(range(200)), list(range(200))))
+
+        # At 600 ft per inch the 50 ft courses are 8 pixels long, shorter than a marker
+        full = render_site_plan(site_plan, boundary_points, scale=600, options=RenderOptions(simplify_tolerance=0, declutter=False))
+        lod = render_site_plan(site_plan, boundary_points, scale=600, options=RenderOptions())
+        self.assertEqual(full.size, lod.size)
+        # Fewer markers are drawn, so the parcel shows less red
+        red = RASTER_PALETTE.index('red')
+        self.assertLess(np.count_nonzero(np.asarray(lod) == red), np.count_nonzero(np.asarray(full) == red))
+
+        # Stamped markers set exactly the pixels of drawn ones
+        stamped = render_site_plan(site_plan, boundary_points, scale=600, options=RenderOptions(marker_sprites=True))
+        self.assertEqual(stamped.tobytes(), lod.tobytes())
+
+def survey_csv_rows(parcels, courses=4, start=0):
+    """
+    Returns CSV data rows for square parcels named 'Lot {n}', one row per course.
+    """
+    bearings = [('N', 'E', 0), ('S', 'E', 90), ('S', 'W', 0), ('N', 'W', 90)]
+    rows = []
+    for n in range(start, start + parcels):
+        for i in range(courses):
+            direction1, direction2, degrees = bearings[i % 4]
+            rows.append(f"Lot {n},{n} Survey Rd,Testville,{direction1},{degrees},0,0,{direction2},50")
+    return rows
+
+class SurveyImportTests(TestCase):
+    header = ','.join(['site_name', 'address', 'city', 'direction1', 'angle_degrees', 'angle_minutes', 'angle_seconds', 'direction2', 'length'])
+
+    def setUp(self):
+        self.city = City.objects.create(name='Testville')
+
+    def import_csv(self, lines, chunk_size=None, encoding='utf-8'):
+        data = '\n'.join([self.header, *lines]).encode(encoding) if isinstance(lines, list) else lines
+        return import_csv(io.BytesIO(data), chunk_size=chunk_size)
+
+    def test_bad_encoding_stops_with_a_file_error(self):
+        data = '\n'.join([self.header, *survey_csv_rows(2000)]).encode() + '\nLot x,Caf\xe9,Testville,N,0,0,0,E,50\n'.encode('latin-1')
+        upload = SimpleUploadedFile('survey.csv', data, content_type='text/csv')
+        with self.settings(SITEPLANS_IMPORT_CHUNK_SIZE=1000):
+            response = self.client.post(reverse('siteplans:import_survey_file'), {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()
+        self.assertFalse(payload['complete'])
+        self.assertEqual(payload['error_count'], 1)
+        self.assertIn('Unreadable CSV', payload['errors'][0]['message'])
+        self.assertEqual(SitePlan.objects.count(), payload['site_plans'])
+        self.assertGreater(payload['site_plans'], 0)
+        self.assertEqual(payload['committed_through'], f"line {1 + 4 * (payload['site_plans'] - 1) + 1}")
+
+    def test_csv_happy_path(self):
+        result = self.import_csv(survey_csv_rows(3))
+        self.assertEqual((result.site_plans, result.boundary_points, result.error_count), (3, 12, 0))
+        self.assertTrue(result.complete)
+        site_plan = SitePlan.objects.get(site_name='Lot 1')
+        self.assertEqual((site_plan.city, site_plan.address), (self.city, '1 Survey Rd'))
+        self.assertEqual(
+            [(bp.direction1, bp.angle_degrees, bp.direction2, bp.length) for bp in site_plan.boundary_points.order_by('id')],
+            [('N', 0, 'E', 50.0), ('S', 90, 'E', 50.0), ('S', 0, 'W', 50.0), ('N', 90, 'W', 50.0)],
+        )
+        self.assertAlmostEqual(get_plan_geometry(site_plan).area, 2500.0)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        rows = survey_csv_rows(2)
+        rows[1] = rows[1].replace(',S,90,', ',X,90,')  # Lot 0, line 3
+        rows[5] = rows[5].replace(',50', ',nan')  # Lot 1, line 7
+        rows[6] = rows[6].replace(',50', ',inf')  # Lot 1, line 8
+        rows.append("Lot 9,9 Survey Rd,Nowhere,N,0,0,0,E,50")  # line 10
+        result = self.import_csv(rows)
+        self.assertTrue(result.complete)
+        self.assertEqual(result.site_plans, 2)
+        self.assertEqual(result.boundary_points, 3 + 2)
+        self.assertEqual([location for location, _ in result.errors], ['line 3', 'line 7', 'line 8', 'line 10'])
+        self.assertIn('finite', result.errors[1][1])
+        self.assertIn('Unknown city', result.errors[3][1])
+
+    def test_chunk_boundaries(self):
+        # Chunks flush once 6 points are pending, i.e. after every second 4-course parcel
+        result = self.import_csv(survey_csv_rows(5), chunk_size=6)
+        self.assertEqual((result.site_plans, result.boundary_points), (5, 20))
+        self.assertEqual(result.committed_through, 'line 18')
+        self.assertEqual(
+            sorted(SitePlan.objects.values_list('site_name', flat=True)), [f"Lot {n}" for n in range(5)],
+        )
+        self.assertEqual(BoundaryPoint.objects.count(), 20)
+        for site_plan in SitePlan.objects.all():
+            self.assertEqual(site_plan.boundary_points.count(), 4)
+            self.assertAlmostEqual(get_plan_geometry(site_plan).area, 2500.0)
+
+    def test_landxml(self):
+        corners = [(0, 0), (100, 0), (100, 50), (0, 50), (0, 0)]
+        lines = ''.join(
+            f'<Line><Start>{n1} {e1}</Start><End>{n2} {e2}</End></Line>'
+            for (e1, n1), (e2, n2) in zip(corners, corners[1:])
+        )
+        document = (
+            '<?xml version="1.0"?><LandXML xmlns="http://www.landxml.org/schema/LandXML-1.2"><Parcels>'
+            f'<Parcel name="Lot A" desc="1 Survey Rd"><CoordGeom>{lines}</CoordGeom></Parcel>'
+            '<Parcel name="Lot B"><CoordGeom><Line dir="90" length="40"/><Line dir="x"/><Line dir="270" length="40"/></CoordGeom></Parcel>'
+            '</Parcels></LandXML>'
+        )
+        result = import_landxml(io.BytesIO(document.encode()), self.city)
+        self.assertTrue(result.complete)
+        self.assertEqual((result.site_plans, result.boundary_points), (2, 6))
+        self.assertEqual([location for location, _ in result.errors], ['parcel Lot B, course 2'])
+        lot_a = SitePlan.objects.get(site_name='Lot A')
+        self.assertEqual((lot_a.address, lot_a.origin_x, lot_a.origin_y), ('1 Survey Rd', 0.0, 0.0))
+        self.assertAlmostEqual(get_plan_geometry(lot_a).area, 5000.0)
+
+        result = import_landxml(io.BytesIO(document[:-20].encode()), self.city)
+        self.assertFalse(result.complete)
+        self.assertEqual(result.errors[-1][0], 'file')
+
+    def test_landxml_memory_stays_flat(self):
+        points = ''.join(f'<CgPoint name="{n}">{n} {n}</CgPoint>' for n in range(100000))
+        document = (
+            '<?xml version="1.0"?><LandXML xmlns="http://www.landxml.org/schema/LandXML-1.2">'
+            f'<CgPoints>{points}</CgPoints><Parcels><Parcel name="Lot C"><CoordGeom>'
+            '<Line dir="90" length="40"/><Line dir="180" length="40"/><Line dir="270" length="40"/>'
+            '</CoordGeom></Parcel></Parcels></LandXML>'
+        )
+        stream = io.BytesIO(document.encode())
+        tracemalloc.start()
+        try:
+            result = import_landxml(stream, self.city)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual((result.site_plans, result.boundary_points), (1, 3))
+        # Holding the points alone would take tens of megabytes
+        self.assertLess(peak, 8 * 2 ** 20)
@@ -1,12 +1,31 @@
 # siteplans/urls.py
 
-from django.urls import path
+from django.conf import settings
+from django.urls import path, re_path
 from . import views
 
 app_name = 'siteplans'
 
+# Async previews suit ASGI servers such as uvicorn; the sync ones suit WSGI workers
+if getattr(settings, 'SITEPLANS_ASYNC_VIEWS', False):
+    preview_view, preview_image_view = views.drawing_preview_async, views.drawing_preview_image_async
+else:
+    preview_view, preview_image_view = views.drawing_preview, views.drawing_preview_image
+
 urlpatterns = [
     path('', views.siteplan_landing, name='siteplan_landing'),  # Landing page for site plans
     path('draw/', views.create_site_plan, name='create_site_plan'),  # Create a new site plan
-    path('preview/<int:site_plan_id>/', views.drawing_preview, name='drawing_preview'),  # Preview an existing site plan
+    path('import/', views.import_survey_file, name='import_survey_file'),  # Import plans from a CSV/LandXML survey file
+    path('preview/<int:site_plan_id>/', preview_view, name='drawing_preview'),  # Preview an existing site plan
+    re_path(r'^preview/(?P<site_plan_id>\d+)/image\.(?P<image_format>png|webp|svg)$', preview_image_view, name='drawing_preview_image'),  # Rendered plan as raw image bytes or SVG
+    path('preview/<int:site_plan_id>/image', preview_image_view, name='drawing_preview_image_negotiated'),  # Format chosen by the Accept header
+    path('preview/<int:site_plan_id>/tiles/<int:z>/<int:x>/<int:y>.png', views.drawing_preview_tile, name='drawing_preview_tile'),  # One tile of a large plan
+    path('preview/<int:site_plan_id>/geometry.json', views.drawing_preview_geometry, name='drawing_preview_geometry'),  # Geometry for client-side drawing
+    path('draw/geometry.json', views.drawing_board_geometry, name='drawing_board_geometry'),  # Live preview of unsaved courses
+    path('preview/<int:site_plan_id>/plan.dxf', views.drawing_preview_dxf, name='drawing_preview_dxf'),  # Vector export of the plan
+    path('jobs/<int:job_id>/', views.render_job_status, name='render_job_status'),  # Waits for a queued render
+    path('jobs/<int:job_id>.json', views.render_job_status_json, name='render_job_status_json'),  # Polled by the status page
+    path('api/siteplans/', views.site_plan_list, name='site_plan_list'),  # Keyset-paginated JSON listing and search
+    path('api/siteplans/spatial/', views.site_plan_spatial_search, name='site_plan_spatial_search'),  # Plans at a point or in a box
+    path('render-stats/', views.render_stats, name='render_stats'),  # Aggregate render timings (staff only)
 ]
@@ -0,0 +1,170 @@
+# siteplans/utils/cache.py
+
+import hashlib
+import json
+import logging
+from dataclasses import asdict
+from django.conf import settings
+from django.core.cache import caches
+from .drawing import encode_image, get_city_zoning, get_render_options, render_site_plan
+from .dxf import generate_site_plan_dxf
+from .jobs import stored_render
+from .profiling import stage
+from .tiles import render_site_plan_tile
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Bump whenever the renderer output changes so stale entries are never served
+RENDER_CACHE_VERSION = 4
+
+DEFAULT_RENDER_CACHE_TIMEOUT = 60 * 60 * 24  # one day
+DEFAULT_RENDER_CACHE_MAX_BYTES = 8 * 1024 * 1024
+
+def get_render_cache():
+    """
+    Returns the cache backend that holds rendered site plans.
+    """
+    alias = getattr(settings, 'SITEPLANS_RENDER_CACHE', 'default')
+    return caches[alias]
+
+def boundary_point_tuples(boundary_points):
+    """
+    Returns the geometry of each boundary point as a plain tuple, in traverse order.
+    """
+    return [
+        (
+            bp.direction1.upper(),
+            int(bp.angle_degrees),
+            int(bp.angle_minutes),
+            int(bp.angle_seconds),
+            bp.direction2.upper(),
+            float(bp.length),
+        )
+        for bp in boundary_points
+    ]
+
+def render_cache_key(boundary_points, city_zoning, scale=30, ppi=96, margin=100, image_format='PNG', tile=None):
+    """
+    Builds a content-addressed cache key for a site plan render.
+
+    Parameters:
+    - boundary_points: Iterable of BoundaryPoint instances
+    - city_zoning: CityZoning instance (or None)
+    - scale, ppi, margin: Render parameters passed to render_site_plan
+    - image_format: Encoding passed to encode_image
+    - tile: Optional (z, x, y) for a single tile
+
+    The current SITEPLANS_RENDER_OPTIONS are part of the key, as they change
+    the encoded bytes.
+
+    Returns:
+    - Cache key string; identical geometry, zoning and parameters share a key
+    """
+    payload = {
+        'version': RENDER_CACHE_VERSION,
+        'points': boundary_point_tuples(boundary_points),
+        'zoning': asdict(city_zoning) if city_zoning else None,
+        'render': [scale, ppi, margin, image_format.upper()],
+        'tile': list(tile) if tile else None,
+        'options': asdict(get_render_options()),
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode()
+    return f"siteplans:render:{hashlib.sha256(encoded).hexdigest()}"
+
+def render_options_digest():
+    """
+    Returns a short digest of the current SITEPLANS_RENDER_OPTIONS, for validators.
+    """
+    encoded = json.dumps(asdict(get_render_options()), sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()[:12]
+
+def _index_key(site_plan_id):
+    return f"siteplans:render-index:{site_plan_id}"
+
+def _get_or_render(site_plan, key, produce):
+    """
+    Returns the cached bytes for key, calling produce() and caching its result on a miss.
+    """
+    cache = get_render_cache()
+    with stage('cache'):
+        content = cache.get(key)
+    if content is not None:
+        logger.debug(f"Render cache hit for Site Plan {site_plan.pk}")
+        return content
+
+    content = produce()
+
+    max_bytes = getattr(settings, 'SITEPLANS_RENDER_CACHE_MAX_BYTES', DEFAULT_RENDER_CACHE_MAX_BYTES)
+    if len(content) > max_bytes:
+        logger.info(f"Render for Site Plan {site_plan.pk} exceeds {max_bytes} bytes; not caching.")
+        return content
+
+    timeout = getattr(settings, 'SITEPLANS_RENDER_CACHE_TIMEOUT', DEFAULT_RENDER_CACHE_TIMEOUT)
+    with stage('cache'):
+        cache.set(key, content, timeout)
+
+        # Remember which keys belong to this plan so saves can evict them
+        index_key = _index_key(site_plan.pk)
+        keys = cache.get(index_key, [])
+        if key not in keys:
+            cache.set(index_key, keys + [key], timeout)
+    return content
+
+def cached_site_plan_image(site_plan, boundary_points, zoning_rules=None, scale=30, ppi=96, margin=100, image_format='PNG'):
+    """
+    Returns the encoded site plan image, serving it from the render cache when possible.
+
+    Takes the same arguments as render_site_plan plus the image_format passed
+    to encode_image, and returns the encoded image bytes. On a cache miss, an
+    up-to-date image stored by a render job is used before rendering.
+    """
+    boundary_points = list(boundary_points)
+    city_zoning = get_city_zoning(site_plan.city, zoning_rules)
+    key = render_cache_key(boundary_points, city_zoning, scale, ppi, margin, image_format)
+
+    def produce():
+        # Render jobs only store the default rendering, keyed like its PNG
+        if site_plan.pk and zoning_rules is None and (scale, ppi, margin) == (30, 96, 100):
+            job_key = key if image_format.upper() == 'PNG' else render_cache_key(boundary_points, city_zoning)
+            content = stored_render(site_plan, job_key, image_format)
+            if content is not None:
+                return content
+        img = render_site_plan(site_plan, boundary_points, zoning_rules, scale, ppi, margin)
+        return encode_image(img, image_format)
+
+    return _get_or_render(site_plan, key, produce)
+
+def cached_site_plan_dxf(site_plan, boundary_points, zoning_rules=None):
+    """
+    Returns the site plan DXF bytes, serving them from the render cache when possible.
+    """
+    boundary_points = list(boundary_points)
+    city_zoning = get_city_zoning(site_plan.city, zoning_rules)
+    key = render_cache_key(boundary_points, city_zoning, image_format='DXF')
+    return _get_or_render(site_plan, key, lambda: generate_site_plan_dxf(site_plan, boundary_points, zoning_rules))
+
+def cached_site_plan_tile(site_plan, boundary_points, z, x, y, zoning_rules=None):
+    """
+    Returns one PNG tile of the site plan, serving it from the render cache when possible.
+    """
+    boundary_points = list(boundary_points)
+    city_zoning = get_city_zoning(site_plan.city, zoning_rules)
+    key = render_cache_key(boundary_points, city_zoning, image_format='PNG', tile=(z, x, y))
+
+    def produce():
+        img = render_site_plan_tile(site_plan, boundary_points, z, x, y, zoning_rules)
+        return encode_image(img, 'PNG')
+
+    return _get_or_render(site_plan, key, produce)
+
+def invalidate_site_plan_renders(site_plan_id):
+    """
+    Evicts every cached render recorded for the given site plan.
+    """
+    cache = get_render_cache()
+    index_key = _index_key(site_plan_id)
+    keys = cache.get(index_key, [])
+    cache.delete_many(keys + [index_key])
+    if keys:
+        logger.debug(f"Evicted {len(keys)} cached render(s) for Site Plan {site_plan_id}")
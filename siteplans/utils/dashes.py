@@ -0,0 +1,120 @@
+# siteplans/utils/dashes.py
+
+import logging
+from functools import lru_cache
+import numpy as np
+from PIL import Image, ImageDraw
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Dash patterns in pixels: alternating (on, off, ...) lengths
+DASH_PATTERNS = {
+    'dotted': (5, 5),
+    'dashed': (10, 5),
+    'dashdot': (15, 5, 5, 5),
+}
+
+def dash_segments(points, pattern, phase=0.0, visible_range=None):
+    """
+    Computes every dash of a dashed polyline in one vectorized pass.
+
+    The pattern runs continuously along the whole polyline, so its phase
+    carries across vertices; a dash that turns a corner is split into one
+    segment per edge.
+
+    Parameters:
+    - points: Sequence of (x, y) polyline vertices in pixels
+    - pattern: Alternating (on, off, ...) lengths, e.g. DASH_PATTERNS['dashed']
+    - phase: Distance into the pattern at the first vertex
+    - visible_range: Optional (from, to) distances along the polyline; dashes
+      entirely outside it are skipped, partly visible dashes are kept whole
+
+    Returns:
+    - Float array of shape (k, 4) with one (x1, y1, x2, y2) row per dash segment
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    pattern = np.asarray(pattern, dtype=float)
+    if len(points) < 2 or len(pattern) < 2:
+        return np.empty((0, 4))
+
+    edges = np.diff(points, axis=0)
+    edge_lengths = np.hypot(edges[:, 0], edges[:, 1])
+    distances = np.concatenate(([0.0], np.cumsum(edge_lengths)))
+    total_length = distances[-1]
+
+    # On-intervals of one pattern period, relative to its start
+    offsets = np.concatenate(([0.0], np.cumsum(pattern)[:-1]))
+    on_starts, on_lengths = offsets[0::2], pattern[0::2]
+    period = pattern.sum()
+
+    range_from, range_to = 0.0, total_length
+    if visible_range is not None:
+        range_from, range_to = max(0.0, visible_range[0]), min(total_length, visible_range[1])
+    if range_to <= range_from:
+        return np.empty((0, 4))
+
+    first_period = np.floor((range_from + phase) / period)
+    last_period = np.ceil((range_to + phase) / period)
+    period_starts = np.arange(first_period, last_period + 1) * period - phase
+    dash_starts = (period_starts[:, None] + on_starts).ravel()
+    dash_ends = dash_starts + np.repeat(on_lengths[None, :], len(period_starts), axis=0).ravel()
+
+    # Keep dashes overlapping the visible range, clipped to the polyline itself
+    keep = (dash_ends > range_from) & (dash_starts < range_to)
+    dash_starts = np.clip(dash_starts[keep], 0.0, total_length)
+    dash_ends = np.clip(dash_ends[keep], 0.0, total_length)
+    keep = dash_ends > dash_starts
+    dash_starts, dash_ends = dash_starts[keep], dash_ends[keep]
+    if not len(dash_starts):
+        return np.empty((0, 4))
+
+    # Split every dash at the vertices it crosses
+    first_edge = np.clip(np.searchsorted(distances, dash_starts, side='right') - 1, 0, len(edges) - 1)
+    last_edge = np.clip(np.searchsorted(distances, dash_ends, side='left') - 1, 0, len(edges) - 1)
+    counts = last_edge - first_edge + 1
+    dash_index = np.repeat(np.arange(len(dash_starts)), counts)
+    edge_index = first_edge[dash_index] + np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    piece_starts = np.maximum(dash_starts[dash_index], distances[edge_index])
+    piece_ends = np.minimum(dash_ends[dash_index], distances[edge_index + 1])
+    keep = piece_ends > piece_starts
+    edge_index, piece_starts, piece_ends = edge_index[keep], piece_starts[keep], piece_ends[keep]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        directions = np.where(edge_lengths[:, None] > 0, edges / edge_lengths[:, None], 0.0)
+    origins = points[edge_index]
+    starts = origins + directions[edge_index] * (piece_starts - distances[edge_index])[:, None]
+    ends = origins + directions[edge_index] * (piece_ends - distances[edge_index])[:, None]
+    return np.hstack((starts, ends))
+
+def draw_dash_segments(draw, segments, fill, width):
+    """
+    Draws precomputed dash segments (see dash_segments).
+    """
+    line = draw.line
+    for x1, y1, x2, y2 in segments.tolist():
+        line((x1, y1, x2, y2), fill=fill, width=width)
+
+def draw_dashed_polyline(draw, points, fill, width, dash_type, phase=0.0, visible_range=None):
+    """
+    Draws a polyline with one of the DASH_PATTERNS, or solid for any other dash_type.
+    """
+    pattern = DASH_PATTERNS.get(dash_type)
+    if pattern is None:
+        draw.line([tuple(point) for point in points], fill=fill, width=width)
+        return
+    draw_dash_segments(draw, dash_segments(points, pattern, phase, visible_range), fill, width)
+
+@lru_cache(maxsize=32)
+def legend_swatch(dash_type, fill, width=2, length=50):
+    """
+    Returns a cached transparent RGBA swatch of a legend line.
+
+    The line starts at (width, width) inside the swatch, so paste it at
+    (x - width, y - width) with itself as the mask to place the line at (x, y).
+    """
+    swatch = Image.new('RGBA', (length + 2 * width + 1, 2 * width + 1), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(swatch)
+    draw_dashed_polyline(draw, [(width, width), (width + length, width)], fill=fill, width=width, dash_type=dash_type)
+    return swatch
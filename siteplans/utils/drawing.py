@@ -1,24 +1,115 @@
 # siteplans/utils/drawing.py
 
 import math
-from PIL import Image, ImageDraw, ImageFont
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Tuple
+import numpy as np
+from django.conf import settings
+from PIL import Image, ImageColor, ImageDraw
 from io import BytesIO
 import base64
-from .zoning import ALL_CITY_ZONINGS
+from .dashes import draw_dashed_polyline, legend_swatch
+from .offset import edge_sides, inset_polygon, normalize_ring
+from .profiling import render_profile, stage
+from .resources import get_render_resources
+from .simplify import declutter_boxes, simplify_polyline
+from .traverse import traverse_from_boundary_points
+from . import zoning
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def get_city_zoning(city_name):
+DEFAULT_MAX_CANVAS_PIXELS = 16_000_000  # about 48 MB as RGB, 16 MB compact
+LABEL_PADDING = 200  # pixels; keeps labels that start just outside a tile
+LEGEND_SPACING = 30  # pixels between legend rows
+LEGEND_TEXT_X = 62  # pixels from a legend tile's left edge to its labels
+MARKER_RADIUS = 5  # pixels; vertex markers span 2 * MARKER_RADIUS + 1
+
+class CanvasTooLargeError(ValueError):
+    """
+    Raised when a full render would allocate more pixels than allowed.
+    """
+
+# Line style of the boundary, and of each easement kind (indexed by zoning kind)
+BOUNDARY_STYLE = {'style': 'solid', 'color': 'black'}
+EASEMENT_STYLES = (
+    {'style': 'dotted', 'color': 'green'},  # zoning.LANDSCAPE_SETBACK
+    {'style': 'dashed', 'color': 'orange'},  # zoning.LANDSCAPE_EASEMENT
+    {'style': 'dashdot', 'color': 'blue'},  # zoning.UTILITY_EASEMENT
+)
+
+# Every color the renderer draws with; compact canvases index into this
+# palette, so the background (white) comes first
+RASTER_PALETTE = ('white', 'black', 'red', 'blue', 'green', 'orange')
+_PALETTE_DATA = [channel for name in RASTER_PALETTE for channel in ImageColor.getrgb(name)]
+
+# Supported encodings for rendered plans, keyed by Pillow format name
+IMAGE_CONTENT_TYPES = {
+    'PNG': 'image/png',
+    'WEBP': 'image/webp',
+}
+
+@dataclass(frozen=True)
+class RenderOptions:
+    """
+    Canvas mode, level of detail and encoder settings for raster renders
+    (see the SITEPLANS_RENDER_OPTIONS setting).
+    """
+    compact: bool = True  # draw into a one-byte-per-pixel 'P' canvas over RASTER_PALETTE instead of RGB
+    simplify_tolerance: float = 0.5  # pixels lines may deviate when dropping vertices; 0 draws every vertex
+    declutter: bool = True  # skip vertex markers and labels that would overlap earlier ones
+    marker_sprites: bool = False  # stamp vertex markers from cached masks instead of drawing each ellipse
+    png_compress_level: int = 6  # zlib level, 0 (fastest) to 9 (smallest)
+    png_optimize: bool = False  # search zlib settings for the smallest file; slower
+    webp_lossless: bool = True
+    webp_quality: int = 80  # lossy quality, or compression effort when lossless
+    webp_method: int = 4  # 0 (fastest) to 6 (smallest)
+
+def get_render_options():
+    """
+    Returns the RenderOptions configured by SITEPLANS_RENDER_OPTIONS.
+    """
+    return RenderOptions(**getattr(settings, 'SITEPLANS_RENDER_OPTIONS', {}))
+
+def new_canvas(size, options):
+    """
+    Returns a white canvas: indexed over RASTER_PALETTE when options.compact, RGB otherwise.
+
+    Drawing on the indexed canvas takes the same color names; lines and text
+    are not antialiased there, as every pixel must be one of the palette colors.
+    """
+    if not options.compact:
+        return Image.new('RGB', size, color='white')
+    img = Image.new('P', size, 0)
+    img.putpalette(_PALETTE_DATA)
+    return img
+
+def get_city_zoning(city, zoning_rules=None):
     """
     Retrieve zoning rules for the given city.
+
+    Parameters:
+    - city: City instance
+    - zoning_rules: Optional mapping of city name to CityZoning; when None the
+      rules come from the database through the process-local zoning cache
+
+    Returns:
+    - CityZoning instance, or None if the city has no zoning rules
     """
-    for zoning in ALL_CITY_ZONINGS:
-        if zoning.city_name.lower() == city_name.lower():
-            return zoning
-    logger.warning(f"No zoning rules found for city: {city_name}")
-    return None
+    if zoning_rules is None:
+        return zoning.get_city_zoning(city)
+
+    city_zoning = zoning_rules.get(city.name)
+    if city_zoning is None:
+        city_zoning = next(
+            (z for z in zoning_rules.values() if z.city_name.lower() == city.name.lower()),
+            None,
+        )
+    if city_zoning is None:
+        logger.warning(f"No zoning rules found for city: {city.name}")
+    return city_zoning
 
 def quadrant_to_azimuth(direction1, direction2, angle_deg, angle_min, angle_sec):
     """
@@ -47,42 +138,75 @@ def quadrant_to_azimuth(direction1, direction2, angle_deg, angle_min, angle_sec)
 
     return azimuth % 360
 
-def apply_zoning_rules(site_plan, boundary_points, city_zoning):
+def apply_zoning_rules(city_zoning):
+    """
+    Returns the city's zoning compiled into a table of distances by easement
+    kind and boundary side (see zoning.compile_zoning).
+
+    The table is built once per CityZoning, so repeated renders for a city
+    reuse it.
+    """
+    return city_zoning.compiled
+
+def easement_label(easement_type, distances):
     """
-    Applies zoning rules to determine setbacks and easements based on boundary directions.
+    Returns e.g. 'Utility Easement 10.0ft', or a range when the sides differ.
     """
+    lengths = sorted({distance for distance in distances.values() if distance > 0})
+    if len(lengths) == 1:
+        return f"{easement_type} {lengths[0]}ft"
+    return f"{easement_type} {lengths[0]}-{lengths[-1]}ft"
+
+def place_easements(points, compiled_zoning):
+    """
+    Insets the boundary by every setback and easement.
+
+    Each edge counts as the N, E, S or W boundary by the side of the parcel
+    it faces and moves inward by that side's distance (see
+    offset.inset_polygon), so every kind yields closed rings inside the
+    boundary rather than one offset per course.
+
+    Parameters:
+    - points: Boundary vertices in feet, in traverse order
+    - compiled_zoning: Output of apply_zoning_rules
+
+    Returns:
+    - List of easement dicts: 'kind' (zoning kind), 'type' (its name),
+      'length' (largest distance), 'distances' (by side), 'rings' (closed
+      (k, 2) arrays; empty when the setback swallows the parcel), 'label'
+      and 'label_point' (None without rings)
+    """
+    ring = normalize_ring(points)
+    if len(ring) < 3:
+        logger.warning("Boundary encloses no area; skipping setbacks and easements")
+        return []
+    # Distances of every kind along every edge in one lookup
+    edge_offsets = compiled_zoning.offsets[:, edge_sides(ring)]
+
     easements = []
-    for bp in boundary_points:
-        # Find the zoning rule for the current boundary direction
-        rule = city_zoning.rules.get(bp.direction2.upper())
-        if not rule:
-            logger.warning(f"No zoning rule found for boundary direction: {bp.direction2}")
-            continue  # No zoning rule found for this boundary
-
-        # Apply setbacks
-        if rule.setback_landscape > 0:
-            easements.append({
-                'boundary_direction': bp.direction2.upper(),
-                'type': 'Landscape Setback',
-                'length': rule.setback_landscape
-            })
-
-        # Apply easements
-        if rule.easement_landscape > 0:
-            easements.append({
-                'boundary_direction': bp.direction2.upper(),
-                'type': 'Landscape Easement',
-                'length': rule.easement_landscape
-            })
-        if rule.easement_utility > 0:
-            easements.append({
-                'boundary_direction': bp.direction2.upper(),
-                'type': 'Utility Easement',
-                'length': rule.easement_utility
-            })
+    for kind in compiled_zoning.kinds:
+        easement_type = zoning.EASEMENT_NAMES[kind]
+        distances = dict(zip(zoning.BOUNDARY_SIDES, compiled_zoning.offsets[kind].tolist()))
+        rings = inset_polygon(ring, edge_offsets[kind])
+        if not rings:
+            logger.info(f"{easement_type} leaves no buildable area")
+        # Label the northernmost vertex, where the rings of different kinds stay apart
+        label_point = None
+        if rings:
+            largest = max(rings, key=len)
+            label_point = tuple(largest[np.argmax(largest[:, 1])].tolist())
+        easements.append({
+            'kind': kind,
+            'type': easement_type,
+            'length': max(distances.values()),
+            'distances': distances,
+            'rings': rings,
+            'label': easement_label(easement_type, distances),
+            'label_point': label_point,
+        })
     return easements
 
-def draw_dashed_line(draw, start, end, fill, width, dash_type):
+def draw_dashed_line(draw, start, end, fill, width, dash_type, visible_range=None):
     """
     Draws dashed or dotted lines on the image.
 
@@ -93,291 +217,385 @@ def draw_dashed_line(draw, start, end, fill, width, dash_type):
     - fill: Color of the line
     - width: Width of the line
     - dash_type: 'dotted', 'dashed', or 'dashdot'
+    - visible_range: Optional (from, to) distances along the line; dashes
+      outside it are skipped, keeping the dash phase anchored at start
     """
-    x1, y1 = start
-    x2, y2 = end
-
-    if dash_type == 'dotted':
-        dash_length = 5
-        gap_length = 5
-        pattern = [dash_length, gap_length]
-    elif dash_type == 'dashed':
-        dash_length = 10
-        gap_length = 5
-        pattern = [dash_length, gap_length]
-    elif dash_type == 'dashdot':
-        dash_length = 15
-        gap_length = 5
-        pattern = [dash_length, gap_length, dash_length // 3, gap_length]
-    else:
-        pattern = None
-
-    if pattern:
-        total_length = math.hypot(x2 - x1, y2 - y1)
-        angle = math.atan2(y2 - y1, x2 - x1)
-        cos_angle = math.cos(angle)
-        sin_angle = math.sin(angle)
-
-        pos = 0
-        while pos < total_length:
-            for segment_length in pattern:
-                if pos >= total_length:
-                    break
-                current_dash = min(segment_length, total_length - pos)
-                x_start = x1 + cos_angle * pos
-                y_start = y1 + sin_angle * pos
-                x_end = x1 + cos_angle * (pos + current_dash)
-                y_end = y1 + sin_angle * (pos + current_dash)
-                draw.line([(x_start, y_start), (x_end, y_end)], fill=fill, width=width)
-                pos += segment_length
-    else:
-        draw.line([start, end], fill=fill, width=width)
+    draw_dashed_polyline(draw, [start, end], fill=fill, width=width, dash_type=dash_type, visible_range=visible_range)
 
-def add_legend(draw, margin, font):
+def polyline_visible_range(points, bounds):
     """
-    Adds a legend to the image explaining line styles.
+    Clips a polyline to a rectangle (Liang-Barsky on every segment at once).
 
     Parameters:
-    - draw: ImageDraw.Draw object
-    - margin: Margin in pixels
-    - font: ImageFont object
+    - points: Polyline vertices (x, y)
+    - bounds: (left, top, right, bottom)
+
+    Returns:
+    - (from, to) distances along the polyline spanning every part inside
+      bounds, or None if it misses
+    """
+    points = np.asarray(points, dtype=float)
+    starts, deltas = points[:-1], np.diff(points, axis=0)
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+    travelled = np.concatenate(([0.0], np.cumsum(lengths)))
+    left, top, right, bottom = bounds
+    t0, t1 = np.zeros(len(deltas)), np.ones(len(deltas))
+    missed = np.zeros(len(deltas), dtype=bool)
+    for p, q in (
+        (-deltas[:, 0], starts[:, 0] - left), (deltas[:, 0], right - starts[:, 0]),
+        (-deltas[:, 1], starts[:, 1] - top), (deltas[:, 1], bottom - starts[:, 1]),
+    ):
+        missed |= (p == 0) & (q < 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = q / p
+        t0 = np.where(p < 0, np.maximum(t0, t), t0)
+        t1 = np.where(p > 0, np.minimum(t1, t), t1)
+    hits = np.flatnonzero(~missed & (t0 <= t1))
+    if not len(hits):
+        return None
+    first, last = hits[0], hits[-1]
+    return (float(travelled[first] + t0[first] * lengths[first]), float(travelled[last] + t1[last] * lengths[last]))
+
+def render_legend_tile(font):
     """
-    legend_x = margin + 10
-    legend_y = margin + 10
-    legend_spacing = 30
+    Rasterizes the legend explaining line styles onto a transparent RGBA tile.
 
+    The legend never changes between renders, so the render resources keep
+    one tile per process and add_legend pastes it (see resources).
+    """
     legend_items = [
-        {'type': 'Boundary', 'style': 'solid', 'color': 'black'},
-        {'type': 'Landscape Setback', 'style': 'dotted', 'color': 'green'},
-        {'type': 'Landscape Easement', 'style': 'dashed', 'color': 'orange'},
-        {'type': 'Utility Easement', 'style': 'dashdot', 'color': 'blue'},
+        {'type': 'Boundary', **BOUNDARY_STYLE},
+        *({'type': name, **style} for name, style in zip(zoning.EASEMENT_NAMES, EASEMENT_STYLES)),
     ]
-
+    # Rows are LEGEND_SPACING apart; each label starts 10 pixels above its line,
+    # whose swatch spans rows 8 to 13
+    text_boxes = [font.getbbox(item['type']) for item in legend_items]
+    width = LEGEND_TEXT_X + max(box[2] for box in text_boxes) + 2
+    height = max(idx * LEGEND_SPACING + max(box[3], 13) for idx, box in enumerate(text_boxes))
+    tile = Image.new('RGBA', (width, height), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(tile)
     for idx, item in enumerate(legend_items):
-        y_position = legend_y + idx * legend_spacing
-        start = (legend_x, y_position)
-        end = (legend_x + 50, y_position)
-        if item['style'] in ['dotted', 'dashed', 'dashdot']:
-            draw_dashed_line(draw, start, end, fill=item['color'], width=2, dash_type=item['style'])
-        else:
-            draw.line([start, end], fill=item['color'], width=2)
-        
-        # Add text
-        draw.text((legend_x + 60, y_position - 10), item['type'], fill='black', font=font)
+        top = idx * LEGEND_SPACING
+        swatch = legend_swatch(item['style'], item['color'], width=2, length=50)
+        tile.alpha_composite(swatch, (0, top + 8))
+        draw.text((LEGEND_TEXT_X, top), item['type'], fill='black', font=font)
+    return tile
 
-def calculate_offset_point(x, y, offset_distance, azimuth):
+def palettize_legend_tile(tile):
     """
-    Calculates a new point offset from (x, y) by offset_distance in the direction of azimuth.
-
-    Parameters:
-    - x, y: Original coordinates
-    - offset_distance: Distance to offset (in pixels)
-    - azimuth: Angle in degrees (0-360)
+    Maps an RGBA legend tile onto RASTER_PALETTE for compact canvases.
 
     Returns:
-    - Tuple (new_x, new_y)
+    - Tuple (tile in 'P' mode, 'L' mask). Antialiasing lives in the tile's
+      alpha only, so its colors map exactly and the mask keeps the mostly
+      opaque pixels
     """
-    rad = math.radians(azimuth)
-    new_x = x + offset_distance * math.sin(rad)
-    new_y = y - offset_distance * math.cos(rad)  # Invert y-axis for image coordinates
-    return (new_x, new_y)
+    palette = new_canvas((1, 1), RenderOptions(compact=True))
+    compact_tile = tile.convert('RGB').quantize(palette=palette, dither=Image.Dither.NONE)
+    mask = tile.getchannel('A').point(lambda alpha: 255 if alpha >= 128 else 0)
+    return compact_tile, mask
 
-def generate_site_plan_image(site_plan, boundary_points, zoning_rules, scale=30, ppi=96, margin=100):
+def add_legend(img, margin):
     """
-    Generates a site plan image with boundaries, setbacks, and easements.
+    Pastes the legend tile into the top-left corner inside the margin.
+    """
+    resources = get_render_resources()
+    if img.mode == 'P':
+        img.paste(resources.compact_legend_tile, (margin + 8, margin), resources.compact_legend_mask)
+    else:
+        img.paste(resources.legend_tile, (margin + 8, margin), resources.legend_tile)
+
+@dataclass
+class SitePlanGeometry:
+    points: np.ndarray  # (m + 1, 2) boundary vertices in feet, x east / y north
+    easements: List[dict]  # see place_easements; coordinates in feet
+    bbox: Tuple[float, float, float, float]  # (min_x, min_y, max_x, max_y) of points; easements lie inside
+
+def compute_site_plan_geometry(site_plan, boundary_points, zoning_rules=None):
+    """
+    Computes the boundary and easement geometry shared by every site plan renderer.
 
     Parameters:
     - site_plan: SitePlan instance
-    - boundary_points: QuerySet of BoundaryPoint instances
-    - zoning_rules: List of CityZoning instances
-    - scale: Scale in feet per inch
-    - ppi: Pixels per inch
-    - margin: Margin in pixels
+    - boundary_points: QuerySet or list of BoundaryPoint instances, in traverse order
+    - zoning_rules: Mapping of city name to CityZoning, or None to use the database
 
     Returns:
-    - Base64 encoded PNG image string
+    - SitePlanGeometry in feet, with y pointing north
     """
-    PPF = ppi / scale  # Pixels per foot
-
     # Retrieve zoning for the site_plan's city
-    city_zoning = get_city_zoning(site_plan.city.name)
+    with stage('zoning'):
+        city_zoning = get_city_zoning(site_plan.city, zoning_rules)
     if not city_zoning:
         logger.error(f"No zoning rules found for city: {site_plan.city.name}")
         raise ValueError(f"No zoning rules found for city: {site_plan.city.name}")
 
-    # Initialize starting point
-    current_x, current_y = 0, 0
-    points = [(current_x, current_y)]
-
-    # Track min and max coordinates for dynamic sizing
-    min_x, min_y = current_x, current_y
-    max_x, max_y = current_x, current_y
-
-    # Plot boundaries
-    for bp in boundary_points:
-        try:
-            azimuth = quadrant_to_azimuth(
-                bp.direction1,
-                bp.direction2,
-                bp.angle_degrees,
-                bp.angle_minutes,
-                bp.angle_seconds
-            )
-            logger.debug(f"Boundary Point {bp.id}: Azimuth={azimuth}")
-        except ValueError as e:
-            logger.error(f"Error converting azimuth for Boundary Point {bp.id}: {e}")
-            continue  # Skip this boundary point
-
-        rad = math.radians(azimuth)
-        delta_x = bp.length * PPF * math.sin(rad)
-        delta_y = -bp.length * PPF * math.cos(rad)  # Invert y-axis for image coordinates
-
-        new_x = current_x + delta_x
-        new_y = current_y + delta_y
-
-        points.append((new_x, new_y))
+    # Load the boundary points once; everything below works from memory
+    boundary_points = list(boundary_points)
 
-        # Update min and max
-        min_x = min(min_x, new_x)
-        min_y = min(min_y, new_y)
-        max_x = max(max_x, new_x)
-        max_y = max(max_y, new_y)
-
-        # Update current position
-        current_x, current_y = new_x, new_y
+    # Compute the whole traverse in one vectorized pass
+    with stage('traverse'):
+        traverse = traverse_from_boundary_points(boundary_points)
 
     # Apply zoning rules to determine setbacks and easements
-    easement_objs = apply_zoning_rules(site_plan, boundary_points, city_zoning)
-
-    # Calculate positions for easements and setbacks based on boundaries
-    easement_points = []
-    for easement in easement_objs:
-        # Find the boundary point corresponding to the easement's boundary direction
-        bp = boundary_points.filter(direction2=easement['boundary_direction']).first()
-        if not bp:
-            logger.warning(f"No boundary point found for easement direction: {easement['boundary_direction']}")
-            continue  # Skip if no boundary point found
-
-        try:
-            azimuth = quadrant_to_azimuth(
-                bp.direction1,
-                bp.direction2,
-                bp.angle_degrees,
-                bp.angle_minutes,
-                bp.angle_seconds
-            )
-        except ValueError as e:
-            logger.error(f"Error converting azimuth for Easement {easement['type']}: {e}")
-            continue  # Skip this easement
+    with stage('zoning'):
+        easement_objs = apply_zoning_rules(city_zoning)
 
-        # Offset distance in pixels
-        offset_distance = easement['length'] * PPF
+    # Inset the boundary by each setback and easement
+    with stage('easements'):
+        easements = place_easements(traverse.points, easement_objs)
 
-        # Calculate the perpendicular azimuth (for setbacks and easements)
-        perp_azimuth = (azimuth + 90) % 360
+    return SitePlanGeometry(points=traverse.points, easements=easements, bbox=traverse.bbox)
 
-        # Calculate the offset point (inner boundary)
-        inner_start = calculate_offset_point(current_x, current_y, offset_distance, perp_azimuth)
+def shift_easement(easement, to_pixel):
+    """
+    Returns the drawing fields of an easement with its rings and label point in pixels.
+    """
+    label_point = easement['label_point']
+    return {
+        'kind': easement['kind'],
+        'type': easement['type'],
+        'rings': [[to_pixel(x, y) for x, y in ring.tolist()] for ring in easement['rings']],
+        'label': easement['label'],
+        'label_point': to_pixel(*label_point) if label_point is not None else None,
+    }
+
+@lru_cache(maxsize=4)
+def marker_sprite(radius=MARKER_RADIUS):
+    """
+    Returns cached (outline, fill) masks of a vertex marker.
 
-        inner_end = calculate_offset_point(inner_start[0], inner_start[1], offset_distance, perp_azimuth)
-        
-        # Label Easement
-        easement_label = f"{easement['type']} {easement['length']}ft"
+    Stamping the masks with ImageDraw.bitmap sets exactly the pixels of
+    draw.ellipse((x - radius, y - radius, x + radius, y + radius)), at the
+    cost of a blit instead of a rasterized ellipse.
+    """
+    size = 2 * radius + 1
+    shape = Image.new('L', (size, size), 0)
+    ImageDraw.Draw(shape).ellipse((0, 0, 2 * radius, 2 * radius), fill=1, outline=2)
+    return shape.point(lambda value: 255 if value == 2 else 0), shape.point(lambda value: 255 if value == 1 else 0)
 
-        easement_points.append({
-            'type': easement['type'],
-            'start': inner_start,
-            'end': inner_end,
-            'label': easement_label
-        })
+def visible_markers(shifted_points, label_font, declutter=True):
+    """
+    Picks the vertex markers and labels worth drawing at the current scale.
 
-        # Update min and max for image sizing
-        min_x = min(min_x, inner_start[0], inner_end[0])
-        min_y = min(min_y, inner_start[1], inner_end[1])
-        max_x = max(max_x, inner_start[0], inner_end[0])
-        max_y = max(max_y, inner_start[1], inner_end[1])
+    Parameters:
+    - shifted_points: Boundary vertices in pixels, in traverse order
+    - label_font: Font of the 'P{idx}' labels
+    - declutter: Drop markers overlapping an earlier marker, and labels
+      overlapping an earlier label; otherwise keep every one
 
-    # Determine image size with margins
-    width = int(math.ceil(max_x - min_x)) + 2 * margin
-    height = int(math.ceil(max_y - min_y)) + 2 * margin
+    Returns:
+    - Tuple (marker indices, label indices) into shifted_points
+    """
+    indices = list(range(len(shifted_points)))
+    if not declutter:
+        return indices, indices
+    markers = declutter_boxes([
+        (x - MARKER_RADIUS, y - MARKER_RADIUS, x + MARKER_RADIUS + 1, y + MARKER_RADIUS + 1)
+        for x, y in shifted_points
+    ])
+    label_boxes = []
+    for idx in markers:
+        x, y = shifted_points[idx]
+        left, top, right, bottom = label_font.getbbox(f"P{idx}")
+        label_boxes.append((x + 10 + left, y - 10 + top, x + 10 + right, y - 10 + bottom))
+    labels = [markers[i] for i in declutter_boxes(label_boxes)]
+    return markers, labels
+
+def draw_site_plan_features(draw, shifted_points, shifted_easements, bounds=None, options=None):
+    """
+    Draws the boundary, easements, labels and vertex markers in pixel coordinates.
 
-    # Shift points to fit within the image with margins
-    shifted_points = [(
-        int(x - min_x) + margin,
-        int(y - min_y) + margin
-    ) for (x, y) in points]
-
-    # Shift easement points and add labels
-    shifted_easements = []
-    for easement in easement_points:
-        shifted_start = (
-            int(easement['start'][0] - min_x) + margin,
-            int(easement['start'][1] - min_y) + margin
-        )
-        shifted_end = (
-            int(easement['end'][0] - min_x) + margin,
-            int(easement['end'][1] - min_y) + margin
+    Lines are simplified to options.simplify_tolerance pixels first, so
+    courses and chords much shorter than a pixel cost no drawing calls.
+
+    Parameters:
+    - draw: ImageDraw.Draw object
+    - shifted_points: Boundary vertices in pixels
+    - shifted_easements: Easement dicts with pixel 'rings' and 'label_point'
+    - bounds: Optional (left, top, right, bottom) visible pixel region; features
+      outside it are skipped (used for tiles)
+    - options: RenderOptions; defaults to get_render_options()
+    """
+    def visible(x, y):
+        return bounds is None or (
+            bounds[0] - LABEL_PADDING <= x <= bounds[2] + LABEL_PADDING
+            and bounds[1] - LABEL_PADDING <= y <= bounds[3] + LABEL_PADDING
         )
-        shifted_easements.append({
-            'type': easement['type'],
-            'start': shifted_start,
-            'end': shifted_end,
-            'label': easement['label']
-        })
 
-    # Create Image
-    img = Image.new('RGB', (width, height), color='white')
-    draw = ImageDraw.Draw(img)
+    def simplified(points):
+        return [points[i] for i in simplify_polyline(points, options.simplify_tolerance).tolist()]
+
+    options = options or get_render_options()
+    label_font = get_render_resources().label_font
 
     # Draw outer boundaries
-    draw.line(shifted_points, fill='black', width=3)
+    draw.line(simplified(shifted_points), fill='black', width=3)
 
     # Draw easements and setbacks as inner boundaries
     for easement in shifted_easements:
-        if 'Setback' in easement['type']:
-            line_style = 'dotted'
-            fill = 'green'
-        elif 'Easement' in easement['type']:
-            if 'Landscape' in easement['type']:
-                line_style = 'dashed'
-                fill = 'orange'
-            elif 'Utility' in easement['type']:
-                line_style = 'dashdot'
-                fill = 'blue'
+        style = EASEMENT_STYLES[easement['kind']]
+        line_style, fill = style['style'], style['color']
+
+        for ring in easement['rings']:
+            ring = simplified(ring)
+            if line_style in ['dotted', 'dashed', 'dashdot']:
+                visible_range = None
+                if bounds is not None:
+                    visible_range = polyline_visible_range(ring, bounds)
+                if bounds is None or visible_range is not None:
+                    draw_dashed_polyline(draw, ring, fill=fill, width=2, dash_type=line_style, visible_range=visible_range)
             else:
-                line_style = 'solid'
-                fill = 'gray'
-        else:
-            line_style = 'solid'
-            fill = 'gray'
-
-        if line_style in ['dotted', 'dashed', 'dashdot']:
-            draw_dashed_line(draw, easement['start'], easement['end'], fill=fill, width=2, dash_type=line_style)
-        else:
-            draw.line([easement['start'], easement['end']], fill=fill, width=2)
+                draw.line(ring, fill=fill, width=2)
 
         # Draw label for easement
-        label_x, label_y = (easement['start'][0] + 10, easement['start'][1] - 10)
-        draw.text((label_x, label_y), easement['label'], fill='black', font=ImageFont.load_default())
+        if easement['label_point'] is None:
+            continue
+        label_x, label_y = (easement['label_point'][0] + 10, easement['label_point'][1] - 10)
+        if visible(label_x, label_y):
+            draw.text((label_x, label_y), easement['label'], fill='black', font=label_font)
 
     # Add markers for each boundary point for debugging (optional)
-    for idx, (x, y) in enumerate(shifted_points):
-        draw.ellipse((x-5, y-5, x+5, y+5), fill='red', outline='black')
-        draw.text((x + 10, y - 10), f"P{idx}", fill='blue', font=ImageFont.load_default())
+    markers, labels = visible_markers(shifted_points, label_font, options.declutter)
+    outline_mask, fill_mask = marker_sprite()
+    for idx in markers:
+        x, y = shifted_points[idx]
+        if not visible(x, y):
+            continue
+        if options.marker_sprites:
+            draw.bitmap((x - MARKER_RADIUS, y - MARKER_RADIUS), outline_mask, fill='black')
+            draw.bitmap((x - MARKER_RADIUS, y - MARKER_RADIUS), fill_mask, fill='red')
+        else:
+            draw.ellipse((x - MARKER_RADIUS, y - MARKER_RADIUS, x + MARKER_RADIUS, y + MARKER_RADIUS), fill='red', outline='black')
+    for idx in labels:
+        x, y = shifted_points[idx]
+        if visible(x, y):
+            draw.text((x + 10, y - 10), f"P{idx}", fill='blue', font=label_font)
+
+def site_plan_canvas_size(geometry, scale=30, ppi=96, margin=100):
+    """
+    Returns the (width, height) in pixels of a full render of the geometry.
+
+    Only geometry.bbox is read, so a Traverse sizes the canvas as well.
+    """
+    PPF = ppi / scale  # Pixels per foot
+    width = int(math.ceil(geometry.bbox[2] * PPF - geometry.bbox[0] * PPF)) + 2 * margin
+    height = int(math.ceil(-geometry.bbox[1] * PPF + geometry.bbox[3] * PPF)) + 2 * margin
+    return width, height
+
+def canvas_transform(geometry, scale=30, ppi=96, margin=100):
+    """
+    Returns a function mapping (x, y) in feet to integer pixels on the full canvas.
+    """
+    PPF = ppi / scale  # Pixels per foot
+
+    # Pixel origin; the y-axis is inverted for image coordinates
+    min_x, min_y = geometry.bbox[0] * PPF, -geometry.bbox[3] * PPF
+
+    def to_pixel(x, y):
+        return (int(x * PPF - min_x) + margin, int(-y * PPF - min_y) + margin)
+    return to_pixel
+
+def get_max_canvas_pixels():
+    return getattr(settings, 'SITEPLANS_MAX_CANVAS_PIXELS', DEFAULT_MAX_CANVAS_PIXELS)
+
+def canvas_exceeds_limit(width, height):
+    """
+    Returns True if a full render of this size must fall back to tiles.
+    """
+    return width * height > get_max_canvas_pixels()
+
+def render_site_plan(site_plan, boundary_points, zoning_rules=None, scale=30, ppi=96, margin=100, options=None):
+    """
+    Renders a site plan with boundaries, setbacks, and easements.
 
-    # Add a legend
-    try:
-        font = ImageFont.truetype("arial.ttf", 20)
-    except IOError:
-        font = ImageFont.load_default()
-        logger.warning("Arial font not found. Using default font.")
+    Parameters:
+    - site_plan: SitePlan instance
+    - boundary_points: QuerySet or list of BoundaryPoint instances, in traverse order
+    - zoning_rules: Mapping of city name to CityZoning, or None to use the database
+    - scale: Scale in feet per inch
+    - ppi: Pixels per inch
+    - margin: Margin in pixels
+    - options: RenderOptions; defaults to get_render_options()
+
+    Returns:
+    - PIL Image in P mode (compact) or RGB mode
+
+    Raises:
+    - CanvasTooLargeError if the canvas exceeds SITEPLANS_MAX_CANVAS_PIXELS
+    """
+    geometry = compute_site_plan_geometry(site_plan, boundary_points, zoning_rules)
+    to_pixel = canvas_transform(geometry, scale, ppi, margin)
+
+    # Determine image size with margins
+    width, height = site_plan_canvas_size(geometry, scale, ppi, margin)
+
+    # Shift points to fit within the image with margins
+    shifted_points = [to_pixel(x, y) for x, y in geometry.points.tolist()]
+
+    # Shift easement rings and label points
+    shifted_easements = [shift_easement(easement, to_pixel) for easement in geometry.easements]
+
+    if canvas_exceeds_limit(width, height):
+        raise CanvasTooLargeError(
+            f"Site plan canvas of {width}x{height} pixels exceeds the {get_max_canvas_pixels()} pixel limit; use tiles instead."
+        )
+
+    with stage('rasterize'):
+        # Create Image
+        options = options or get_render_options()
+        img = new_canvas((width, height), options)
+        draw = ImageDraw.Draw(img)
+        draw_site_plan_features(draw, shifted_points, shifted_easements, options=options)
 
-    add_legend(draw, margin, font)
+        # Add a legend
+        add_legend(img, margin)
 
-    # Convert image to base64
-    buffered = BytesIO()
-    img.save(buffered, format="PNG")
-    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return img
 
-    return img_str
+def encode_image(img, image_format='PNG', options=None):
+    """
+    Encodes a rendered site plan into image file bytes.
+
+    Compact canvases are written as palette PNGs (4 bits per pixel); WebP
+    always stores full color.
+
+    Parameters:
+    - img: PIL Image returned by render_site_plan
+    - image_format: 'PNG' or 'WEBP'
+    - options: RenderOptions with the encoder settings; defaults to get_render_options()
+
+    Returns:
+    - Encoded image bytes
+    """
+    image_format = image_format.upper()
+    if image_format not in IMAGE_CONTENT_TYPES:
+        raise ValueError(f"Unsupported image format: {image_format}")
+    options = options or get_render_options()
+
+    with stage('encode'):
+        buffered = BytesIO()
+        if image_format == 'WEBP':
+            img.save(
+                buffered, format='WEBP', lossless=options.webp_lossless,
+                quality=options.webp_quality, method=options.webp_method,
+            )
+        else:
+            img.save(buffered, format='PNG', compress_level=options.png_compress_level, optimize=options.png_optimize)
+        return buffered.getvalue()
+
+def generate_site_plan_image(site_plan, boundary_points, zoning_rules=None, scale=30, ppi=96, margin=100):
+    """
+    Generates a site plan image with boundaries, setbacks, and easements.
+
+    Takes the same parameters as render_site_plan.
+
+    Returns:
+    - Base64 encoded PNG image string
+    """
+    with render_profile('generate_site_plan_image'):
+        img = render_site_plan(site_plan, boundary_points, zoning_rules, scale, ppi, margin)
+        png = encode_image(img, 'PNG')
+        with stage('base64'):
+            return base64.b64encode(png).decode()
 
@@ -0,0 +1,77 @@
+# siteplans/utils/dxf.py
+
+import io
+import logging
+import ezdxf
+from ezdxf import units
+from .drawing import compute_site_plan_geometry
+from .profiling import stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DXF_CONTENT_TYPE = 'image/vnd.dxf'
+
+# Layer per line type; linetypes come from ezdxf's standard setup, colors are AutoCAD color indices
+BOUNDARY_LAYER = {'name': 'BOUNDARY', 'linetype': 'CONTINUOUS', 'color': 7}
+EASEMENT_LAYERS = (
+    {'name': 'LANDSCAPE_SETBACK', 'linetype': 'DOT', 'color': 3},  # zoning.LANDSCAPE_SETBACK
+    {'name': 'LANDSCAPE_EASEMENT', 'linetype': 'DASHED', 'color': 30},  # zoning.LANDSCAPE_EASEMENT
+    {'name': 'UTILITY_EASEMENT', 'linetype': 'DASHDOT', 'color': 5},  # zoning.UTILITY_EASEMENT
+)
+LABEL_LAYER = {'name': 'LABELS', 'linetype': 'CONTINUOUS', 'color': 7}
+
+def generate_site_plan_dxf(site_plan, boundary_points, zoning_rules=None, text_height=2.5, linetype_scale=5.0):
+    """
+    Generates a DXF drawing of the site plan in feet.
+
+    Uses the same geometry as render_site_plan: the boundary polyline, setback
+    and easement offset lines on their own layers with linetypes, plus vertex
+    and easement labels.
+
+    Parameters:
+    - site_plan: SitePlan instance
+    - boundary_points: QuerySet or list of BoundaryPoint instances, in traverse order
+    - zoning_rules: Mapping of city name to CityZoning, or None to use the database
+    - text_height: Label height in feet
+    - linetype_scale: Global linetype scale ($LTSCALE) so dashes read at plan scale
+
+    Returns:
+    - DXF file bytes
+    """
+    geometry = compute_site_plan_geometry(site_plan, boundary_points, zoning_rules)
+
+    with stage('dxf'):
+        doc = ezdxf.new('R2010', setup=True)
+        doc.units = units.FT
+        doc.header['$LTSCALE'] = linetype_scale
+        for layer in [BOUNDARY_LAYER, *EASEMENT_LAYERS, LABEL_LAYER]:
+            doc.layers.add(layer['name'], color=layer['color'], linetype=layer['linetype'])
+
+        msp = doc.modelspace()
+        boundary_layer = BOUNDARY_LAYER['name']
+        label_layer = LABEL_LAYER['name']
+
+        # Outer boundary and vertex labels
+        points = geometry.points.tolist()
+        msp.add_lwpolyline(points, dxfattribs={'layer': boundary_layer})
+        for idx, (x, y) in enumerate(points):
+            msp.add_text(f"P{idx}", height=text_height, dxfattribs={'layer': label_layer}).set_placement(
+                (x + text_height, y + text_height)
+            )
+
+        # Setbacks and easements
+        for easement in geometry.easements:
+            layer = EASEMENT_LAYERS[easement['kind']]['name']
+            for ring in easement['rings']:
+                msp.add_lwpolyline(ring[:-1].tolist(), close=True, dxfattribs={'layer': layer})
+            if easement['label_point'] is None:
+                continue
+            start_x, start_y = easement['label_point']
+            msp.add_text(easement['label'], height=text_height, dxfattribs={'layer': label_layer}).set_placement(
+                (start_x + text_height, start_y + text_height)
+            )
+
+        stream = io.StringIO()
+        doc.write(stream)
+        return stream.getvalue().encode('utf-8')
@@ -0,0 +1,61 @@
+# siteplans/utils/geometry_json.py
+
+import json
+import logging
+import numpy as np
+from .dashes import DASH_PATTERNS
+from .drawing import BOUNDARY_STYLE, EASEMENT_STYLES, compute_site_plan_geometry
+from .profiling import stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+GEOMETRY_CONTENT_TYPE = 'application/json'
+GEOMETRY_DECIMALS = 2  # hundredths of a foot, the precision of the survey lengths
+
+def _packed(points):
+    # Flat [x0, y0, x1, y1, ...] list in feet
+    return np.round(np.asarray(points, dtype=float), GEOMETRY_DECIMALS).ravel().tolist()
+
+def _style(style):
+    return {'color': style['color'], 'dash': list(DASH_PATTERNS.get(style['style'], ()))}
+
+def geometry_payload(geometry):
+    """
+    Returns the JSON-ready form of a SitePlanGeometry for client-side renderers.
+
+    Coordinates are in feet with y pointing north, packed as flat
+    [x0, y0, x1, y1, ...] arrays. Styles come from the same tables as the
+    raster renderer; 'dash' is the on/off pattern in pixels, empty for solid lines.
+    """
+    return {
+        'bbox': [round(value, GEOMETRY_DECIMALS) for value in geometry.bbox],
+        'points': _packed(geometry.points),
+        'easements': [
+            {
+                'kind': easement['kind'],
+                'type': easement['type'],
+                'label': easement['label'],
+                'label_point': _packed(easement['label_point']) if easement['label_point'] is not None else None,
+                'rings': [_packed(ring[:-1]) for ring in easement['rings']],
+            }
+            for easement in geometry.easements
+        ],
+        'styles': {
+            'boundary': _style(BOUNDARY_STYLE),
+            'easements': [_style(style) for style in EASEMENT_STYLES],
+        },
+    }
+
+def site_plan_geometry_json(site_plan, boundary_points, zoning_rules=None):
+    """
+    Returns the geometry of a site plan as compact JSON bytes (see geometry_payload).
+
+    Parameters:
+    - site_plan: SitePlan instance; it need not be saved
+    - boundary_points: QuerySet or list of BoundaryPoint instances, in traverse order
+    - zoning_rules: Mapping of city name to CityZoning, or None to use the database
+    """
+    geometry = compute_site_plan_geometry(site_plan, boundary_points, zoning_rules)
+    with stage('encode'):
+        return json.dumps(geometry_payload(geometry), separators=(',', ':')).encode()
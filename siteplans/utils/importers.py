@@ -0,0 +1,369 @@
+# siteplans/utils/importers.py
+
+import csv
+import io
+import logging
+import math
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import List, Tuple
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from ..models import City, SitePlan, BoundaryPoint
+from ..validators import DEFAULT_MAX_COURSES, clean_boundary_point
+from .plan_geometry import refresh_plan_geometries
+from .traverse import azimuth_to_bearing
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_CHUNK_SIZE = 1000  # boundary points per bulk insert
+MAX_REPORTED_ERRORS = 1000
+
+CSV_COLUMNS = [
+    'site_name', 'address', 'city',
+    'direction1', 'angle_degrees', 'angle_minutes', 'angle_seconds', 'direction2', 'length',
+]
+
+@dataclass
+class ImportResult:
+    site_plans: int = 0
+    boundary_points: int = 0
+    error_count: int = 0
+    errors: List[Tuple[str, str]] = field(default_factory=list)  # (location, message), capped at MAX_REPORTED_ERRORS
+    complete: bool = True  # False when a file-level error stopped the import part way through
+    committed_through: str = ''  # location of the last parcel saved; chunks are committed as they are written
+
+    def add_error(self, location, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((location, message))
+
+    def add_file_error(self, location, message):
+        """
+        Records an error that stops the import; parcels through committed_through stay saved.
+        """
+        self.complete = False
+        self.add_error(location, message)
+
+    def as_dict(self):
+        return {
+            'site_plans': self.site_plans,
+            'boundary_points': self.boundary_points,
+            'complete': self.complete,
+            'committed_through': self.committed_through,
+            'error_count': self.error_count,
+            'errors': [{'location': location, 'message': message} for location, message in self.errors],
+        }
+
+class _ChunkedWriter:
+    """
+    Buffers parsed parcels and writes them with bulk inserts, so memory use is
+    bounded by the chunk size rather than the file size.
+    """
+
+    def __init__(self, result, chunk_size, max_courses):
+        self.result = result
+        self.chunk_size = chunk_size
+        self.max_courses = max_courses
+        self.pending = []  # list of (location, SitePlan, [BoundaryPoint])
+        self.pending_points = 0
+
+    def add_parcel(self, location, site_plan, boundary_points):
+        if len(boundary_points) < 2:
+            self.result.add_error(location, "Parcel has fewer than 2 valid boundary points; skipped.")
+            return
+        if len(boundary_points) > self.max_courses:
+            self.result.add_error(location, f"Parcel has more than {self.max_courses} boundary points; skipped.")
+            return
+        self.pending.append((location, site_plan, boundary_points))
+        self.pending_points += len(boundary_points)
+        if self.pending_points >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with transaction.atomic():
+            site_plans = SitePlan.objects.bulk_create([site_plan for _, site_plan, _ in self.pending])
+            boundary_points = []
+            for site_plan, (_, _, points) in zip(site_plans, self.pending):
+                for bp in points:
+                    bp.site_plan = site_plan
+                boundary_points.extend(points)
+            BoundaryPoint.objects.bulk_create(boundary_points, batch_size=self.chunk_size)
+            refresh_plan_geometries(
+                (site_plan, points) for site_plan, (_, _, points) in zip(site_plans, self.pending)
+            )
+        self.result.site_plans += len(site_plans)
+        self.result.boundary_points += len(boundary_points)
+        self.result.committed_through = self.pending[-1][0]
+        self.pending = []
+        self.pending_points = 0
+
+class _CityResolver:
+    def __init__(self, default_city=None):
+        self.default_city = default_city
+        self.cities = {}
+
+    def resolve(self, name):
+        if not name:
+            if self.default_city is None:
+                raise ValidationError("No city given and no default city selected.")
+            return self.default_city
+        key = name.strip().lower()
+        if key not in self.cities:
+            self.cities[key] = City.objects.filter(name__iexact=name.strip()).first()
+        if self.cities[key] is None:
+            raise ValidationError(f"Unknown city: {name}")
+        return self.cities[key]
+
+def _import_settings(chunk_size, max_courses):
+    if chunk_size is None:
+        chunk_size = getattr(settings, 'SITEPLANS_IMPORT_CHUNK_SIZE', DEFAULT_IMPORT_CHUNK_SIZE)
+    if max_courses is None:
+        max_courses = getattr(settings, 'SITEPLANS_MAX_COURSES', DEFAULT_MAX_COURSES)
+    return chunk_size, max_courses
+
+def import_csv(stream, default_city=None, chunk_size=None, max_courses=None):
+    """
+    Stream-imports site plans from a CSV survey file.
+
+    Each row is one course with the columns in CSV_COLUMNS (angle_seconds and
+    city are optional). Consecutive rows with the same site_name, address and
+    city form one parcel, so files must be grouped by parcel.
+
+    Invalid rows are reported and skipped. Undecodable bytes or malformed CSV
+    stop the import with a file-level error; the parcels read completely
+    before it are still saved, and the parcel being read is dropped.
+
+    Parameters:
+    - stream: Binary or text file object
+    - default_city: City used for rows without a city column value
+    - chunk_size: Boundary points per bulk insert
+    - max_courses: Maximum courses per parcel
+
+    Returns:
+    - ImportResult
+    """
+    chunk_size, max_courses = _import_settings(chunk_size, max_courses)
+    if not isinstance(stream, io.TextIOBase):
+        stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    result = ImportResult()
+    writer = _ChunkedWriter(result, chunk_size, max_courses)
+    cities = _CityResolver(default_city)
+
+    reader = csv.DictReader(stream)
+    try:
+        fieldnames = reader.fieldnames or []
+    except (UnicodeDecodeError, csv.Error) as e:
+        result.add_file_error('header', f"Unreadable CSV: {e}")
+        return result
+    missing = {'site_name', 'address', 'direction1', 'angle_degrees', 'angle_minutes', 'direction2', 'length'} - set(fieldnames)
+    if missing:
+        result.add_file_error('header', f"Missing columns: {', '.join(sorted(missing))}")
+        return result
+
+    current_key = None
+    current_plan = None
+    current_points = []
+    current_location = None
+    skip_parcel = False
+
+    try:
+        for row in reader:
+            location = f"line {reader.line_num}"
+            key = (row['site_name'], row['address'], row.get('city') or '')
+            if key != current_key:
+                if current_plan is not None:
+                    writer.add_parcel(current_location, current_plan, current_points)
+                current_key, current_plan, current_points, current_location = key, None, [], location
+                skip_parcel = False
+                try:
+                    if not row['site_name'] or not row['address']:
+                        raise ValidationError("site_name and address are required.")
+                    current_plan = SitePlan(
+                        city=cities.resolve(row.get('city')),
+                        site_name=row['site_name'][:255],
+                        address=row['address'][:255],
+                    )
+                except ValidationError as e:
+                    result.add_error(location, e.messages[0])
+                    skip_parcel = True
+
+            if skip_parcel:
+                continue
+
+            try:
+                values = clean_boundary_point(
+                    row['direction1'], row['direction2'],
+                    row['angle_degrees'], row['angle_minutes'], row.get('angle_seconds') or 0,
+                    row['length'],
+                )
+            except ValidationError as e:
+                result.add_error(location, e.messages[0])
+                continue
+            current_points.append(BoundaryPoint(**values))
+            if len(current_points) > max_courses:
+                # Stop buffering oversized parcels instead of holding them until the next key change
+                result.add_error(current_location, f"Parcel has more than {max_courses} boundary points; skipped.")
+                current_plan, current_points, skip_parcel = None, [], True
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Decoding runs ahead of the rows in blocks, so the bad byte is somewhere past
+        # the last row read; the parcel being read may be cut short and is dropped
+        result.add_file_error(f"after line {reader.line_num}", f"Unreadable CSV: {e}")
+        current_plan = None
+
+    if current_plan is not None:
+        writer.add_parcel(current_location, current_plan, current_points)
+    writer.flush()
+    return result
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+def _landxml_course(element):
+    """
+    Returns (azimuth, length, start) for a LandXML Line or Curve element.
+
+    Start/End coordinates ("northing easting") are preferred; otherwise the
+    dir (north azimuth in decimal degrees) and length attributes are used.
+    Curves are imported as their chord. start is the (easting, northing) of
+    the course's Start, or None without coordinates.
+    """
+    start = end = None
+    for child in element:
+        name = _local_name(child.tag)
+        if name == 'Start':
+            start = child.text
+        elif name == 'End':
+            end = child.text
+
+    if start and end:
+        start_n, start_e = (float(v) for v in start.split()[:2])
+        end_n, end_e = (float(v) for v in end.split()[:2])
+        delta_n, delta_e = end_n - start_n, end_e - start_e
+        return math.degrees(math.atan2(delta_e, delta_n)) % 360, math.hypot(delta_e, delta_n), (start_e, start_n)
+
+    if element.get('dir') is not None and element.get('length') is not None:
+        return float(element.get('dir')) % 360, float(element.get('length')), None
+    raise ValueError("Course has neither Start/End coordinates nor dir/length attributes.")
+
+def _discard(element, open_elements):
+    # Empties a handled element and detaches it from its parent, so memory
+    # stays flat regardless of file size; its earlier siblings are gone already
+    element.clear()
+    if open_elements:
+        open_elements[-1].remove(element)
+
+def import_landxml(stream, default_city, chunk_size=None, max_courses=None):
+    """
+    Stream-imports site plans from the Parcel elements of a LandXML file.
+
+    Every Parcel with a CoordGeom becomes one SitePlan in default_city, named
+    after the parcel's name and addressed by its desc (or name).
+
+    Parameters:
+    - stream: Binary file object
+    - default_city: City assigned to every imported parcel
+    - chunk_size: Boundary points per bulk insert
+    - max_courses: Maximum courses per parcel
+
+    Returns:
+    - ImportResult
+    """
+    chunk_size, max_courses = _import_settings(chunk_size, max_courses)
+    result = ImportResult()
+    if default_city is None:
+        result.add_file_error('file', "A city is required for LandXML imports.")
+        return result
+    writer = _ChunkedWriter(result, chunk_size, max_courses)
+
+    parcel_count = 0
+    open_elements = []
+    open_parcels = 0
+    try:
+        for event, element in ET.iterparse(stream, events=('start', 'end')):
+            is_parcel = _local_name(element.tag) == 'Parcel'
+            if event == 'start':
+                open_elements.append(element)
+                open_parcels += is_parcel
+                continue
+            open_elements.pop()
+            if not is_parcel:
+                # Courses are read when their parcel ends; anything else is handled once it ends
+                if not open_parcels:
+                    _discard(element, open_elements)
+                continue
+            open_parcels -= 1
+
+            coord_geoms = [child for child in element if _local_name(child.tag) == 'CoordGeom']
+            if coord_geoms:
+                parcel_count += 1
+                name = element.get('name') or f"Parcel {parcel_count}"
+                location = f"parcel {name}"
+
+                boundary_points = []
+                origin = None  # Start of the first imported course, if it has coordinates
+                for coord_geom in coord_geoms:
+                    for index, course in enumerate(coord_geom, start=1):
+                        if _local_name(course.tag) not in ('Line', 'Curve'):
+                            continue
+                        try:
+                            azimuth, length, start = _landxml_course(course)
+                            direction1, degrees, minutes, seconds, direction2 = azimuth_to_bearing(azimuth)
+                            values = clean_boundary_point(direction1, direction2, degrees, minutes, seconds, length)
+                        except ValidationError as e:
+                            result.add_error(f"{location}, course {index}", e.messages[0])
+                            continue
+                        except ValueError as e:
+                            result.add_error(f"{location}, course {index}", str(e))
+                            continue
+                        if not boundary_points:
+                            origin = start
+                        boundary_points.append(BoundaryPoint(**values))
+
+                site_plan = SitePlan(
+                    city=default_city,
+                    site_name=name[:255],
+                    address=(element.get('desc') or name)[:255],
+                )
+                if origin is not None:
+                    site_plan.origin_x, site_plan.origin_y = origin
+                writer.add_parcel(location, site_plan, boundary_points)
+
+            _discard(element, open_elements)
+    except ET.ParseError as e:
+        result.add_file_error('file', f"Invalid LandXML: {e}")
+
+    writer.flush()
+    return result
+
+def detect_format(filename):
+    """
+    Returns 'csv' or 'landxml' based on a file name, or None if unknown.
+    """
+    lowered = (filename or '').lower()
+    if lowered.endswith('.csv'):
+        return 'csv'
+    if lowered.endswith('.xml') or lowered.endswith('.landxml'):
+        return 'landxml'
+    return None
+
+def import_survey(stream, file_format, default_city=None, chunk_size=None, max_courses=None):
+    """
+    Imports a CSV or LandXML survey file; see import_csv and import_landxml.
+    """
+    if file_format == 'csv':
+        result = import_csv(stream, default_city, chunk_size, max_courses)
+    elif file_format == 'landxml':
+        result = import_landxml(stream, default_city, chunk_size, max_courses)
+    else:
+        raise ValueError(f"Unsupported survey format: {file_format}")
+    logger.info(
+        f"Imported {result.site_plans} site plan(s) with {result.boundary_points} boundary point(s) "
+        f"from {file_format}; {result.error_count} error(s)"
+    )
+    return result
@@ -0,0 +1,167 @@
+# siteplans/utils/jobs.py
+
+import logging
+import os
+import socket
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+from ..models import (
+    RenderJob, SitePlan, RENDER_JOB_DONE, RENDER_JOB_FAILED, RENDER_JOB_QUEUED, RENDER_JOB_RUNNING,
+)
+from .drawing import CanvasTooLargeError, encode_image, get_city_zoning, render_site_plan
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_JOB_MAX_ATTEMPTS = 3
+DEFAULT_RENDER_JOB_STALE_AFTER = 10 * 60  # seconds a running job may go without finishing before it is requeued
+
+def default_worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def enqueue_render(site_plan):
+    """
+    Queues a preview render of the site plan, reusing a pending job if there is one.
+
+    Returns:
+    - RenderJob
+    """
+    pending = site_plan.render_jobs.filter(status__in=[RENDER_JOB_QUEUED, RENDER_JOB_RUNNING]).order_by('-id').first()
+    if pending is not None:
+        return pending
+    job = RenderJob.objects.create(site_plan=site_plan)
+    logger.info(f"Queued render job {job.id} for Site Plan {site_plan.id}")
+    return job
+
+def claim_next_job(worker=None):
+    """
+    Claims the oldest queued job for this worker.
+
+    The claim is a conditional UPDATE, so concurrent workers never run the
+    same job, on any database backend.
+
+    Returns:
+    - The claimed RenderJob, or None if the queue is empty
+    """
+    worker = worker or default_worker_name()
+    while True:
+        job_id = (
+            RenderJob.objects.filter(status=RENDER_JOB_QUEUED)
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        claimed = RenderJob.objects.filter(id=job_id, status=RENDER_JOB_QUEUED).update(
+            status=RENDER_JOB_RUNNING,
+            worker=worker[:100],
+            started_at=timezone.now(),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return RenderJob.objects.get(id=job_id)
+        # Another worker won the race; try the next job
+
+def run_job(job):
+    """
+    Renders a claimed job and stores the encoded images on it.
+
+    The images are stored with the render cache key of the default PNG
+    render, which covers the boundary, the city's zoning, the renderer
+    version and the render options; stored_render only serves them while
+    that key still matches.
+
+    Failures are retried until SITEPLANS_RENDER_JOB_MAX_ATTEMPTS is reached.
+    """
+    from .cache import render_cache_key
+
+    max_attempts = getattr(settings, 'SITEPLANS_RENDER_JOB_MAX_ATTEMPTS', DEFAULT_RENDER_JOB_MAX_ATTEMPTS)
+    try:
+        site_plan = SitePlan.objects.select_related('city').get(id=job.site_plan_id)
+        boundary_points = list(site_plan.boundary_points.order_by('id'))
+        if len(boundary_points) < 2:
+            raise ValueError("Insufficient boundary points to generate a preview.")
+
+        job.site_plan_updated_at = site_plan.updated_at
+        job.render_key = render_cache_key(boundary_points, get_city_zoning(site_plan.city))
+        try:
+            img = render_site_plan(site_plan, boundary_points)
+        except CanvasTooLargeError as e:
+            # Nothing to store: the preview page shows these plans as tiles
+            logger.info(f"Render job {job.id}: {e}")
+            job.png = job.webp = None
+        else:
+            job.png = encode_image(img, 'PNG')
+            job.webp = encode_image(img, 'WEBP')
+        job.status = RENDER_JOB_DONE
+        job.error = ''
+    except Exception as e:
+        logger.error(f"Render job {job.id} failed (attempt {job.attempts}): {e}")
+        job.error = str(e)
+        job.status = RENDER_JOB_QUEUED if job.attempts < max_attempts else RENDER_JOB_FAILED
+
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'error', 'site_plan_updated_at', 'render_key', 'png', 'webp', 'finished_at'])
+
+    if job.status == RENDER_JOB_DONE:
+        # Older results for this plan can never be served again
+        RenderJob.objects.filter(
+            site_plan_id=job.site_plan_id, status__in=[RENDER_JOB_DONE, RENDER_JOB_FAILED], id__lt=job.id,
+        ).delete()
+    return job
+
+def requeue_stale_jobs(stale_after=None):
+    """
+    Requeues running jobs whose worker appears to have died.
+
+    A job that has used up SITEPLANS_RENDER_JOB_MAX_ATTEMPTS is marked failed
+    instead, so a plan that kills its worker is not retried forever.
+
+    Returns:
+    - Number of jobs requeued
+    """
+    if stale_after is None:
+        stale_after = getattr(settings, 'SITEPLANS_RENDER_JOB_STALE_AFTER', DEFAULT_RENDER_JOB_STALE_AFTER)
+    max_attempts = getattr(settings, 'SITEPLANS_RENDER_JOB_MAX_ATTEMPTS', DEFAULT_RENDER_JOB_MAX_ATTEMPTS)
+    now = timezone.now()
+    stale = RenderJob.objects.filter(status=RENDER_JOB_RUNNING, started_at__lt=now - timedelta(seconds=stale_after))
+    failed = stale.filter(attempts__gte=max_attempts).update(
+        status=RENDER_JOB_FAILED,
+        error=f"The worker stopped responding; gave up after {max_attempts} attempts.",
+        finished_at=now,
+    )
+    if failed:
+        logger.error(f"Failed {failed} stale render job(s) out of attempts")
+    requeued = stale.update(status=RENDER_JOB_QUEUED)
+    if requeued:
+        logger.warning(f"Requeued {requeued} stale render job(s)")
+    return requeued
+
+def stored_render(site_plan, render_key, image_format):
+    """
+    Returns the image bytes a finished job stored for the current version of the plan.
+
+    Parameters:
+    - site_plan: SitePlan instance
+    - render_key: render_cache_key of the plan's default PNG render as it
+      would be rendered now; jobs stored under any other key are stale
+    - image_format: 'PNG' or 'WEBP'
+
+    Returns:
+    - Encoded image bytes, or None if no up-to-date render is stored
+    """
+    field = image_format.lower()
+    if field not in ('png', 'webp'):
+        return None
+    content = (
+        RenderJob.objects.filter(
+            site_plan=site_plan, status=RENDER_JOB_DONE, render_key=render_key,
+        )
+        .order_by('-id')
+        .values_list(field, flat=True)
+        .first()
+    )
+    return bytes(content) if content else None
@@ -0,0 +1,190 @@
+# siteplans/utils/listing.py
+
+import base64
+import json
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+from django.conf import settings
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+from ..models import BoundaryPoint, SitePlan
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIST_PAGE_SIZE = 100
+DEFAULT_LIST_MAX_PAGE_SIZE = 1000
+
+# Sort keys of each ordering; the trailing id makes every key unique
+LIST_ORDERINGS = {
+    'id': ('id',),
+    'updated_at': ('updated_at', 'id'),
+}
+
+class InvalidCursorError(ValueError):
+    """
+    Raised for a cursor that was not issued by this listing or for another ordering.
+    """
+
+@dataclass
+class SitePlanPage:
+    site_plans: List[SitePlan]
+    next_cursor: Optional[str] = None
+
+def get_page_size(limit=None):
+    """
+    Returns the requested page size clamped to SITEPLANS_LIST_MAX_PAGE_SIZE.
+    """
+    max_size = getattr(settings, 'SITEPLANS_LIST_MAX_PAGE_SIZE', DEFAULT_LIST_MAX_PAGE_SIZE)
+    if not limit:
+        limit = getattr(settings, 'SITEPLANS_LIST_PAGE_SIZE', DEFAULT_LIST_PAGE_SIZE)
+    return max(1, min(limit, max_size))
+
+def encode_cursor(ordering, site_plan):
+    """
+    Returns an opaque cursor that resumes the listing after the given site plan.
+    """
+    values = []
+    for field in LIST_ORDERINGS[ordering]:
+        value = getattr(site_plan, field)
+        values.append(value.isoformat() if field == 'updated_at' else value)
+    payload = json.dumps({'o': ordering, 'k': values}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+def decode_cursor(cursor, ordering):
+    """
+    Returns the sort key values stored in a cursor.
+
+    Raises:
+    - InvalidCursorError if the cursor is malformed or belongs to another ordering
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if payload['o'] != ordering:
+            raise InvalidCursorError("The cursor was issued for a different ordering.")
+        values = list(payload['k'])
+        if len(values) != len(LIST_ORDERINGS[ordering]):
+            raise InvalidCursorError("Malformed cursor.")
+        for i, field in enumerate(LIST_ORDERINGS[ordering]):
+            if field == 'updated_at':
+                values[i] = parse_datetime(values[i])
+                if values[i] is None:
+                    raise InvalidCursorError("Malformed cursor.")
+            else:
+                values[i] = int(values[i])
+        return values
+    except InvalidCursorError:
+        raise
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursorError("Malformed cursor.") from e
+
+def site_plan_list_queryset():
+    """
+    Returns the base listing queryset: one query per page regardless of its size.
+
+    The city and stored geometry are joined in, and the boundary point count
+    is a correlated subquery so the page needs no GROUP BY over site plans.
+    """
+    point_counts = (
+        BoundaryPoint.objects.filter(site_plan=OuterRef('pk'))
+        .order_by()
+        .values('site_plan')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    return (
+        SitePlan.objects.select_related('city', 'geometry')
+        .defer('geometry__coordinates')
+        .annotate(boundary_point_count=Coalesce(Subquery(point_counts, output_field=IntegerField()), Value(0)))
+    )
+
+def filter_site_plans(queryset, city=None, address=None, updated_after=None, updated_before=None):
+    """
+    Applies the listing filters.
+
+    Parameters:
+    - city: City id, or a city name matched case-insensitively
+    - address: Address prefix; PostgreSQL matches it case-sensitively from the
+      address pattern index, SQLite ignores case and scans
+    - updated_after: Only plans updated at or after this datetime
+    - updated_before: Only plans updated before this datetime
+    """
+    if city:
+        if str(city).isdigit():
+            queryset = queryset.filter(city_id=int(city))
+        else:
+            queryset = queryset.filter(city__name__iexact=city)
+    if address:
+        queryset = queryset.filter(address__startswith=address)
+    if updated_after is not None:
+        queryset = queryset.filter(updated_at__gte=updated_after)
+    if updated_before is not None:
+        queryset = queryset.filter(updated_at__lt=updated_before)
+    return queryset
+
+def _after_key(fields, values):
+    # Rows strictly after the key in (fields...) lexicographic order
+    condition = Q()
+    for i in reversed(range(len(fields))):
+        step = Q(**{f"{fields[i]}__gt": values[i]})
+        if i < len(fields) - 1:
+            step |= Q(**{fields[i]: values[i]}) & condition
+        condition = step
+    return condition
+
+def list_site_plans(queryset, ordering='id', cursor=None, limit=None):
+    """
+    Returns one keyset-paginated page of site plans.
+
+    Unlike OFFSET paging, every page costs the same however deep into the
+    listing it is, and rows changing between requests never shift a page.
+
+    Parameters:
+    - queryset: Filtered listing queryset (see site_plan_list_queryset)
+    - ordering: 'id' or 'updated_at'
+    - cursor: next_cursor of the previous page, or None for the first page
+    - limit: Page size; see get_page_size
+
+    Returns:
+    - SitePlanPage
+
+    Raises:
+    - InvalidCursorError
+    """
+    fields = LIST_ORDERINGS[ordering]
+    limit = get_page_size(limit)
+    if cursor:
+        queryset = queryset.filter(_after_key(fields, decode_cursor(cursor, ordering)))
+    # One extra row tells whether another page follows
+    site_plans = list(queryset.order_by(*fields)[:limit + 1])
+    next_cursor = None
+    if len(site_plans) > limit:
+        site_plans = site_plans[:limit]
+        next_cursor = encode_cursor(ordering, site_plans[-1])
+    return SitePlanPage(site_plans, next_cursor)
+
+def site_plan_summary(site_plan):
+    """
+    Returns the JSON representation of a listed site plan.
+
+    Geometry fields are None when the stored geometry is missing or older than the plan.
+    """
+    geometry = getattr(site_plan, 'geometry', None)
+    if geometry is not None and geometry.source_updated_at != site_plan.updated_at:
+        geometry = None
+    return {
+        'id': site_plan.id,
+        'site_name': site_plan.site_name,
+        'address': site_plan.address,
+        'city': {'id': site_plan.city_id, 'name': site_plan.city.name},
+        'origin': None if site_plan.origin_x is None or site_plan.origin_y is None else [site_plan.origin_x, site_plan.origin_y],
+        'created_at': site_plan.created_at.isoformat(),
+        'updated_at': site_plan.updated_at.isoformat(),
+        'boundary_point_count': site_plan.boundary_point_count,
+        'area': geometry.area if geometry else None,
+        'perimeter': geometry.perimeter if geometry else None,
+        'closure_error': geometry.closure_error if geometry else None,
+        'closure_precision': geometry.closure_precision if geometry else None,
+    }
@@ -0,0 +1,98 @@
+# siteplans/utils/offload.py
+
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from django.conf import settings
+from django.db import close_old_connections, connections
+from .profiling import stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_THREADS = min(4, os.cpu_count() or 1)
+DEFAULT_RENDER_QUEUE_TIMEOUT = 10.0  # seconds a request waits for a render slot before giving up
+
+class RenderBusyError(Exception):
+    """
+    Raised when no render slot frees up within SITEPLANS_RENDER_QUEUE_TIMEOUT.
+    """
+
+_executor = None
+_executor_lock = threading.Lock()
+# asyncio semaphores belong to one event loop, so keep one per loop
+_semaphores = weakref.WeakKeyDictionary()
+
+def get_render_threads():
+    return getattr(settings, 'SITEPLANS_RENDER_THREADS', DEFAULT_RENDER_THREADS)
+
+def get_render_executor():
+    """
+    Returns the process-wide thread pool that runs renders for async views.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_render_threads(), thread_name_prefix='siteplans-render')
+        return _executor
+
+def _run_with_own_connections(func, *args, **kwargs):
+    # Pool threads use their own database connections; drop them after every
+    # call, as a request thread would
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        connections.close_all()
+
+async def run_in_render_executor(func, *args, **kwargs):
+    """
+    Runs a synchronous (CPU-bound or ORM-using) callable in the render pool.
+
+    The caller's context variables, such as the active render profile, are
+    visible inside the call.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _run_with_own_connections, func, *args, **kwargs)
+    return await loop.run_in_executor(get_render_executor(), call)
+
+def _loop_semaphore():
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        limit = getattr(settings, 'SITEPLANS_RENDER_CONCURRENCY', get_render_threads())
+        semaphore = _semaphores[loop] = asyncio.Semaphore(limit)
+    return semaphore
+
+@asynccontextmanager
+async def render_slot():
+    """
+    Limits how many renders an event loop runs at once.
+
+    Raises:
+    - RenderBusyError if no slot frees up within SITEPLANS_RENDER_QUEUE_TIMEOUT
+    """
+    semaphore = _loop_semaphore()
+    timeout = getattr(settings, 'SITEPLANS_RENDER_QUEUE_TIMEOUT', DEFAULT_RENDER_QUEUE_TIMEOUT)
+    # wait_for() can lose a slot that is acquired just as the wait is
+    # cancelled; acquire() itself hands the slot back when cancelled, so
+    # cancel it directly and release exactly what was acquired
+    acquired = False
+    try:
+        try:
+            with stage('queue'):
+                async with asyncio.timeout(timeout):
+                    acquired = await semaphore.acquire()
+        except TimeoutError:
+            raise RenderBusyError(f"No render slot became free within {timeout}s") from None
+        yield
+    finally:
+        if acquired:
+            semaphore.release()
@@ -0,0 +1,589 @@
+# siteplans/utils/offset.py
+
+import logging
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+EPSILON = 1e-9
+CHUNK_SIZE = 16384  # points per batch of vectorized containment tests
+MITER_LIMIT = 4.0  # longest reflex miter, in multiples of the larger offset at the corner
+MAX_CANDIDATE_PAIRS = 2_000_000  # work budget of one inset before falling back to raw offsets
+
+# Boundary side of an edge, from the azimuth of its outward normal
+EDGE_DIRECTIONS = np.array(['N', 'E', 'S', 'W'])
+
+class InsetError(ValueError):
+    """
+    Raised when the pieces of an inset exceed the work budget or do not close into rings.
+    """
+
+def normalize_ring(points):
+    """
+    Returns a polygon's vertices as a counter-clockwise ring without repeats.
+
+    An open traverse is closed with a straight edge back to its first point,
+    and consecutive duplicate vertices are dropped.
+
+    Returns:
+    - (n, 2) float array; fewer than 3 rows for a degenerate polygon
+    """
+    ring = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(ring) < 2:
+        return ring
+    keep = np.hypot(*(ring - np.roll(ring, 1, axis=0)).T) > EPSILON * _scale(ring)
+    ring = ring[keep] if keep.any() else ring[:1]
+    if signed_area(ring) < 0:
+        ring = ring[::-1]
+    return ring
+
+def signed_area(ring):
+    """
+    Returns the signed area of a ring: positive when counter-clockwise.
+    """
+    if len(ring) < 3:
+        return 0.0
+    x, y = ring[:, 0], ring[:, 1]
+    return float(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2
+
+def edge_sides(ring):
+    """
+    Classifies every edge of a counter-clockwise ring by the boundary side it faces.
+
+    Edge i runs from ring[i] to ring[i + 1]; its side is the compass quadrant
+    its outward normal points into, so the top edge of a lot is its north
+    boundary whichever way the survey traversed it.
+
+    Returns:
+    - Integer array indexing EDGE_DIRECTIONS ('N', 'E', 'S', 'W')
+    """
+    edges = np.roll(ring, -1, axis=0) - ring
+    # Outward normal of a counter-clockwise ring is the edge direction turned clockwise
+    normal_azimuths = np.degrees(np.arctan2(edges[:, 1], -edges[:, 0])) % 360
+    return ((normal_azimuths + 45) // 90).astype(int) % 4
+
+def edge_directions(ring):
+    """
+    Returns the 'N', 'E', 'S' or 'W' side of every edge (see edge_sides).
+    """
+    return EDGE_DIRECTIONS[edge_sides(ring)]
+
+def _scale(points):
+    return max(1.0, float(np.abs(points).max(initial=0.0)))
+
+def _cross(a, b):
+    return a[..., 0] * b[..., 1] - a[..., 1] * b[..., 0]
+
+def _offset_pieces(ring, distances):
+    """
+    Splits the area the setbacks take from the polygon into convex pieces.
+
+    Every edge sweeps the strip between itself and its offset. Where two
+    offsets meet at a convex corner the strips already overlap. At a reflex
+    corner the join is mitered: both strips run on to the point where their
+    offset lines meet, so together they fill the wedge between them. A miter
+    reaching more than MITER_LIMIT times the larger distance from the vertex
+    is beveled at that reach instead, and two quadrilaterals fill the wedge
+    up to the bevel. Long strips are cut into parts about as long as the
+    setbacks are deep, which keeps every region's bounding box small.
+
+    Returns:
+    - Tuple (regions, segment starts, segment ends): regions is a (k, 4, 2)
+      array of counter-clockwise convex polygons (triangles repeat their
+      last vertex); the segments are the region sides the offset boundary
+      can run along
+    """
+    tolerance = EPSILON * _scale(ring)
+    edges = np.roll(ring, -1, axis=0) - ring
+    lengths = np.hypot(edges[:, 0], edges[:, 1])
+    directions = edges / lengths[:, None]
+    normals = np.column_stack((-directions[:, 1], directions[:, 0]))  # inward for a counter-clockwise ring
+
+    # Vertex j joins edge j - 1 to edge j
+    prev_directions, prev_normals, prev_distances, prev_lengths = (
+        np.roll(a, 1, axis=0) for a in (directions, normals, distances, lengths)
+    )
+    prev_ends = ring + prev_normals * prev_distances[:, None]
+    starts = ring + normals * distances[:, None]
+
+    turns = _cross(prev_directions, directions)
+    dots = np.einsum('ij,ij->i', prev_directions, directions)
+    convex = turns > EPSILON
+    straight = ~convex & (turns >= -EPSILON) & (dots > 0)
+    corners = ~convex & ~straight  # reflex turns and reversals
+
+    # Where the offset lines of a corner meet; reversals never meet
+    reaches = np.maximum(prev_distances, distances) * MITER_LIMIT
+    with np.errstate(divide='ignore', invalid='ignore'):
+        miters = prev_ends + prev_directions * (_cross(starts - prev_ends, directions) / turns)[:, None]
+        mitered = corners & (np.hypot(*(miters - ring).T) <= reaches)
+    beveled = corners & ~mitered
+
+    # A bevel crosses the corner's bisector at right angles, its limit away from the vertex
+    vertices = ring[beveled]
+    bisectors = (prev_directions - directions)[beveled]
+    bisectors /= np.hypot(bisectors[:, 0], bisectors[:, 1])[:, None]
+    limits = reaches[beveled]
+    bevel_middles = vertices + bisectors * limits[:, None]
+    bevel_starts, bevel_ends = (
+        points + ahead * ((limits - np.einsum('ij,ij->i', points - vertices, bisectors)) / np.einsum('ij,ij->i', ahead, bisectors))[:, None]
+        for points, ahead in ((starts[beveled], -directions[beveled]), (prev_ends[beveled], prev_directions[beveled]))
+    )
+
+    # Strip j runs from edge j to its offset, which ends at the miters of
+    # its corners; it is cut into parts across its length, which overlap a
+    # little so no point on a cut falls outside both neighbors
+    far_starts = np.where(mitered[:, None], miters, starts)
+    far_ends = np.roll(np.where(mitered[:, None], miters, prev_ends), -1, axis=0)
+    part_length = max(float(distances.max()), float(np.median(lengths)), float(lengths.sum()) / (8 * len(ring)))
+    parts = np.ceil(lengths / part_length).astype(np.int64)
+    strip_ids, within = _spread(parts)
+    overlaps = tolerance / lengths[strip_ids]
+    fractions = [
+        (within / parts[strip_ids] - np.where(within > 0, overlaps, 0))[:, None],
+        ((within + 1) / parts[strip_ids] + np.where(within + 1 < parts[strip_ids], overlaps, 0))[:, None],
+    ]
+    near_points = [ring[strip_ids] + edges[strip_ids] * f for f in fractions]
+    far_points = [far_starts[strip_ids] + (far_ends - far_starts)[strip_ids] * f for f in fractions]
+
+    regions = np.concatenate((
+        np.stack((near_points[0], near_points[1], far_points[1], far_points[0]), axis=1),
+        np.stack((vertices, starts[beveled], bevel_starts, bevel_middles), axis=1),
+        np.stack((vertices, bevel_middles, bevel_ends, prev_ends[beveled]), axis=1),
+        np.stack((ring, starts, prev_ends, prev_ends), axis=1)[straight],
+    ))
+    # Zero-distance strips and the bevel pieces come out clockwise or flat
+    areas = _cross(regions[:, 1] - regions[:, 0], regions[:, 2] - regions[:, 0])
+    areas += _cross(regions[:, 2] - regions[:, 0], regions[:, 3] - regions[:, 0])
+    regions[areas < 0] = regions[areas < 0][:, ::-1]
+
+    # The boundary runs along the offsets, the bevels and the steps between
+    # unequal offsets, and along the end of a strip wherever nothing next to
+    # it covers that end
+    prev_covered = (
+        (convex & (prev_distances * turns <= lengths + tolerance) & (prev_distances * dots <= distances + tolerance))
+        | corners
+        | (straight & (prev_distances <= distances))
+    )
+    next_covered = (
+        (convex & (distances * turns <= prev_lengths + tolerance) & (distances * dots <= prev_distances + tolerance))
+        | corners
+        | (straight & (distances <= prev_distances))
+    )
+    segment_starts = np.concatenate((
+        far_starts, starts[beveled], bevel_starts, bevel_middles, bevel_ends,
+        prev_ends[straight], ring[~prev_covered], ring[~next_covered],
+    ))
+    segment_ends = np.concatenate((
+        far_ends, bevel_starts, bevel_middles, bevel_ends, prev_ends[beveled],
+        starts[straight], prev_ends[~prev_covered], starts[~next_covered],
+    ))
+    return regions, segment_starts, segment_ends
+
+def _spread(counts):
+    # For runs of the given lengths: (run index, position within run) of every element
+    runs = np.repeat(np.arange(len(counts)), counts)
+    return runs, np.arange(len(runs)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+def _check_budget(count, limit):
+    if limit is not None and count > limit:
+        raise InsetError(f"{count} candidate pairs exceed the budget of {limit}.")
+
+def _grid_pairs(points, boxes, cell, limit=None):
+    """
+    Pairs every point with the boxes that overlap its grid cell.
+
+    Parameters:
+    - points: (m, 2) array
+    - boxes: (k, 4) array of (min_x, min_y, max_x, max_y)
+    - cell: Cell width and height
+    - limit: Most (cell, box) entries and pairs to build, or None
+
+    Returns:
+    - Tuple (point indices, box indices)
+
+    Raises:
+    - InsetError past the limit
+    """
+    cell = np.broadcast_to(np.asarray(cell, dtype=float), (2,))
+    origin = np.minimum(points.min(axis=0), boxes[:, :2].min(axis=0))
+    low = np.floor((boxes[:, :2] - origin) / cell).astype(np.int64)
+    high = np.floor((boxes[:, 2:] - origin) / cell).astype(np.int64)
+    point_cells = np.floor((points - origin) / cell).astype(np.int64)
+    rows = int(max(high[:, 1].max(), point_cells[:, 1].max())) + 1
+
+    # Every cell a box overlaps, as (cell id, box) pairs sorted by cell
+    heights = high[:, 1] - low[:, 1] + 1
+    counts = (high[:, 0] - low[:, 0] + 1) * heights
+    _check_budget(int(counts.sum()), limit)
+    box_ids, within = _spread(counts)
+    cell_ids = (low[box_ids, 0] + within // heights[box_ids]) * rows + low[box_ids, 1] + within % heights[box_ids]
+    order = np.argsort(cell_ids, kind='stable')
+    cell_ids, box_ids = cell_ids[order], box_ids[order]
+
+    lookups = point_cells[:, 0] * rows + point_cells[:, 1]
+    firsts = np.searchsorted(cell_ids, lookups, side='left')
+    counts = np.searchsorted(cell_ids, lookups, side='right') - firsts
+    _check_budget(int(counts.sum()), limit)
+    point_ids, within = _spread(counts)
+    return point_ids, box_ids[firsts[point_ids] + within]
+
+def _inside_ring(points, ring):
+    """
+    Returns which points lie inside the ring, by the crossing number of a ray toward +x.
+    """
+    starts, ends = ring, np.roll(ring, -1, axis=0)
+    # A ray can only cross edges spanning its y: bucket edges into horizontal rows
+    low_y, high_y = np.minimum(starts[:, 1], ends[:, 1]), np.maximum(starts[:, 1], ends[:, 1])
+    zeros = np.zeros(len(ring))
+    rows = np.column_stack((zeros, low_y, zeros, high_y))
+    # Rows a quarter of the mean span deep list every edge about five times
+    row_height = max(float((high_y - low_y).sum()) / (4 * len(ring)), EPSILON * _scale(ring))
+    crossings = np.zeros(len(points), dtype=np.int64)
+    for first in range(0, len(points), CHUNK_SIZE):
+        chunk = points[first:first + CHUNK_SIZE]
+        point_ids, edge_ids = _grid_pairs(np.column_stack((np.zeros(len(chunk)), chunk[:, 1])), rows, (1.0, row_height))
+        x, y = chunk[point_ids, 0], chunk[point_ids, 1]
+        x1, y1 = starts[edge_ids, 0], starts[edge_ids, 1]
+        x2, y2 = ends[edge_ids, 0], ends[edge_ids, 1]
+        spans = (y1 > y) != (y2 > y)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            crossing_x = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        crossings[first:first + len(chunk)] = np.bincount(point_ids[spans & (x < crossing_x)], minlength=len(chunk))
+    return crossings % 2 == 1
+
+def _cell_size(boxes):
+    # Grid cells about the size of a typical box
+    sizes = (boxes[:, 2:] - boxes[:, :2]).max(axis=1)
+    return max(float(np.median(sizes)), EPSILON * _scale(boxes))
+
+def _inside_any_region(points, regions, tolerance):
+    """
+    Returns which points lie more than tolerance inside at least one convex region.
+
+    Raises:
+    - InsetError when more than MAX_CANDIDATE_PAIRS point and region pairs need testing
+    """
+    boxes = np.hstack((regions.min(axis=1), regions.max(axis=1)))
+    cell = _cell_size(boxes)
+    sides = np.roll(regions, -1, axis=1) - regions
+    side_lengths = np.hypot(sides[..., 0], sides[..., 1])
+    empty = side_lengths <= tolerance
+    inside = np.zeros(len(points), dtype=bool)
+    budget = MAX_CANDIDATE_PAIRS
+    for first in range(0, len(points), CHUNK_SIZE):
+        chunk = points[first:first + CHUNK_SIZE]
+        point_ids, region_ids = _grid_pairs(chunk, boxes, cell, budget)
+        budget -= len(point_ids)
+        # Test the pairs in batches too; points near many regions pair often
+        for low in range(0, len(point_ids), CHUNK_SIZE):
+            pair_points, pair_regions = point_ids[low:low + CHUNK_SIZE], region_ids[low:low + CHUNK_SIZE]
+            offsets = chunk[pair_points][:, None, :] - regions[pair_regions]
+            # Strictly left of every side; the empty side of a triangle never decides
+            left = (_cross(sides[pair_regions], offsets) > tolerance * side_lengths[pair_regions]) | empty[pair_regions]
+            hits = left.all(axis=1) & ~empty[pair_regions].all(axis=1)
+            inside[first + pair_points[hits]] = True
+    return inside
+
+def _box_pairs(boxes, cell, limit=None):
+    """
+    Returns every pair of overlapping boxes, each pair once.
+
+    Boxes are bucketed into a uniform grid and only boxes sharing a cell are
+    compared; a pair is reported from the cell holding the lower-left corner
+    of their overlap.
+
+    Returns:
+    - Tuple of index arrays (a, b)
+
+    Raises:
+    - InsetError when the cell entries or the pairs compared exceed the limit
+    """
+    origin = boxes[:, :2].min(axis=0)
+    low = np.floor((boxes[:, :2] - origin) / cell).astype(np.int64)
+    high = np.floor((boxes[:, 2:] - origin) / cell).astype(np.int64)
+    rows = int(high[:, 1].max()) + 1
+
+    heights = high[:, 1] - low[:, 1] + 1
+    counts = (high[:, 0] - low[:, 0] + 1) * heights
+    _check_budget(int(counts.sum()), limit)
+    box_ids, within = _spread(counts)
+    cells = np.column_stack((low[box_ids, 0] + within // heights[box_ids], low[box_ids, 1] + within % heights[box_ids]))
+    order = np.argsort(cells[:, 0] * rows + cells[:, 1], kind='stable')
+    box_ids, cells = box_ids[order], cells[order]
+
+    # Pair every entry with the ones after it in the same cell
+    new_cell = np.ones(len(box_ids), dtype=bool)
+    new_cell[1:] = np.any(cells[1:] != cells[:-1], axis=1)
+    run_starts = np.flatnonzero(new_cell)
+    run_lengths = np.diff(np.append(run_starts, len(box_ids)))
+    _check_budget(int((run_lengths * (run_lengths - 1) // 2).sum()), limit)
+    positions = np.arange(len(box_ids)) - np.repeat(run_starts, run_lengths)
+    first, within = _spread(np.repeat(run_lengths, run_lengths) - positions - 1)
+    second = first + 1 + within
+    a, b = box_ids[first], box_ids[second]
+
+    corners = np.maximum(boxes[a, :2], boxes[b, :2])
+    overlap = np.all(corners <= np.minimum(boxes[a, 2:], boxes[b, 2:]), axis=1)
+    home = np.all(np.floor((corners - origin) / cell).astype(np.int64) == cells[first], axis=1)
+    keep = overlap & home
+    return a[keep], b[keep]
+
+def _split_segments(starts, ends, tolerance):
+    """
+    Cuts segments wherever they cross or touch one another.
+
+    Only segments whose bounding boxes share a grid cell are compared, so
+    the cost is about linear in the number of segments plus the number of
+    close pairs. Long segments are bucketed in cell-sized parts: a long
+    diagonal's own box would cover a square of cells. Collinear overlapping
+    segments are cut at each other's ends.
+
+    Returns:
+    - Tuple (piece starts, piece ends)
+
+    Raises:
+    - InsetError when more than MAX_CANDIDATE_PAIRS pairs need comparing
+    """
+    count = len(starts)
+    vectors = ends - starts
+    boxes = np.hstack((np.minimum(starts, ends), np.maximum(starts, ends)))
+    cell = _cell_size(boxes)
+    parts = np.ceil(np.hypot(vectors[:, 0], vectors[:, 1]) / cell).astype(np.int64).clip(1)
+    _check_budget(int(parts.sum()), MAX_CANDIDATE_PAIRS)
+    owners, within = _spread(parts)
+    part_starts = starts[owners] + vectors[owners] * (within / parts[owners])[:, None]
+    part_ends = starts[owners] + vectors[owners] * ((within + 1) / parts[owners])[:, None]
+    part_boxes = np.hstack((np.minimum(part_starts, part_ends) - tolerance, np.maximum(part_starts, part_ends) + tolerance))
+    a, b = _box_pairs(part_boxes, cell, MAX_CANDIDATE_PAIRS)
+    a, b = owners[a], owners[b]
+    keys = np.unique(np.minimum(a, b)[a != b] * count + np.maximum(a, b)[a != b])
+    a, b = keys // count, keys % count
+
+    r, s = vectors[a], vectors[b]
+    r_lengths, s_lengths = np.hypot(r[:, 0], r[:, 1]), np.hypot(s[:, 0], s[:, 1])
+    denominators = _cross(r, s)
+    offsets = starts[b] - starts[a]
+    crossing = np.abs(denominators) > EPSILON * r_lengths * s_lengths
+    with np.errstate(divide='ignore', invalid='ignore'):
+        t_a = _cross(offsets, s) / denominators
+        t_b = _cross(offsets, r) / denominators
+    margin_a, margin_b = tolerance / r_lengths, tolerance / s_lengths
+    hits = crossing & (t_a >= -margin_a) & (t_a <= 1 + margin_a) & (t_b >= -margin_b) & (t_b <= 1 + margin_b)
+    cut_segments, cut_params = [a[hits], b[hits]], [t_a[hits], t_b[hits]]
+
+    # Collinear overlaps: cut each segment at the other's ends
+    collinear = ~crossing & (np.abs(_cross(r, offsets)) <= tolerance * r_lengths)
+    for this, that in ((a[collinear], b[collinear]), (b[collinear], a[collinear])):
+        for point in (starts[that], ends[that]):
+            cut_segments.append(this)
+            cut_params.append(np.einsum('ij,ij->i', point - starts[this], vectors[this]) / np.einsum('ij,ij->i', vectors[this], vectors[this]))
+
+    segments = np.concatenate([np.arange(count), np.arange(count), *cut_segments])
+    params = np.clip(np.concatenate([np.zeros(count), np.ones(count), *cut_params]), 0, 1)
+    order = np.lexsort((params, segments))
+    segments, params = segments[order], params[order]
+    points = starts[segments] + vectors[segments] * params[:, None]
+
+    same = segments[1:] == segments[:-1]
+    piece_starts, piece_ends = points[:-1][same], points[1:][same]
+    keep = np.hypot(*(piece_ends - piece_starts).T) > tolerance
+    return piece_starts[keep], piece_ends[keep]
+
+def _node_ids(points, tolerance):
+    """
+    Gives points closer than the tolerance a shared id.
+
+    Points are bucketed into cells the size of the tolerance and occupied
+    cells that touch are merged, so two points on either side of a cell
+    border still match.
+    """
+    cells = np.floor(points / tolerance).astype(np.int64)
+    xs, x_ranks = np.unique(cells[:, 0], return_inverse=True)
+    ys, y_ranks = np.unique(cells[:, 1], return_inverse=True)
+    keys, ids = np.unique(x_ranks.reshape(-1) * len(ys) + y_ranks.reshape(-1), return_inverse=True)
+    cell_x, cell_y = xs[keys // len(ys)], ys[keys % len(ys)]
+
+    # Occupied neighbors of every occupied cell, half the neighborhood each
+    firsts, seconds = [], []
+    for dx, dy in ((1, -1), (1, 0), (1, 1), (0, 1)):
+        x_at = np.searchsorted(xs, cell_x + dx).clip(max=len(xs) - 1)
+        y_at = np.searchsorted(ys, cell_y + dy).clip(max=len(ys) - 1)
+        neighbors = x_at * len(ys) + y_at
+        at = np.searchsorted(keys, neighbors).clip(max=len(keys) - 1)
+        found = (xs[x_at] == cell_x + dx) & (ys[y_at] == cell_y + dy) & (keys[at] == neighbors)
+        firsts.append(np.flatnonzero(found))
+        seconds.append(at[found])
+    firsts, seconds = np.concatenate(firsts), np.concatenate(seconds)
+
+    # Spread the lowest label through every group of touching cells
+    labels = np.arange(len(keys))
+    while True:
+        lowest = np.minimum(labels[firsts], labels[seconds])
+        if np.array_equal(lowest, labels[firsts]) and np.array_equal(lowest, labels[seconds]):
+            break
+        np.minimum.at(labels, firsts, lowest)
+        np.minimum.at(labels, seconds, lowest)
+        labels = labels[labels]
+    return np.unique(labels, return_inverse=True)[1].reshape(-1)[ids.reshape(-1)]
+
+def _drop_collinear(ring):
+    # Removes the vertices in the middle of straight runs left by cutting
+    while len(ring) > 3:
+        before = ring - np.roll(ring, 1, axis=0)
+        after = np.roll(ring, -1, axis=0) - ring
+        lengths = np.hypot(before[:, 0], before[:, 1]) * np.hypot(after[:, 0], after[:, 1])
+        straight = (np.abs(_cross(before, after)) <= 1e-12 * lengths) & (np.einsum('ij,ij->i', before, after) > 0)
+        if not straight.any():
+            break
+        # Never drop two neighbors in one pass
+        ring = ring[~(straight & ~np.roll(straight, 1))]
+    return ring
+
+def _chain_rings(starts, ends, tolerance, gap):
+    """
+    Links directed pieces into closed rings by matching their end points.
+
+    Pieces nothing leads into or continues from are pruned first; a sliver
+    thinner than the side tests can resolve leaves such stubs behind. A walk
+    that still gets stuck closes on its first point or jumps to the nearest
+    unused piece when either is within the gap.
+
+    Raises:
+    - InsetError when the pieces do not close into rings
+    """
+    nodes = _node_ids(np.vstack((starts, ends)), tolerance)
+    start_nodes, end_nodes = nodes[:len(starts)].tolist(), nodes[len(starts):].tolist()
+    outgoing, incoming = {}, {}
+    for piece, (start, end) in enumerate(zip(start_nodes, end_nodes)):
+        outgoing.setdefault(start, []).append(piece)
+        incoming.setdefault(end, []).append(piece)
+
+    out_degrees = {node: len(pieces) for node, pieces in outgoing.items()}
+    in_degrees = {node: len(pieces) for node, pieces in incoming.items()}
+    used = [False] * len(starts)
+    pending = list(range(len(starts)))
+    while pending:
+        piece = pending.pop()
+        start, end = start_nodes[piece], end_nodes[piece]
+        if used[piece] or (in_degrees.get(start) and out_degrees.get(end)):
+            continue
+        used[piece] = True
+        out_degrees[start] -= 1
+        in_degrees[end] -= 1
+        if not out_degrees[start]:
+            pending.extend(incoming.get(start, ()))
+        if not in_degrees[end]:
+            pending.extend(outgoing.get(end, ()))
+    if all(used):
+        raise InsetError(f"None of {len(starts)} boundary pieces join up.")
+
+    rings = []
+    for first in range(len(starts)):
+        if used[first]:
+            continue
+        used[first] = True
+        path = [first]
+        node = end_nodes[first]
+        while node != start_nodes[first]:
+            following = next((piece for piece in outgoing.get(node, ()) if not used[piece]), None)
+            if following is None:
+                end = ends[path[-1]]
+                if np.hypot(*(end - starts[first])) <= gap:
+                    break
+                unused = np.flatnonzero(~np.array(used))
+                misses = np.hypot(*(starts[unused] - end).T)
+                if not len(unused) or misses.min() > gap:
+                    raise InsetError(f"An offset ring of {len(path)} pieces does not close.")
+                following = int(unused[misses.argmin()])
+            used[following] = True
+            path.append(following)
+            node = end_nodes[following]
+        rings.append(_drop_collinear(starts[path]))
+    return rings
+
+def _offset_lines(ring, distances):
+    # Every edge's offset, joined end to start in order, as one closed ring
+    edges = np.roll(ring, -1, axis=0) - ring
+    normals = np.column_stack((-edges[:, 1], edges[:, 0])) / np.hypot(edges[:, 0], edges[:, 1])[:, None]
+    shifts = normals * distances[:, None]
+    loop = np.stack((ring + shifts, np.roll(ring, -1, axis=0) + shifts), axis=1).reshape(-1, 2)
+    loop = loop[np.hypot(*(loop - np.roll(loop, 1, axis=0)).T) > EPSILON * _scale(ring)]
+    return np.vstack((loop, loop[:1]))
+
+def _trace_inset(ring, distances):
+    scale = _scale(ring)
+    tolerance = 1e-9 * scale
+    regions, starts, ends = _offset_pieces(ring, distances)
+    keep = np.hypot(*(ends - starts).T) > tolerance
+    starts, ends = _split_segments(starts[keep], ends[keep], tolerance)
+    if not len(starts):
+        return []
+    # Neighboring regions share sides
+    nodes = _node_ids(np.vstack((starts, ends)), tolerance).reshape(2, -1)
+    _, unique = np.unique(np.sort(nodes, axis=0), axis=1, return_index=True)
+    starts, ends = starts[unique], ends[unique]
+
+    # Test a point just to either side of every piece; pieces meeting at a
+    # shallow angle are only that far apart near the middle of the shorter one
+    vectors = ends - starts
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+    steps = (np.maximum(lengths * 1e-6, 1e-11 * scale) / lengths)[:, None] * np.column_stack((-vectors[:, 1], vectors[:, 0]))
+    middles = (starts + ends) / 2
+    samples = np.vstack((middles + steps, middles - steps))
+    remaining = _inside_ring(samples, ring) & ~_inside_any_region(samples, regions, 1e-12 * scale)
+    left, right = remaining[:len(starts)], remaining[len(starts):]
+
+    # Orient the boundary pieces with what remains on their left
+    forward, backward = left & ~right, right & ~left
+    boundary_starts = np.vstack((starts[forward], ends[backward]))
+    boundary_ends = np.vstack((ends[forward], starts[backward]))
+    if not len(boundary_starts):
+        return []
+
+    min_area = EPSILON * abs(signed_area(ring))
+    return [
+        np.vstack((loop, loop[:1])) for loop in _chain_rings(boundary_starts, boundary_ends, tolerance, 1e-6 * scale)
+        if len(loop) >= 3 and abs(signed_area(loop)) > min_area
+    ]
+
+def inset_polygon(points, distances):
+    """
+    Computes the inward parallel offset of a polygon with a distance per edge.
+
+    The result keeps every point at least its edge's distance from each
+    edge's line, with reflex corners mitered up to MITER_LIMIT times the
+    offset and beveled beyond. Rather than tracing the raw offset curve and
+    untangling its loops, the area the setbacks take is split into convex
+    pieces, the sides the boundary can follow are cut wherever they cross,
+    and a cut side is kept when what remains of the polygon lies on exactly
+    one side of it. That holds up where offsets overlap, edges collapse, the
+    parcel pinches in two or offsets run collinear. Sorting and grid buckets
+    keep the cost at O(n log n) for n courses plus the crossings and nearby
+    pieces tested.
+
+    Should that work exceed MAX_CANDIDATE_PAIRS, or the boundary fail to
+    close into rings, a warning is logged and the untrimmed offset of every
+    edge is returned as one ring instead, so a plan still shows its setbacks.
+
+    Parameters:
+    - points: Polygon vertices in traverse order; an open traverse is closed
+    - distances: Offset of every edge of normalize_ring(points) (edge i runs
+      from vertex i to i + 1), or one distance for all edges
+
+    Returns:
+    - List of closed rings as (k + 1, 2) arrays whose last point repeats the
+      first; outer rings run counter-clockwise, holes clockwise
+    """
+    ring = normalize_ring(points)
+    if len(ring) < 3:
+        return []
+    distances = np.broadcast_to(np.asarray(distances, dtype=float), (len(ring),)).copy()
+    if not np.any(distances > 0):
+        return [np.vstack((ring, ring[:1]))]
+    try:
+        return _trace_inset(ring, distances)
+    except InsetError as error:
+        logger.warning(f"Drawing untrimmed offsets for a {len(ring)}-course boundary: {error}")
+        return [_offset_lines(ring, distances)]
@@ -0,0 +1,91 @@
+# siteplans/utils/plan_geometry.py
+
+import logging
+import numpy as np
+from ..models import BoundaryPoint, PlanGeometry, SitePlan
+from .traverse import closure, polygon_area, traverse_from_boundary_points
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+COORDINATE_DTYPE = np.dtype('<f8')
+
+def pack_coordinates(points):
+    """
+    Packs (x, y) points into bytes of little-endian float64 pairs.
+    """
+    return np.ascontiguousarray(points, dtype=COORDINATE_DTYPE).tobytes()
+
+def unpack_coordinates(data):
+    """
+    Returns packed coordinates as an (n, 2) float array.
+    """
+    return np.frombuffer(bytes(data), dtype=COORDINATE_DTYPE).reshape(-1, 2)
+
+def plan_geometry_values(boundary_points):
+    """
+    Computes the PlanGeometry field values for boundary points in traverse order.
+    """
+    traverse = traverse_from_boundary_points(boundary_points)
+    perimeter, error, precision = closure(traverse)
+    min_x, min_y, max_x, max_y = traverse.bbox
+    return {
+        'coordinates': pack_coordinates(traverse.points),
+        'vertex_count': len(traverse.points),
+        'min_x': min_x,
+        'min_y': min_y,
+        'max_x': max_x,
+        'max_y': max_y,
+        'perimeter': perimeter,
+        'area': polygon_area(traverse.points),
+        'closure_error': error,
+        'closure_precision': precision,
+    }
+
+def refresh_plan_geometry(site_plan_id, boundary_points=None):
+    """
+    Recomputes and stores the geometry of one site plan.
+
+    Parameters:
+    - site_plan_id: SitePlan primary key
+    - boundary_points: The plan's boundary points in traverse order, if already loaded
+
+    Returns:
+    - PlanGeometry, or None if the site plan no longer exists
+    """
+    updated_at = SitePlan.objects.filter(pk=site_plan_id).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+    if boundary_points is None:
+        boundary_points = list(BoundaryPoint.objects.filter(site_plan_id=site_plan_id).order_by('id'))
+    values = plan_geometry_values(boundary_points)
+    values['source_updated_at'] = updated_at
+    geometry, _ = PlanGeometry.objects.update_or_create(site_plan_id=site_plan_id, defaults=values)
+    return geometry
+
+def refresh_plan_geometries(parcels):
+    """
+    Stores the geometry of newly created site plans with one bulk insert.
+
+    Parameters:
+    - parcels: Iterable of (saved SitePlan, its boundary points in traverse order)
+    """
+    records = [
+        PlanGeometry(site_plan=site_plan, source_updated_at=site_plan.updated_at, **plan_geometry_values(points))
+        for site_plan, points in parcels
+    ]
+    PlanGeometry.objects.bulk_create(records)
+
+def get_plan_geometry(site_plan):
+    """
+    Returns the stored geometry of a site plan, recomputing it if it is missing or stale.
+    """
+    try:
+        geometry = site_plan.geometry
+    except PlanGeometry.DoesNotExist:
+        geometry = None
+    if geometry is None or geometry.source_updated_at != site_plan.updated_at:
+        logger.debug(f"Refreshing stale geometry for Site Plan {site_plan.pk}")
+        geometry = refresh_plan_geometry(site_plan.pk)
+        site_plan.geometry = geometry
+    return geometry
@@ -0,0 +1,225 @@
+# siteplans/utils/profiling.py
+
+import asyncio
+import cProfile
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import wraps
+from typing import Dict, Optional
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Called with every finished RenderProfile (see the SITEPLANS_PROFILE_HOOKS setting)
+DEFAULT_PROFILE_HOOKS = [
+    'siteplans.utils.profiling.log_profile',
+    'siteplans.utils.profiling.record_profile',
+    'siteplans.utils.profiling.dump_cprofile',
+]
+
+@dataclass
+class RenderProfile:
+    name: str
+    stages: Dict[str, float] = field(default_factory=dict)  # stage name -> seconds, summed over repeats
+    total: float = 0.0  # seconds for the whole profiled block
+    profiler: Optional[cProfile.Profile] = None
+
+    def add(self, stage_name, seconds):
+        self.stages[stage_name] = self.stages.get(stage_name, 0.0) + seconds
+
+    def server_timing(self):
+        """
+        Returns the stages as a Server-Timing header value, in milliseconds.
+        """
+        metrics = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in self.stages.items()]
+        metrics.append(f"total;dur={self.total * 1000:.2f}")
+        return ', '.join(metrics)
+
+def profiling_enabled():
+    # Off in production unless SITEPLANS_PROFILING turns it on
+    return getattr(settings, 'SITEPLANS_PROFILING', settings.DEBUG)
+
+_current_profile = ContextVar('siteplans_render_profile', default=None)
+
+def current_profile():
+    """
+    Returns the RenderProfile being collected, or None outside render_profile.
+    """
+    return _current_profile.get()
+
+@contextmanager
+def stage(name):
+    """
+    Times a named pipeline stage into the current profile; a no-op without one.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+@contextmanager
+def render_profile(name, cprofile=None):
+    """
+    Collects stage timings for a block and passes the result to the profile hooks.
+
+    Nested calls share the outermost profile, so a request and the renderer
+    it calls report once. With SITEPLANS_PROFILING off nothing is collected
+    and None is yielded.
+
+    Parameters:
+    - name: Profile name, e.g. the view name
+    - cprofile: Also run cProfile over the block; defaults to SITEPLANS_PROFILE_CPROFILE
+
+    Yields:
+    - RenderProfile, or None when profiling is off
+    """
+    if not profiling_enabled():
+        yield None
+        return
+
+    outer = _current_profile.get()
+    if outer is not None:
+        yield outer
+        return
+
+    if cprofile is None:
+        cprofile = getattr(settings, 'SITEPLANS_PROFILE_CPROFILE', False)
+
+    profile = RenderProfile(name)
+    token = _current_profile.set(profile)
+    if cprofile:
+        profile.profiler = cProfile.Profile()
+        try:
+            profile.profiler.enable()
+        except ValueError as e:
+            # Another profiler is already active in this thread
+            logger.warning(f"cProfile unavailable for {name}: {e}")
+            profile.profiler = None
+
+    start = time.perf_counter()
+    try:
+        yield profile
+    finally:
+        profile.total = time.perf_counter() - start
+        if profile.profiler is not None:
+            profile.profiler.disable()
+        _current_profile.reset(token)
+        run_profile_hooks(profile)
+
+def run_profile_hooks(profile):
+    """
+    Passes a finished profile to every hook in SITEPLANS_PROFILE_HOOKS.
+    """
+    for path in getattr(settings, 'SITEPLANS_PROFILE_HOOKS', DEFAULT_PROFILE_HOOKS):
+        try:
+            import_string(path)(profile)
+        except Exception as e:
+            logger.error(f"Profile hook {path} failed: {e}")
+
+def _wants_cprofile(request):
+    return getattr(settings, 'SITEPLANS_PROFILE_CPROFILE', False) or (settings.DEBUG and 'profile' in request.GET)
+
+def profile_view(view):
+    """
+    Decorator that profiles a view and adds a Server-Timing header to its response.
+
+    Works on both sync and async views. With DEBUG on, a ?profile query
+    parameter also turns on cProfile for that request (for async views it
+    only sees the event loop thread). With SITEPLANS_PROFILING off the view
+    runs unwrapped and the header is left out.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped_async(request, *args, **kwargs):
+            if not profiling_enabled():
+                return await view(request, *args, **kwargs)
+            with render_profile(view.__name__, cprofile=_wants_cprofile(request)) as profile:
+                response = await view(request, *args, **kwargs)
+            response.headers['Server-Timing'] = profile.server_timing()
+            return response
+        return wrapped_async
+
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not profiling_enabled():
+            return view(request, *args, **kwargs)
+        with render_profile(view.__name__, cprofile=_wants_cprofile(request)) as profile:
+            response = view(request, *args, **kwargs)
+        response.headers['Server-Timing'] = profile.server_timing()
+        return response
+    return wrapped
+
+# Hooks
+
+def log_profile(profile):
+    stages = ', '.join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in profile.stages.items())
+    logger.info(f"{profile.name} took {profile.total * 1000:.1f}ms ({stages})")
+
+_stats_lock = threading.Lock()
+_stats = {}
+
+def _accumulate(entry, seconds):
+    entry['count'] += 1
+    entry['total_ms'] += seconds * 1000
+    entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+
+def record_profile(profile):
+    """
+    Adds a profile to the in-process aggregate counters (one set per worker process).
+    """
+    with _stats_lock:
+        entry = _stats.setdefault(profile.name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'stages': {}})
+        _accumulate(entry, profile.total)
+        for name, seconds in profile.stages.items():
+            _accumulate(entry['stages'].setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0}), seconds)
+
+def dump_cprofile(profile):
+    """
+    Writes the profile's cProfile stats, if collected, to SITEPLANS_PROFILE_DIR.
+    """
+    if profile.profiler is None:
+        return
+    directory = getattr(settings, 'SITEPLANS_PROFILE_DIR', None) or tempfile.gettempdir()
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{profile.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.perf_counter_ns()}.prof")
+    profile.profiler.dump_stats(path)
+    logger.info(f"Wrote cProfile stats for {profile.name} to {path}")
+
+def get_profile_stats():
+    """
+    Returns the aggregate counters with mean durations, keyed by profile name.
+    """
+    with _stats_lock:
+        stats = {}
+        for name, entry in _stats.items():
+            stats[name] = {
+                'count': entry['count'],
+                'mean_ms': round(entry['total_ms'] / entry['count'], 3),
+                'max_ms': round(entry['max_ms'], 3),
+                'stages': {
+                    stage_name: {
+                        'count': stage_entry['count'],
+                        'mean_ms': round(stage_entry['total_ms'] / stage_entry['count'], 3),
+                        'max_ms': round(stage_entry['max_ms'], 3),
+                    }
+                    for stage_name, stage_entry in entry['stages'].items()
+                },
+            }
+        return {'pid': os.getpid(), 'profiles': stats}
+
+def reset_profile_stats():
+    with _stats_lock:
+        _stats.clear()
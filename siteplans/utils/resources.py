@@ -0,0 +1,85 @@
+# siteplans/utils/resources.py
+
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Union
+from django.conf import settings
+from PIL import Image, ImageFont
+from . import zoning
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEGEND_FONT_SIZE = 20
+DEFAULT_LABEL_FONT_SIZE = None  # Pillow's built-in bitmap font
+
+Font = Union[ImageFont.ImageFont, ImageFont.FreeTypeFont]
+
+@dataclass(frozen=True)
+class RenderResources:
+    legend_font: Font
+    label_font: Font  # vertex and easement labels
+    legend_tile: Image.Image  # RGBA legend; see drawing.render_legend_tile
+    compact_legend_tile: Image.Image  # the legend over drawing.RASTER_PALETTE, for compact canvases
+    compact_legend_mask: Image.Image
+
+_resources = None
+_resources_lock = threading.Lock()
+
+def load_font(size=None):
+    """
+    Loads the SITEPLANS_FONT_PATH font at the given size.
+
+    Falls back to Pillow's built-in font when no path is configured or it
+    cannot be read; size None always gives the built-in bitmap font.
+    """
+    if size is None:
+        return ImageFont.load_default()
+    path = getattr(settings, 'SITEPLANS_FONT_PATH', None)
+    if path:
+        try:
+            return ImageFont.truetype(str(path), size)
+        except OSError:
+            logger.warning(f"Font {path} could not be loaded. Using the default font.")
+    return ImageFont.load_default(size)
+
+def _build_render_resources():
+    from .drawing import palettize_legend_tile, render_legend_tile
+
+    legend_font = load_font(getattr(settings, 'SITEPLANS_LEGEND_FONT_SIZE', DEFAULT_LEGEND_FONT_SIZE))
+    label_font = load_font(getattr(settings, 'SITEPLANS_LABEL_FONT_SIZE', DEFAULT_LABEL_FONT_SIZE))
+    legend_tile = render_legend_tile(legend_font)
+    return RenderResources(legend_font, label_font, legend_tile, *palettize_legend_tile(legend_tile))
+
+def get_render_resources():
+    """
+    Returns the process-wide fonts and legend tile, building them on first use.
+    """
+    global _resources
+    if _resources is None:
+        with _resources_lock:
+            if _resources is None:
+                _resources = _build_render_resources()
+    return _resources
+
+def reset_render_resources():
+    """
+    Drops the cached resources so the next render rebuilds them from the current settings.
+    """
+    global _resources
+    with _resources_lock:
+        _resources = None
+
+def preload_render_resources(include_zoning=False):
+    """
+    Builds the render resources ahead of the first request.
+
+    Parameters:
+    - include_zoning: Also load and compile every city's zoning. This queries
+      the database, so call it once a worker is serving (gunicorn's
+      post_worker_init hook) rather than from AppConfig.ready
+    """
+    get_render_resources()
+    if include_zoning:
+        zoning.preload_city_zoning()
@@ -0,0 +1,93 @@
+# siteplans/utils/simplify.py
+
+import logging
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+def simplify_polyline(points, tolerance):
+    """
+    Douglas-Peucker simplification of a polyline.
+
+    Each pass keeps the vertex farthest from the chord of its span whenever
+    that distance exceeds the tolerance, so no dropped vertex lies farther
+    than the tolerance from the simplified line. Distances are measured to
+    the chord segment, which keeps spikes that double back past its ends.
+
+    Parameters:
+    - points: Sequence of (x, y) vertices, e.g. in pixels
+    - tolerance: Largest allowed deviation; 0 or less keeps every vertex
+
+    Returns:
+    - Ascending integer array of kept vertex indices; the first and last are always kept
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    count = len(points)
+    if count < 3 or tolerance <= 0:
+        return np.arange(count)
+
+    # Vertices repeating their predecessor (sub-pixel chords once rounded to
+    # pixels) never deviate; dropping them in one pass spares most spans
+    distinct = np.flatnonzero(np.concatenate(([True], np.any(points[1:] != points[:-1], axis=1))))
+    if distinct[-1] != count - 1:
+        distinct = np.append(distinct, count - 1)
+    if len(distinct) < count:
+        return distinct[simplify_polyline(points[distinct], tolerance)]
+
+    keep = np.zeros(count, dtype=bool)
+    keep[[0, -1]] = True
+    spans = [(0, count - 1)]
+    while spans:
+        first, last = spans.pop()
+        if last - first < 2:
+            continue
+        start = points[first]
+        chord = points[last] - start
+        inner = points[first + 1:last] - start
+        chord_squared = chord @ chord
+        t = np.clip(inner @ chord / chord_squared, 0.0, 1.0) if chord_squared > 0 else np.zeros(len(inner))
+        deviations = inner - t[:, None] * chord
+        distances = np.hypot(deviations[:, 0], deviations[:, 1])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            index = first + 1 + farthest
+            keep[index] = True
+            spans.append((first, index))
+            spans.append((index, last))
+    return np.flatnonzero(keep)
+
+def declutter_boxes(boxes):
+    """
+    Greedily picks boxes that do not overlap any box picked before them.
+
+    Earlier boxes win, so markers along a traverse keep their order of
+    precedence; a spatial hash keeps each check to the nearby picks.
+
+    Parameters:
+    - boxes: Sequence of (left, top, right, bottom) rectangles
+
+    Returns:
+    - List of the indices of the kept boxes, ascending
+    """
+    if not len(boxes):
+        return []
+    cell = max(max(right - left, bottom - top) for left, top, right, bottom in boxes) or 1
+    grid = {}
+    kept = []
+    for index, box in enumerate(boxes):
+        left, top, right, bottom = box
+        cells = [
+            (cx, cy)
+            for cx in range(int(left // cell), int(right // cell) + 1)
+            for cy in range(int(top // cell), int(bottom // cell) + 1)
+        ]
+        if any(
+            left < other[2] and other[0] < right and top < other[3] and other[1] < bottom
+            for key in cells for other in grid.get(key, ())
+        ):
+            continue
+        for key in cells:
+            grid.setdefault(key, []).append(box)
+        kept.append(index)
+    return kept
@@ -0,0 +1,400 @@
+# siteplans/utils/spatial.py
+
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from ..models import PlanGeometry
+from .plan_geometry import unpack_coordinates
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+DEFAULT_NODE_CAPACITY = 16  # entries per R-tree node
+DEFAULT_SYNC_INTERVAL = 5.0  # seconds between checks for plans changed by other processes
+SYNC_OVERLAP = timedelta(seconds=60)  # re-read window that covers geometry refreshed after its plan's commit
+REBUILD_MIN_CHANGES = 64
+EXACT_MATCH_BATCH = 500  # candidate ids per query, well under SQLite's bound-parameter limit
+
+# Plans without a survey tie have no place in the shared grid
+TIED = Q(site_plan__origin_x__isnull=False, site_plan__origin_y__isnull=False)
+
+class ParcelIndex:
+    """
+    Static STR-packed R-tree over parcel bounding boxes, with an overflow
+    buffer for incremental updates.
+
+    Entries are sorted into Sort-Tile-Recursive order, so each node's
+    children are contiguous and every tree level is just an (n, 4) array of
+    boxes that a query filters with numpy. Upserts go to a small overflow
+    list and replaced or removed packed entries are tombstoned; the tree is
+    repacked once the changes exceed a tenth of its size.
+
+    Boxes are (min_x, min_y, max_x, max_y) in the shared survey grid.
+    """
+
+    def __init__(self, ids=(), boxes=(), node_capacity=DEFAULT_NODE_CAPACITY):
+        self.node_capacity = node_capacity
+        self.watermark = None  # latest SitePlan.updated_at reflected in the index
+        self._pack(np.asarray(ids, dtype=np.int64), np.asarray(boxes, dtype=float).reshape(-1, 4))
+
+    def _pack(self, ids, boxes, ordered=False):
+        if not ordered:
+            order = str_order(boxes, self.node_capacity)
+            ids, boxes = ids[order], boxes[order]
+        self.ids = ids
+        self.levels = [boxes]
+        while len(self.levels[-1]) > 1:
+            self.levels.append(_parent_boxes(self.levels[-1], self.node_capacity))
+        self._positions = {int(site_plan_id): i for i, site_plan_id in enumerate(self.ids)}
+        self._removed = set()
+        self._extra = {}  # site plan id -> box, entries added since packing
+
+    @classmethod
+    def from_packed(cls, ids, boxes, node_capacity=DEFAULT_NODE_CAPACITY):
+        """
+        Rebuilds an index from entries that are already in STR order, e.g. loaded from disk.
+        """
+        index = cls(node_capacity=node_capacity)
+        index._pack(np.asarray(ids, dtype=np.int64), np.asarray(boxes, dtype=float).reshape(-1, 4), ordered=True)
+        return index
+
+    def __len__(self):
+        return len(self.ids) - len(self._removed) + len(self._extra)
+
+    def __contains__(self, site_plan_id):
+        return site_plan_id in self._extra or (site_plan_id in self._positions and site_plan_id not in self._removed)
+
+    def entries(self):
+        """
+        Returns the live (ids, boxes), compacted.
+        """
+        keep = np.fromiter((int(i) not in self._removed for i in self.ids), dtype=bool, count=len(self.ids))
+        ids, boxes = self.ids[keep], self.levels[0][keep]
+        if self._extra:
+            ids = np.concatenate((ids, np.fromiter(self._extra.keys(), dtype=np.int64, count=len(self._extra))))
+            boxes = np.vstack((boxes, np.asarray(list(self._extra.values()), dtype=float)))
+        return ids, boxes
+
+    def upsert(self, site_plan_id, box):
+        if site_plan_id in self._positions:
+            self._removed.add(site_plan_id)
+        self._extra[site_plan_id] = tuple(float(v) for v in box)
+        self._maybe_repack()
+
+    def remove(self, site_plan_id):
+        if site_plan_id in self._positions:
+            self._removed.add(site_plan_id)
+        self._extra.pop(site_plan_id, None)
+        self._maybe_repack()
+
+    def _maybe_repack(self):
+        changes = len(self._removed) + len(self._extra)
+        if changes > max(REBUILD_MIN_CHANGES, len(self.ids) // 10):
+            self.repack()
+
+    def repack(self):
+        self._pack(*self.entries())
+
+    def query_bbox(self, min_x, min_y, max_x, max_y):
+        """
+        Returns the ids of entries whose box intersects the given box (edges included).
+        """
+        query = (min_x, min_y, max_x, max_y)
+        hits = np.empty(0, dtype=np.int64)
+        if len(self.ids):
+            nodes = np.arange(len(self.levels[-1]))
+            for level in range(len(self.levels) - 1, 0, -1):
+                nodes = nodes[_intersects(self.levels[level][nodes], query)]
+                children = (nodes[:, None] * self.node_capacity + np.arange(self.node_capacity)).ravel()
+                nodes = children[children < len(self.levels[level - 1])]
+            nodes = nodes[_intersects(self.levels[0][nodes], query)]
+            hits = self.ids[nodes]
+            if self._removed:
+                hits = hits[np.fromiter((int(i) not in self._removed for i in hits), dtype=bool, count=len(hits))]
+        if self._extra:
+            extra_ids = np.fromiter(self._extra.keys(), dtype=np.int64, count=len(self._extra))
+            extra_boxes = np.asarray(list(self._extra.values()), dtype=float)
+            hits = np.concatenate((hits, extra_ids[_intersects(extra_boxes, query)]))
+        return hits
+
+    def query_point(self, x, y):
+        """
+        Returns the ids of entries whose box contains the point.
+        """
+        return self.query_bbox(x, y, x, y)
+
+    def save(self, path):
+        """
+        Writes the compacted index to path, atomically.
+        """
+        self.repack()
+        directory = os.path.dirname(os.fspath(path))
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{os.fspath(path)}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.int64(INDEX_FORMAT_VERSION),
+                node_capacity=np.int64(self.node_capacity),
+                ids=self.ids,
+                boxes=self.levels[0],
+                watermark=np.array(self.watermark.isoformat() if self.watermark else ''),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Reads an index written by save.
+
+        Returns:
+        - ParcelIndex, or None if the file is missing or in an older format
+        """
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data['version']) != INDEX_FORMAT_VERSION:
+                    return None
+                index = cls.from_packed(data['ids'], data['boxes'], int(data['node_capacity']))
+                index.watermark = parse_datetime(str(data['watermark'])) if str(data['watermark']) else None
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable spatial index {path}: {e}")
+            return None
+        return index
+
+def str_order(boxes, node_capacity=DEFAULT_NODE_CAPACITY):
+    """
+    Returns the Sort-Tile-Recursive ordering of boxes.
+
+    Box centers are cut into vertical slices of about sqrt(leaf count) nodes
+    each, and sorted by y within every slice.
+    """
+    count = len(boxes)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+    centers_x = (boxes[:, 0] + boxes[:, 2]) / 2
+    centers_y = (boxes[:, 1] + boxes[:, 3]) / 2
+    leaf_count = -(-count // node_capacity)
+    slice_size = int(np.ceil(np.sqrt(leaf_count))) * node_capacity
+    rank_x = np.empty(count, dtype=np.int64)
+    rank_x[np.argsort(centers_x, kind='stable')] = np.arange(count)
+    return np.lexsort((centers_y, rank_x // slice_size))
+
+def _parent_boxes(boxes, node_capacity):
+    starts = np.arange(0, len(boxes), node_capacity)
+    return np.column_stack((
+        np.minimum.reduceat(boxes[:, 0], starts),
+        np.minimum.reduceat(boxes[:, 1], starts),
+        np.maximum.reduceat(boxes[:, 2], starts),
+        np.maximum.reduceat(boxes[:, 3], starts),
+    ))
+
+def _intersects(boxes, query):
+    min_x, min_y, max_x, max_y = query
+    return (boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x) & (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y)
+
+# Exact tests against a parcel's traverse, closed back to its first point
+
+def polygon_contains_point(points, x, y):
+    """
+    Returns whether the point lies inside the polygon (even-odd rule).
+    """
+    xs, ys = points[:, 0], points[:, 1]
+    next_xs, next_ys = np.roll(xs, -1), np.roll(ys, -1)
+    crosses = (ys > y) != (next_ys > y)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        intersect_x = xs + (y - ys) * (next_xs - xs) / (next_ys - ys)
+    return bool(np.count_nonzero(crosses & (x < intersect_x)) % 2)
+
+def polygon_intersects_bbox(points, min_x, min_y, max_x, max_y):
+    """
+    Returns whether the polygon and the box share any point.
+    """
+    if polygon_contains_point(points, min_x, min_y):
+        return True  # The box is inside the polygon, or straddles it at this corner
+    # Clip every edge against the box (Liang-Barsky); an edge touching the box is a hit
+    starts = points
+    deltas = np.roll(points, -1, axis=0) - points
+    t_enter = np.zeros(len(points))
+    t_exit = np.ones(len(points))
+    for axis, low, high in ((0, min_x, max_x), (1, min_y, max_y)):
+        start, delta = starts[:, axis], deltas[:, axis]
+        parallel = delta == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t_low = (low - start) / delta
+            t_high = (high - start) / delta
+        inside = (start >= low) & (start <= high)
+        t_enter = np.maximum(t_enter, np.where(parallel, np.where(inside, -np.inf, np.inf), np.minimum(t_low, t_high)))
+        t_exit = np.minimum(t_exit, np.where(parallel, np.where(inside, np.inf, -np.inf), np.maximum(t_low, t_high)))
+    return bool(np.any(t_enter <= t_exit))
+
+# Process-wide index, kept in sync with PlanGeometry
+
+_lock = threading.RLock()
+_index = None
+_pending = set()  # site plan ids saved or deleted in this process since the last sync
+_last_sync = 0.0
+
+def get_index_path():
+    return getattr(settings, 'SITEPLANS_SPATIAL_INDEX_PATH', None)
+
+def _index_rows(queryset):
+    return queryset.values_list(
+        'site_plan_id', 'min_x', 'min_y', 'max_x', 'max_y',
+        'site_plan__origin_x', 'site_plan__origin_y', 'site_plan__updated_at',
+    )
+
+def _entry(row):
+    # (site plan id, box in the survey grid), the box None for a plan without a survey tie
+    site_plan_id, min_x, min_y, max_x, max_y, origin_x, origin_y, _ = row
+    if origin_x is None or origin_y is None:
+        return site_plan_id, None
+    return site_plan_id, (min_x + origin_x, min_y + origin_y, max_x + origin_x, max_y + origin_y)
+
+def build_parcel_index():
+    """
+    Builds the index from every stored PlanGeometry with a survey tie, with one query.
+    """
+    rows = list(_index_rows(PlanGeometry.objects.all()))
+    entries = [entry for entry in map(_entry, rows) if entry[1] is not None]
+    index = ParcelIndex([e[0] for e in entries], [e[1] for e in entries])
+    index.watermark = max((row[-1] for row in rows), default=None)
+    return index
+
+def _sync(index):
+    """
+    Applies plan changes made since the index's watermark, by any process.
+
+    Falls back to a full rebuild when the plan count disagrees, i.e. plans
+    were deleted by another process.
+    """
+    condition = Q(site_plan_id__in=_pending)
+    if index.watermark is not None:
+        condition |= Q(site_plan__updated_at__gte=index.watermark - SYNC_OVERLAP)
+    else:
+        condition = Q()
+    seen = set()
+    watermark = index.watermark
+    for row in _index_rows(PlanGeometry.objects.filter(condition)):
+        site_plan_id, box = _entry(row)
+        if box is None:
+            index.remove(site_plan_id)
+        else:
+            index.upsert(site_plan_id, box)
+        seen.add(site_plan_id)
+        watermark = row[-1] if watermark is None else max(watermark, row[-1])
+    for site_plan_id in _pending - seen:
+        index.remove(site_plan_id)
+    index.watermark = watermark
+    _pending.clear()
+
+    if PlanGeometry.objects.filter(TIED).count() != len(index):
+        logger.info("Spatial index out of step with the database; rebuilding")
+        return build_parcel_index(), True
+    return index, False
+
+def get_parcel_index():
+    """
+    Returns this process's parcel index, loading or building it on first use.
+
+    The index is loaded from SITEPLANS_SPATIAL_INDEX_PATH when that file
+    exists and brought up to date incrementally; plans saved elsewhere are
+    picked up every SITEPLANS_SPATIAL_INDEX_SYNC_INTERVAL seconds, and plans
+    saved in this process on the next query.
+    """
+    global _index, _last_sync
+    interval = getattr(settings, 'SITEPLANS_SPATIAL_INDEX_SYNC_INTERVAL', DEFAULT_SYNC_INTERVAL)
+    path = get_index_path()
+    with _lock:
+        if _index is None:
+            started = time.perf_counter()
+            index = ParcelIndex.load(path) if path else None
+            if index is None:
+                index, rebuilt = build_parcel_index(), True
+            else:
+                index, rebuilt = _sync(index)
+            _pending.clear()
+            if rebuilt and path:
+                index.save(path)
+            _index, _last_sync = index, time.monotonic()
+            logger.info(f"Spatial index of {len(index)} parcels ready in {(time.perf_counter() - started) * 1000:.1f}ms")
+        elif _pending or time.monotonic() - _last_sync >= interval:
+            _index, rebuilt = _sync(_index)
+            _last_sync = time.monotonic()
+            if rebuilt and path:
+                _index.save(path)
+        return _index
+
+def note_site_plan_changed(site_plan_id):
+    """
+    Marks a site plan for re-indexing on the next query (called from signals).
+    """
+    with _lock:
+        if _index is not None:
+            _pending.add(site_plan_id)
+
+def reset_parcel_index():
+    """
+    Drops the in-memory index; the next query loads or rebuilds it.
+    """
+    global _index, _last_sync
+    with _lock:
+        _index = None
+        _pending.clear()
+        _last_sync = 0.0
+
+def save_parcel_index(path=None):
+    """
+    Rebuilds the index from the database and writes it to path (default SITEPLANS_SPATIAL_INDEX_PATH).
+
+    Returns:
+    - ParcelIndex
+    """
+    global _index, _last_sync
+    path = path or get_index_path()
+    with _lock:
+        index = build_parcel_index()
+        if path:
+            index.save(path)
+        _index, _last_sync = index, time.monotonic()
+        _pending.clear()
+        return index
+
+def _exact_matches(candidates, test):
+    # One query per batch of candidates for their coordinates, then an exact test per parcel
+    candidates = candidates.tolist()
+    matches = []
+    for first in range(0, len(candidates), EXACT_MATCH_BATCH):
+        rows = PlanGeometry.objects.filter(TIED, site_plan_id__in=candidates[first:first + EXACT_MATCH_BATCH]).values_list(
+            'site_plan_id', 'coordinates', 'site_plan__origin_x', 'site_plan__origin_y',
+        )
+        for site_plan_id, coordinates, origin_x, origin_y in rows:
+            points = unpack_coordinates(coordinates)
+            if len(points) and test(points + (origin_x, origin_y)):
+                matches.append(site_plan_id)
+    return sorted(matches)
+
+def plans_containing_point(x, y):
+    """
+    Returns the ids of the site plans whose parcel contains the point.
+    """
+    with _lock:
+        candidates = get_parcel_index().query_point(x, y)
+    return _exact_matches(candidates, lambda points: polygon_contains_point(points, x, y))
+
+def plans_intersecting_bbox(min_x, min_y, max_x, max_y):
+    """
+    Returns the ids of the site plans whose parcel overlaps or touches the box.
+    """
+    with _lock:
+        candidates = get_parcel_index().query_bbox(min_x, min_y, max_x, max_y)
+    return _exact_matches(candidates, lambda points: polygon_intersects_bbox(points, min_x, min_y, max_x, max_y))
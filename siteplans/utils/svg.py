@@ -0,0 +1,124 @@
+# siteplans/utils/svg.py
+
+import logging
+from xml.sax.saxutils import escape
+from .dashes import DASH_PATTERNS
+from .drawing import (
+    BOUNDARY_STYLE, EASEMENT_STYLES, LEGEND_SPACING, LEGEND_TEXT_X, canvas_transform, compute_site_plan_geometry,
+    site_plan_canvas_size,
+)
+from .profiling import stage
+from . import zoning
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+SVG_CONTENT_TYPE = 'image/svg+xml'
+SVG_CHUNK_ELEMENTS = 500  # elements per streamed chunk
+
+def _points_attribute(points):
+    return ' '.join(f"{x},{y}" for x, y in points)
+
+def _stroke_style(style):
+    declarations = [f"stroke:{style['color']}"]
+    pattern = DASH_PATTERNS.get(style['style'])
+    if pattern:
+        declarations.append(f"stroke-dasharray:{' '.join(map(str, pattern))}")
+    return ';'.join(declarations)
+
+def _stylesheet():
+    rules = [
+        "polyline,polygon,line{fill:none}",
+        f".boundary{{{_stroke_style(BOUNDARY_STYLE)};stroke-width:3}}",
+        *(f".easement-{kind}{{{_stroke_style(style)};stroke-width:2}}" for kind, style in enumerate(EASEMENT_STYLES)),
+        ".marker{fill:red;stroke:black}",
+        "text{font-family:sans-serif;font-size:11px;dominant-baseline:hanging}",
+        ".vertex-label{fill:blue}",
+        ".legend text{font-size:20px}",
+    ]
+    return f"<style>{''.join(rules)}</style>"
+
+def _legend(margin):
+    # Same layout as the raster legend tile, pasted at (margin + 8, margin)
+    items = [('Boundary', 'boundary'), *((name, f"easement-{kind}") for kind, name in enumerate(zoning.EASEMENT_NAMES))]
+    parts = [f'<g class="legend" transform="translate({margin + 8},{margin})">']
+    for idx, (name, css_class) in enumerate(items):
+        top = idx * LEGEND_SPACING
+        parts.append(f'<line class="{css_class}" x1="2" y1="{top + 10}" x2="52" y2="{top + 10}" style="stroke-width:2"/>')
+        parts.append(f'<text x="{LEGEND_TEXT_X}" y="{top}">{escape(name)}</text>')
+    parts.append('</g>')
+    return ''.join(parts)
+
+def _chunked(elements):
+    chunk = []
+    for element in elements:
+        chunk.append(element)
+        if len(chunk) >= SVG_CHUNK_ELEMENTS:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+
+def iter_site_plan_svg(geometry, scale=30, ppi=96, margin=100):
+    """
+    Yields an SVG document of the geometry in chunks, for streaming responses.
+
+    Pixel coordinates, line styles and layout match render_site_plan, so the
+    SVG and raster previews line up; the viewBox lets clients scale it
+    without a re-render.
+    """
+    to_pixel = canvas_transform(geometry, scale, ppi, margin)
+    width, height = site_plan_canvas_size(geometry, scale, ppi, margin)
+    yield (
+        f'<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" viewBox="0 0 {width} {height}">'
+        f'{_stylesheet()}<rect width="100%" height="100%" fill="white"/>'
+    )
+
+    shifted_points = [to_pixel(x, y) for x, y in geometry.points.tolist()]
+    yield f'<polyline class="boundary" points="{_points_attribute(shifted_points)}"/>'
+
+    for easement in geometry.easements:
+        css_class = f"easement-{easement['kind']}"
+        for ring in easement['rings']:
+            # Rings repeat their first point; polygon closes itself
+            ring_points = [to_pixel(x, y) for x, y in ring[:-1].tolist()]
+            yield f'<polygon class="{css_class}" points="{_points_attribute(ring_points)}"/>'
+        if easement['label_point'] is not None:
+            x, y = to_pixel(*easement['label_point'])
+            yield f'<text x="{x + 10}" y="{y - 10}">{escape(easement["label"])}</text>'
+
+    yield '<g class="markers">'
+    yield from _chunked(
+        f'<circle class="marker" cx="{x}" cy="{y}" r="5"/>'
+        f'<text class="vertex-label" x="{x + 10}" y="{y - 10}">P{idx}</text>'
+        for idx, (x, y) in enumerate(shifted_points)
+    )
+    yield '</g>'
+    yield _legend(margin)
+    yield '</svg>\n'
+
+def render_site_plan_svg(site_plan, boundary_points, zoning_rules=None, scale=30, ppi=96, margin=100):
+    """
+    Renders a site plan as a streamed SVG document.
+
+    The geometry is computed before returning, so errors surface before any
+    output is sent; the document itself is produced while it is streamed.
+    Unlike the raster renderer there is no canvas size limit.
+
+    Parameters:
+    - Same as render_site_plan
+
+    Returns:
+    - Iterator of str chunks
+    """
+    geometry = compute_site_plan_geometry(site_plan, boundary_points, zoning_rules)
+    return iter_site_plan_svg(geometry, scale, ppi, margin)
+
+def site_plan_svg(site_plan, boundary_points, zoning_rules=None, scale=30, ppi=96, margin=100):
+    """
+    Returns the whole SVG document of a site plan as bytes (see render_site_plan_svg).
+    """
+    chunks = render_site_plan_svg(site_plan, boundary_points, zoning_rules, scale, ppi, margin)
+    with stage('svg'):
+        return ''.join(chunks).encode('utf-8')
@@ -0,0 +1,98 @@
+# siteplans/utils/tiles.py
+
+import logging
+import math
+from django.conf import settings
+from PIL import ImageDraw
+from .drawing import compute_site_plan_geometry, draw_site_plan_features, get_render_options, new_canvas, shift_easement
+from .profiling import stage
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+TILE_SIZE = 256  # pixels
+DEFAULT_TILE_MAX_ZOOM = 8
+TILE_PADDING = 0.05  # fraction of the plan extent left around it at every zoom
+
+class TileOutOfRangeError(ValueError):
+    """
+    Raised for tile coordinates outside the plan's tile pyramid.
+    """
+
+def get_tile_max_zoom():
+    return getattr(settings, 'SITEPLANS_TILE_MAX_ZOOM', DEFAULT_TILE_MAX_ZOOM)
+
+def validate_tile(z, x, y):
+    """
+    Raises TileOutOfRangeError unless (z, x, y) addresses a tile of the pyramid.
+    """
+    if not 0 <= z <= get_tile_max_zoom():
+        raise TileOutOfRangeError(f"Zoom {z} is outside 0-{get_tile_max_zoom()}")
+    if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise TileOutOfRangeError(f"Tile {x}/{y} is outside zoom {z}")
+
+def tile_transform(geometry, z):
+    """
+    Maps plan coordinates (feet, y north) onto the tile pyramid.
+
+    At zoom 0 the whole plan, padded by TILE_PADDING, fits one tile; every
+    zoom level doubles the resolution.
+
+    Returns:
+    - Tuple (pixels_per_foot, origin_x, origin_y); a point (x, y) lands at world
+      pixel ((x - origin_x) * pixels_per_foot, (origin_y - y) * pixels_per_foot)
+    """
+    min_x, min_y, max_x, max_y = geometry.bbox
+    extent = max(max_x - min_x, max_y - min_y, 1.0)
+    padding = extent * TILE_PADDING
+    pixels_per_foot = TILE_SIZE * 2 ** z / (extent + 2 * padding)
+    return pixels_per_foot, min_x - padding, max_y + padding
+
+def tile_pixel_transform(geometry, z, x, y):
+    """
+    Returns a function mapping (x, y) in feet to integer pixels of tile (z, x, y).
+
+    Points are floored to world pixels before the tile's offset is taken off,
+    so a point lands on the same world pixel from every tile and adjacent
+    tiles meet without seams.
+    """
+    pixels_per_foot, origin_x, origin_y = tile_transform(geometry, z)
+    left, top = x * TILE_SIZE, y * TILE_SIZE
+
+    def to_pixel(px, py):
+        return (
+            math.floor((px - origin_x) * pixels_per_foot) - left,
+            math.floor((origin_y - py) * pixels_per_foot) - top,
+        )
+    return to_pixel
+
+def render_site_plan_tile(site_plan, boundary_points, z, x, y, zoning_rules=None, options=None):
+    """
+    Renders one TILE_SIZE x TILE_SIZE tile of a site plan.
+
+    Only the tile's own canvas is allocated, so memory stays constant however
+    large the parcel or deep the zoom.
+
+    Parameters:
+    - site_plan: SitePlan instance
+    - boundary_points: QuerySet or list of BoundaryPoint instances, in traverse order
+    - z, x, y: Tile zoom and column/row (row 0 at the top)
+    - zoning_rules: Mapping of city name to CityZoning, or None to use the database
+    - options: RenderOptions; defaults to drawing.get_render_options()
+
+    Returns:
+    - PIL Image in P mode (compact) or RGB mode
+    """
+    validate_tile(z, x, y)
+    geometry = compute_site_plan_geometry(site_plan, boundary_points, zoning_rules)
+    to_pixel = tile_pixel_transform(geometry, z, x, y)
+
+    shifted_points = [to_pixel(px, py) for px, py in geometry.points.tolist()]
+    shifted_easements = [shift_easement(easement, to_pixel) for easement in geometry.easements]
+
+    with stage('rasterize'):
+        options = options or get_render_options()
+        img = new_canvas((TILE_SIZE, TILE_SIZE), options)
+        draw = ImageDraw.Draw(img)
+        draw_site_plan_features(draw, shifted_points, shifted_easements, bounds=(0, 0, TILE_SIZE, TILE_SIZE), options=options)
+    return img
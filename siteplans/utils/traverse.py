@@ -0,0 +1,149 @@
+# siteplans/utils/traverse.py
+
+import logging
+from dataclasses import dataclass
+from typing import Tuple
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Traverse:
+    azimuths: np.ndarray  # (n,) azimuth of every course in degrees, NaN where the bearing is invalid
+    valid: np.ndarray  # (n,) bool mask of the courses that were plotted
+    deltas: np.ndarray  # (m, 2) east/north components of each plotted course
+    points: np.ndarray  # (m + 1, 2) cumulative east/north coordinates, starting at the origin
+    bbox: Tuple[float, float, float, float]  # (min_x, min_y, max_x, max_y) of points
+
+def bearings_to_azimuths(direction1, direction2, angle_deg, angle_min, angle_sec):
+    """
+    Converts arrays of quadrant bearings to azimuth angles.
+
+    Vectorized counterpart of drawing.quadrant_to_azimuth; invalid directions
+    yield NaN instead of raising.
+
+    Parameters:
+    - direction1: Array of 'N'/'S'
+    - direction2: Array of 'E'/'W'
+    - angle_deg, angle_min, angle_sec: Arrays of bearing angle parts
+
+    Returns:
+    - Float array of azimuths in degrees (0-360)
+    """
+    d1 = np.char.upper(np.asarray(direction1, dtype=str))
+    d2 = np.char.upper(np.asarray(direction2, dtype=str))
+    angle = (
+        np.asarray(angle_deg, dtype=float)
+        + np.asarray(angle_min, dtype=float) / 60
+        + np.asarray(angle_sec, dtype=float) / 3600
+    )
+
+    north, south = d1 == 'N', d1 == 'S'
+    east, west = d2 == 'E', d2 == 'W'
+    azimuths = np.select(
+        [north & east, north & west, south & east, south & west],
+        [angle, 360 - angle, 180 - angle, 180 + angle],
+        default=np.nan,
+    )
+    return azimuths % 360
+
+def azimuth_to_bearing(azimuth):
+    """
+    Converts an azimuth to a quadrant bearing rounded to the nearest second.
+
+    Returns:
+    - Tuple (direction1, degrees, minutes, seconds, direction2)
+    """
+    azimuth = float(azimuth) % 360
+    if azimuth <= 90:
+        direction1, direction2, angle = 'N', 'E', azimuth
+    elif azimuth < 180:
+        direction1, direction2, angle = 'S', 'E', 180 - azimuth
+    elif azimuth <= 270:
+        direction1, direction2, angle = 'S', 'W', azimuth - 180
+    else:
+        direction1, direction2, angle = 'N', 'W', 360 - azimuth
+
+    degrees, remainder = divmod(round(angle * 3600), 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return direction1, int(degrees), int(minutes), int(seconds), direction2
+
+def compute_traverse(direction1, direction2, angle_deg, angle_min, angle_sec, length, origin=(0.0, 0.0)):
+    """
+    Computes the coordinates of a traverse in one vectorized pass.
+
+    Coordinates are in the units of `length`, with x pointing east and y
+    pointing north. Courses with an invalid bearing are logged and skipped,
+    so the traverse continues from the previous plotted point.
+
+    Parameters:
+    - direction1, direction2, angle_deg, angle_min, angle_sec: Bearing arrays (see bearings_to_azimuths)
+    - length: Array of course lengths
+    - origin: Starting (x, y) coordinate
+
+    Returns:
+    - Traverse instance
+    """
+    azimuths = bearings_to_azimuths(direction1, direction2, angle_deg, angle_min, angle_sec)
+    length = np.asarray(length, dtype=float)
+
+    valid = ~np.isnan(azimuths)
+    if not valid.all():
+        for idx in np.flatnonzero(~valid):
+            logger.error(f"Invalid bearing for course {idx + 1}: skipping")
+
+    rad = np.radians(azimuths[valid])
+    deltas = np.column_stack((length[valid] * np.sin(rad), length[valid] * np.cos(rad)))
+    points = np.vstack((np.asarray([origin], dtype=float), origin + np.cumsum(deltas, axis=0)))
+
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
+    return Traverse(
+        azimuths=azimuths,
+        valid=valid,
+        deltas=deltas,
+        points=points,
+        bbox=(float(min_x), float(min_y), float(max_x), float(max_y)),
+    )
+
+def traverse_from_boundary_points(boundary_points, origin=(0.0, 0.0)):
+    """
+    Computes the traverse for a sequence of BoundaryPoint instances, in the order given.
+    """
+    boundary_points = list(boundary_points)
+    return compute_traverse(
+        [bp.direction1 for bp in boundary_points],
+        [bp.direction2 for bp in boundary_points],
+        [bp.angle_degrees for bp in boundary_points],
+        [bp.angle_minutes for bp in boundary_points],
+        [bp.angle_seconds for bp in boundary_points],
+        [float(bp.length) for bp in boundary_points],
+        origin=origin,
+    )
+
+def polygon_area(points):
+    """
+    Returns the area enclosed by the points (shoelace formula).
+
+    An open traverse is closed with a straight line from its last point back
+    to its first.
+    """
+    points = np.asarray(points, dtype=float)
+    if len(points) < 3:
+        return 0.0
+    x, y = points[:, 0], points[:, 1]
+    return float(abs(np.dot(x, np.roll(y, -1)) - np.dot(y, np.roll(x, -1))) / 2)
+
+def closure(traverse):
+    """
+    Returns the misclosure of a traverse.
+
+    Returns:
+    - Tuple (perimeter, closure error, precision ratio); the ratio is
+      perimeter / error (the N in 1:N) or None when the traverse closes exactly
+    """
+    perimeter = float(np.hypot(traverse.deltas[:, 0], traverse.deltas[:, 1]).sum())
+    error = float(np.hypot(*(traverse.points[-1] - traverse.points[0])))
+    precision = perimeter / error if error > 1e-9 else None
+    return perimeter, error, precision
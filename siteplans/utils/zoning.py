@@ -1,8 +1,26 @@
 # siteplans/utils/zoning.py
 
+import logging
+import time
 from dataclasses import dataclass
-from typing import Dict
-from venv import logger
+from functools import cached_property
+from typing import Dict, Tuple
+import numpy as np
+from django.conf import settings
+from ..models import ZoningRule as ZoningRuleRecord
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_ZONING_CACHE_TTL = 300  # seconds
+
+# Boundary sides in the column order of CompiledZoning.offsets
+BOUNDARY_SIDES = ('N', 'E', 'S', 'W')
+
+# Setback and easement kinds, in drawing order; renderers index their style tables by kind
+LANDSCAPE_SETBACK, LANDSCAPE_EASEMENT, UTILITY_EASEMENT = range(3)
+EASEMENT_NAMES = ('Landscape Setback', 'Landscape Easement', 'Utility Easement')
+EASEMENT_RULE_FIELDS = ('setback_landscape', 'easement_landscape', 'easement_utility')
 
 @dataclass
 class ZoningRule:
@@ -11,11 +29,44 @@ class ZoningRule:
     easement_landscape: float = 0.0  # in feet
     easement_utility: float = 0.0  # in feet
 
+@dataclass(frozen=True)
+class CompiledZoning:
+    city_name: str
+    offsets: np.ndarray  # (kind, side) distances in feet; sides in BOUNDARY_SIDES order, 0 without a rule
+    kinds: Tuple[int, ...]  # kinds with a distance on some side
+    missing_sides: Tuple[str, ...]  # sides the city has no rule for
+
 @dataclass
 class CityZoning:
     city_name: str
     rules: Dict[str, ZoningRule]  # Keyed by boundary_direction
 
+    @cached_property
+    def compiled(self):
+        """
+        The rules as a CompiledZoning, built on first use.
+        """
+        return compile_zoning(self)
+
+def compile_zoning(city_zoning):
+    """
+    Tabulates a city's rules by easement kind and boundary side.
+
+    Looking distances up per edge is then one fancy-indexing operation,
+    offsets[:, sides], instead of a rule lookup per edge and type.
+    """
+    missing = tuple(side for side in BOUNDARY_SIDES if side not in city_zoning.rules)
+    if missing:
+        logger.warning(f"No zoning rule found for boundary directions: {', '.join(missing)}")
+    offsets = np.zeros((len(EASEMENT_NAMES), len(BOUNDARY_SIDES)))
+    for column, side in enumerate(BOUNDARY_SIDES):
+        rule = city_zoning.rules.get(side)
+        if rule is not None:
+            offsets[:, column] = [getattr(rule, field) for field in EASEMENT_RULE_FIELDS]
+    offsets.flags.writeable = False
+    kinds = tuple(np.flatnonzero((offsets > 0).any(axis=1)).tolist())
+    return CompiledZoning(city_zoning.city_name, offsets, kinds, missing)
+
 # Helper function to create uniform zoning rules for all directions
 def create_uniform_zoning(city_name, setback_landscape, easement_landscape, easement_utility):
     return CityZoning(
@@ -31,6 +82,10 @@ def create_uniform_zoning(city_name, setback_landscape, easement_landscape, ease
         }
     )
 
+# Built-in zoning definitions. The ZoningRule table is authoritative at runtime;
+# these mirror the rows seeded by migration 0004 and can be passed to the
+# renderers directly where no database is involved.
+
 # Define zoning rules for Prosper, Texas
 PROSPER_ZONING = create_uniform_zoning(
     city_name='Prosper',
@@ -74,13 +129,88 @@ ALL_CITY_ZONINGS = {
     'Default': DEFAULT_ZONING,
 }
 
-# Function to get city zoning
-def get_city_zoning(city_name):
+# Process-local cache of zoning loaded from the database:
+# city id -> (expires_at, City.zoning_updated_at when loaded, CityZoning or None)
+_zoning_cache = {}
+
+def _rule_from_record(record):
+    return ZoningRule(
+        boundary_direction=record.boundary_direction.upper(),
+        setback_landscape=record.setback_landscape,
+        easement_landscape=record.easement_landscape,
+        easement_utility=record.easement_utility,
+    )
+
+def load_city_zoning(city):
+    """
+    Loads a city's zoning rules from the database.
+
+    Parameters:
+    - city: City instance
+
+    Returns:
+    - CityZoning instance, or None if the city has no rules
+    """
+    records = ZoningRuleRecord.objects.filter(city_id=city.pk)
+    rules = {record.boundary_direction.upper(): _rule_from_record(record) for record in records}
+    if not rules:
+        return None
+    return CityZoning(city_name=city.name, rules=rules)
+
+def _cache_ttl():
+    return getattr(settings, 'SITEPLANS_ZONING_CACHE_TTL', DEFAULT_ZONING_CACHE_TTL)
+
+def _is_newer(stamp, cached_stamp):
+    return stamp is not None and (cached_stamp is None or stamp > cached_stamp)
+
+def get_city_zoning(city):
     """
-    Retrieve zoning rules for the given city.
-    If the city is not found, return default zoning.
+    Retrieve zoning rules for the given City, querying the database at most
+    once per city per process until the cached entry expires.
+
+    Saving a city or its rules only clears the cache of the process that
+    saved it; every other process sees the change through the city's
+    zoning_updated_at, which is newer than the one its entry was loaded at.
     """
-    zoning = ALL_CITY_ZONINGS.get(city_name.capitalize(), DEFAULT_ZONING)
-    if zoning.city_name == 'Default':
-        logger.warning(f"No zoning rules found for city: {city_name}. Using default zoning.")
+    now = time.monotonic()
+    stamp = getattr(city, 'zoning_updated_at', None)
+    entry = _zoning_cache.get(city.pk)
+    if entry is not None and entry[0] > now and not _is_newer(stamp, entry[1]):
+        return entry[2]
+
+    zoning = load_city_zoning(city)
+    if zoning is None:
+        logger.warning(f"No zoning rules found for city: {city.name}")
+    _zoning_cache[city.pk] = (now + _cache_ttl(), stamp, zoning)
     return zoning
+
+def preload_city_zoning():
+    """
+    Loads and compiles the zoning of every city that has rules, in one query.
+
+    Meant for worker start-up, so the first render for each city finds its
+    zoning cached; entries expire like any other.
+
+    Returns:
+    - Number of cities loaded
+    """
+    cities, rules = {}, {}
+    for record in ZoningRuleRecord.objects.select_related('city'):
+        cities[record.city_id] = record.city
+        rules.setdefault(record.city_id, {})[record.boundary_direction.upper()] = _rule_from_record(record)
+    expires_at = time.monotonic() + _cache_ttl()
+    for city_id, city_rules in rules.items():
+        city_zoning = CityZoning(city_name=cities[city_id].name, rules=city_rules)
+        city_zoning.compiled  # compile now rather than on the first render
+        _zoning_cache[city_id] = (expires_at, cities[city_id].zoning_updated_at, city_zoning)
+    logger.info(f"Preloaded zoning for {len(rules)} cities")
+    return len(rules)
+
+def invalidate_city_zoning(city_id=None):
+    """
+    Drops the cached zoning for one city, or for every city when city_id is None.
+    """
+    if city_id is None:
+        _zoning_cache.clear()
+    else:
+        _zoning_cache.pop(city_id, None)
@@ -0,0 +1,50 @@
+# siteplans/validators.py
+
+import math
+from django.core.exceptions import ValidationError
+
+# Default cap on courses per site plan (see the SITEPLANS_MAX_COURSES setting)
+DEFAULT_MAX_COURSES = 500
+
+def clean_boundary_point(direction1, direction2, angle_degrees, angle_minutes, angle_seconds, length):
+    """
+    Validates one boundary course given as raw (string) values.
+
+    Returns:
+    - Dict of BoundaryPoint field values
+
+    Raises:
+    - ValidationError describing the first problem found
+    """
+    if (direction1 or '').upper() not in ['N', 'S']:
+        raise ValidationError(f"Invalid primary direction: {direction1}")
+    if (direction2 or '').upper() not in ['E', 'W']:
+        raise ValidationError(f"Invalid secondary direction: {direction2}")
+
+    try:
+        # int() of an infinite float raises OverflowError, of nan ValueError
+        angle_deg = int(angle_degrees)
+        angle_min = int(angle_minutes)
+        angle_sec = int(angle_seconds)
+        if not (0 <= angle_deg <= 90 and 0 <= angle_min < 60 and 0 <= angle_sec < 60):
+            raise ValueError("Angles out of valid range.")
+    except (TypeError, ValueError, OverflowError) as e:
+        raise ValidationError(f"Invalid angles: {e}")
+
+    try:
+        length = float(length)
+        if not math.isfinite(length):
+            raise ValueError("Length must be a finite number.")
+        if length <= 0:
+            raise ValueError("Length must be positive.")
+    except (TypeError, ValueError) as e:
+        raise ValidationError(f"Invalid length: {e}")
+
+    return {
+        'direction1': direction1.upper(),
+        'angle_degrees': angle_deg,
+        'angle_minutes': angle_min,
+        'angle_seconds': angle_sec,
+        'direction2': direction2.upper(),
+        'length': length,
+    }
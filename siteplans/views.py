@@ -1,98 +1,564 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from .forms import SitePlanForm
-from .models import SitePlan, BoundaryPoint
-from django.http import HttpResponse
+from .forms import GeometryPreviewForm, SitePlanForm, SitePlanListForm, SpatialQueryForm, SurveyImportForm
+from .models import SitePlan, BoundaryPoint, RenderJob, RENDER_JOB_DONE
+from django.http import HttpResponse, Http404, JsonResponse, StreamingHttpResponse
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
-from .utils.drawing import generate_site_plan_image
-from .utils.zoning import ALL_CITY_ZONINGS
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.urls import reverse
+from django.views.decorators.http import require_POST
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .utils.cache import (
+    RENDER_CACHE_VERSION, cached_site_plan_dxf, cached_site_plan_image, cached_site_plan_tile, invalidate_site_plan_renders,
+    render_cache_key, render_options_digest,
+)
+from .utils.drawing import IMAGE_CONTENT_TYPES, CanvasTooLargeError, canvas_exceeds_limit, site_plan_canvas_size
+from .utils.dxf import DXF_CONTENT_TYPE
+from .utils.geometry_json import GEOMETRY_CONTENT_TYPE, site_plan_geometry_json
+from .utils.importers import detect_format, import_survey
+from .utils.jobs import enqueue_render
+from .utils.listing import (
+    InvalidCursorError, filter_site_plans, get_page_size, list_site_plans, site_plan_list_queryset, site_plan_summary,
+)
+from .utils.offload import RenderBusyError, render_slot, run_in_render_executor
+from .utils.plan_geometry import refresh_plan_geometry
+from .utils.profiling import get_profile_stats, profile_view, stage
+from .utils.spatial import plans_containing_point, plans_intersecting_bbox
+from .utils.svg import SVG_CONTENT_TYPE, render_site_plan_svg, site_plan_svg
+from .utils.tiles import TILE_SIZE, TileOutOfRangeError, get_tile_max_zoom, validate_tile
+from .utils.traverse import traverse_from_boundary_points
+from .utils.zoning import get_city_zoning
+from .validators import DEFAULT_MAX_COURSES, clean_boundary_point
+import itertools
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Preview formats by file extension, in order of preference when a client accepts several equally
+PREVIEW_CONTENT_TYPES = {
+    'SVG': SVG_CONTENT_TYPE,
+    **IMAGE_CONTENT_TYPES,
+}
+
 def siteplan_landing(request):
     return render(request, 'siteplans/landing.html')
 
+def _preview_context(site_plan, boundary_points):
+    """
+    Builds the drawing_preview template context.
+    """
+    # Parcels too large for one canvas are shown through the tile endpoint instead.
+    # Easements lie inside the boundary, so the traverse alone sizes the canvas
+    tiled = False
+    try:
+        traverse = traverse_from_boundary_points(boundary_points)
+        tiled = canvas_exceeds_limit(*site_plan_canvas_size(traverse))
+    except ValueError as e:
+        logger.error(f"Error computing site plan traverse: {e}")
+
+    tile_url = reverse('siteplans:drawing_preview_tile', kwargs={'site_plan_id': site_plan.id, 'z': 0, 'x': 0, 'y': 0})
+
+    # The image itself is served by drawing_preview_image so browsers and CDNs can cache it
+    return {
+        'site_name': site_plan.site_name,
+        'address': site_plan.address,
+        'svg_url': reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.id, 'image_format': 'svg'}),
+        'png_url': reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.id, 'image_format': 'png'}),
+        'webp_url': reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': site_plan.id, 'image_format': 'webp'}),
+        'dxf_url': reverse('siteplans:drawing_preview_dxf', kwargs={'site_plan_id': site_plan.id}),
+        'tiled': tiled,
+        'tile_url_template': tile_url.replace('/tiles/0/0/0.png', '/tiles/{z}/{x}/{y}.png'),
+        'tile_size': TILE_SIZE,
+        'tile_max_zoom': get_tile_max_zoom(),
+    }
+
+@profile_view
 def drawing_preview(request, site_plan_id):
-    site_plan = get_object_or_404(SitePlan, id=site_plan_id)
-    boundary_points = site_plan.boundary_points.all()
+    with stage('db'):
+        site_plan = get_object_or_404(SitePlan.objects.select_related('city'), id=site_plan_id)
+        boundary_points = list(site_plan.boundary_points.order_by('id'))
 
-    if boundary_points.count() < 2:
+    if len(boundary_points) < 2:
         messages.error(request, "Insufficient boundary points to generate a preview.")
         return redirect('siteplans:create_site_plan')
 
-    try:
-        img_str = generate_site_plan_image(site_plan, boundary_points, ALL_CITY_ZONINGS)
-    except Exception as e:
-        logger.error(f"Error generating site plan image: {e}")
-        messages.error(request, f"Error generating site plan image: {e}")
+    context = _preview_context(site_plan, boundary_points)
+    with stage('template'):
+        return render(request, 'frontend/drawing_preview.html', context)
+
+@profile_view
+async def drawing_preview_async(request, site_plan_id):
+    """
+    Async drawing_preview: the ORM is awaited and the geometry is computed in the render pool.
+    """
+    with stage('db'):
+        try:
+            site_plan = await SitePlan.objects.select_related('city').aget(id=site_plan_id)
+        except SitePlan.DoesNotExist:
+            raise Http404("No SitePlan matches the given query.")
+        boundary_points = [bp async for bp in site_plan.boundary_points.order_by('id')]
+
+    if len(boundary_points) < 2:
+        await sync_to_async(messages.error)(request, "Insufficient boundary points to generate a preview.")
         return redirect('siteplans:create_site_plan')
 
+    context = await run_in_render_executor(_preview_context, site_plan, boundary_points)
+    with stage('template'):
+        # Context processors may touch the session, so render off the event loop
+        return await sync_to_async(render)(request, 'frontend/drawing_preview.html', context)
+
+def _render_validators(site_plan, variant):
+    """
+    Returns the (etag, last_modified) pair for a rendering of the site plan.
+
+    Both come from SitePlan.updated_at and the city's zoning_updated_at
+    (loaded with the plan), and the ETag also covers the renderer version
+    and render options. Conditional GETs for an unchanged plan are answered
+    with 304 without rendering.
+    """
+    zoning_updated_at = site_plan.city.zoning_updated_at
+    zoning_stamp = f"{zoning_updated_at.timestamp():.6f}" if zoning_updated_at else '0'
+    changed_at = max(site_plan.updated_at, zoning_updated_at) if zoning_updated_at else site_plan.updated_at
+    last_modified = int(changed_at.timestamp())
+    etag = quote_etag(
+        f"{site_plan.id}-{site_plan.updated_at.timestamp():.6f}-{zoning_stamp}-{variant}"
+        f"-v{RENDER_CACHE_VERSION}-{render_options_digest()}"
+    )
+    return etag, last_modified
+
+def _render_response(content_type, content, filename=None):
+    if isinstance(content, (bytes, str)):
+        response = HttpResponse(content, content_type=content_type)
+    else:
+        response = StreamingHttpResponse(content, content_type=content_type)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _render_error_response(site_plan, variant, error):
+    if isinstance(error, CanvasTooLargeError):
+        # Too large for one canvas: fall back to the zoom 0 overview tile
+        logger.info(f"Site Plan {site_plan.id}: {error}")
+        return redirect('siteplans:drawing_preview_tile', site_plan_id=site_plan.id, z=0, x=0, y=0)
+    logger.error(f"Error generating site plan {variant}: {error}")
+    return HttpResponse(f"Error generating site plan {variant}: {error}", status=500, content_type='text/plain')
+
+def _finish_render_response(response, etag, last_modified):
+    response.headers['ETag'] = etag
+    response.headers['Last-Modified'] = http_date(last_modified)
+    # Let shared caches store the output but revalidate it against the ETag
+    patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+def _serve_site_plan_render(request, site_plan_id, variant, content_type, produce, filename=None):
+    """
+    Serves a rendering of a site plan with conditional GET support.
+
+    Parameters:
+    - variant: Output name folded into the ETag (e.g. 'PNG', 'DXF')
+    - content_type: Response content type
+    - produce: Callable (site_plan, boundary_points) -> bytes
+    - filename: If given, the response is sent as an attachment with this name
+    """
+    with stage('db'):
+        site_plan = get_object_or_404(SitePlan.objects.select_related('city'), id=site_plan_id)
+
+    etag, last_modified = _render_validators(site_plan, variant)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        with stage('db'):
+            boundary_points = list(site_plan.boundary_points.order_by('id'))
+        if len(boundary_points) < 2:
+            raise Http404("Insufficient boundary points to generate a preview.")
+
+        try:
+            content = produce(site_plan, boundary_points)
+        except Exception as e:
+            return _render_error_response(site_plan, variant, e)
+        response = _render_response(content_type, content, filename)
+    return _finish_render_response(response, etag, last_modified)
+
+async def _serve_site_plan_render_async(request, site_plan_id, variant, content_type, produce, filename=None):
+    """
+    Async _serve_site_plan_render: produce runs in the render pool once a render slot is free.
+
+    Responds 503 with Retry-After when every slot stays busy for SITEPLANS_RENDER_QUEUE_TIMEOUT.
+    """
+    with stage('db'):
+        try:
+            site_plan = await SitePlan.objects.select_related('city').aget(id=site_plan_id)
+        except SitePlan.DoesNotExist:
+            raise Http404("No SitePlan matches the given query.")
+
+    etag, last_modified = _render_validators(site_plan, variant)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        with stage('db'):
+            boundary_points = [bp async for bp in site_plan.boundary_points.order_by('id')]
+        if len(boundary_points) < 2:
+            raise Http404("Insufficient boundary points to generate a preview.")
+
+        try:
+            async with render_slot():
+                content = await run_in_render_executor(produce, site_plan, boundary_points)
+        except RenderBusyError as e:
+            logger.warning(f"Site Plan {site_plan.id}: {e}")
+            response = HttpResponse("The renderer is busy; try again shortly.", status=503, content_type='text/plain')
+            response.headers['Retry-After'] = '5'
+            return response
+        except Exception as e:
+            return _render_error_response(site_plan, variant, e)
+        response = _render_response(content_type, content, filename)
+    return _finish_render_response(response, etag, last_modified)
+
+def _accept_quality(request, content_type):
+    # Quality the most specific matching Accept range gives the type, and whether
+    # that range names the type exactly rather than through a wildcard
+    best = (-1, 0.0)
+    for media_type in request.accepted_types:
+        if not media_type.match(content_type):
+            continue
+        specificity = 0 if media_type.is_all_types else 1 if media_type.sub_type == '*' else 2
+        try:
+            quality = float(media_type.params.get('q', 1))
+        except ValueError:
+            quality = 1.0
+        best = max(best, (specificity, quality))
+    return best[0] == 2, best[1]
+
+def negotiate_preview_format(request):
+    """
+    Picks the preview format (a PREVIEW_CONTENT_TYPES key) for the request's Accept header.
+
+    Formats the client names win over those it only accepts through a
+    wildcard, by quality and then PREVIEW_CONTENT_TYPES order. A client
+    that only sends wildcards, such as */*, gets PNG, which every client can
+    display.
+
+    Returns:
+    - Format name, or None if the client accepts none of them
+    """
+    candidates = []
+    for order, image_format in enumerate(PREVIEW_CONTENT_TYPES):
+        exact, quality = _accept_quality(request, PREVIEW_CONTENT_TYPES[image_format])
+        if quality > 0:
+            candidates.append((exact, quality, -order if exact else image_format == 'PNG', image_format))
+    return max(candidates)[-1] if candidates else None
+
+def _preview_image_producer(image_format, streaming=True):
+    if image_format == 'SVG':
+        # Vector output is cheap to produce, so it is streamed rather than cached
+        return render_site_plan_svg if streaming else site_plan_svg
+    return lambda site_plan, boundary_points: cached_site_plan_image(site_plan, boundary_points, image_format=image_format)
+
+def _not_acceptable_response():
+    response = HttpResponse(
+        f"Available formats: {', '.join(PREVIEW_CONTENT_TYPES.values())}", status=406, content_type='text/plain',
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+@profile_view
+def drawing_preview_image(request, site_plan_id, image_format=None):
+    """
+    Serves the rendered site plan as SVG, PNG or WebP.
+
+    The format comes from the URL's extension, or from the Accept header
+    when the URL has none.
+    """
+    negotiated = image_format is None
+    image_format = negotiate_preview_format(request) if negotiated else image_format.upper()
+    if image_format is None:
+        return _not_acceptable_response()
+    response = _serve_site_plan_render(
+        request, site_plan_id, image_format, PREVIEW_CONTENT_TYPES[image_format], _preview_image_producer(image_format),
+    )
+    if negotiated:
+        patch_vary_headers(response, ('Accept',))
+    return response
+
+@profile_view
+async def drawing_preview_image_async(request, site_plan_id, image_format=None):
+    """
+    Async drawing_preview_image for ASGI deployments.
+    """
+    negotiated = image_format is None
+    image_format = negotiate_preview_format(request) if negotiated else image_format.upper()
+    if image_format is None:
+        return _not_acceptable_response()
+    # SVG is built whole in the render pool; streaming it would iterate on the event loop
+    response = await _serve_site_plan_render_async(
+        request, site_plan_id, image_format, PREVIEW_CONTENT_TYPES[image_format],
+        _preview_image_producer(image_format, streaming=False),
+    )
+    if negotiated:
+        patch_vary_headers(response, ('Accept',))
+    return response
+
+@profile_view
+def drawing_preview_dxf(request, site_plan_id):
+    """
+    Serves the site plan as a DXF drawing with boundary, setback and easement layers.
+    """
+    return _serve_site_plan_render(
+        request, site_plan_id, 'DXF', DXF_CONTENT_TYPE, cached_site_plan_dxf,
+        filename=f"siteplan_{site_plan_id}.dxf",
+    )
+
+@profile_view
+def drawing_preview_geometry(request, site_plan_id):
+    """
+    Serves the boundary and easement geometry of a saved site plan as JSON for client-side drawing.
+    """
+    return _serve_site_plan_render(request, site_plan_id, 'GEOMETRY', GEOMETRY_CONTENT_TYPE, site_plan_geometry_json)
+
+@profile_view
+def drawing_board_geometry(request):
+    """
+    Returns the geometry of the courses being typed on the drawing board as JSON.
+
+    Takes the city and the board's D/AD/AM/AS/DO/L course fields as query
+    parameters and saves nothing. The ETag is derived from the courses and
+    the city's zoning, so repeating a request the browser already holds is
+    answered with 304 before any geometry is computed.
+    """
+    form = GeometryPreviewForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    city = form.cleaned_data['city']
+
+    max_courses = getattr(settings, 'SITEPLANS_MAX_COURSES', DEFAULT_MAX_COURSES)
+    try:
+        boundary_points = parse_boundary_points(request.GET, max_courses)
+    except ValidationError as e:
+        return JsonResponse({'errors': {'__all__': e.messages}}, status=400)
+    if len(boundary_points) < 2:
+        return JsonResponse({'errors': {'__all__': ["Enter at least two boundary points."]}}, status=400)
+
+    city_zoning = get_city_zoning(city)
+    etag = quote_etag(render_cache_key(boundary_points, city_zoning, image_format='GEOMETRY').rsplit(':', 1)[-1][:32])
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        try:
+            content = site_plan_geometry_json(SitePlan(city=city), boundary_points)
+        except ValueError as e:
+            return JsonResponse({'errors': {'__all__': [str(e)]}}, status=400)
+        response = HttpResponse(content, content_type=GEOMETRY_CONTENT_TYPE)
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+@profile_view
+def drawing_preview_tile(request, site_plan_id, z, x, y):
+    """
+    Serves one PNG tile of the site plan, rendering only that viewport.
+    """
+    try:
+        validate_tile(z, x, y)
+    except TileOutOfRangeError as e:
+        raise Http404(str(e))
+    return _serve_site_plan_render(
+        request, site_plan_id, f"TILE-{z}-{x}-{y}", IMAGE_CONTENT_TYPES['PNG'],
+        lambda site_plan, boundary_points: cached_site_plan_tile(site_plan, boundary_points, z, x, y),
+    )
+
+def _render_job_payload(job):
+    payload = {
+        'id': job.id,
+        'site_plan_id': job.site_plan_id,
+        'status': job.status,
+        'attempts': job.attempts,
+        'error': job.error,
+        'preview_url': reverse('siteplans:drawing_preview', kwargs={'site_plan_id': job.site_plan_id}),
+    }
+    if job.status == RENDER_JOB_DONE:
+        payload['image_url'] = reverse('siteplans:drawing_preview_image', kwargs={'site_plan_id': job.site_plan_id, 'image_format': 'png'})
+    return payload
+
+def render_job_status(request, job_id):
+    """
+    Shows a page that polls render_job_status_json until the render is ready.
+    """
+    job = get_object_or_404(RenderJob.objects.select_related('site_plan').defer('png', 'webp'), id=job_id)
     context = {
-        'site_name': site_plan.site_name,
-        'address': site_plan.address,
-        'base64_img': img_str,
+        'job': _render_job_payload(job),
+        'site_name': job.site_plan.site_name,
+        'address': job.site_plan.address,
+        'status_url': reverse('siteplans:render_job_status_json', kwargs={'job_id': job.id}),
     }
-    return render(request, 'frontend/drawing_preview.html', context)
+    return render(request, 'frontend/render_status.html', context)
 
-def validate_boundary_point(direction1, direction2, angle_degrees, angle_minutes, angle_seconds, length, index):
-    if direction1.upper() not in ['N', 'S']:
-        logger.error(f"Invalid primary direction: {direction1} at Boundary Point {index}")
-        return False
-    if direction2.upper() not in ['E', 'W']:
-        logger.error(f"Invalid secondary direction: {direction2} at Boundary Point {index}")
-        return False
+def render_job_status_json(request, job_id):
+    """
+    Returns the status of a render job as JSON.
+    """
+    job = get_object_or_404(RenderJob.objects.defer('png', 'webp'), id=job_id)
+    return JsonResponse(_render_job_payload(job))
 
-    try:
-        angle_deg = int(angle_degrees)
-        angle_min = int(angle_minutes)
-        angle_sec = int(angle_seconds)
-        if not (0 <= angle_deg <= 90 and 0 <= angle_min < 60 and 0 <= angle_sec < 60):
-            raise ValueError("Angles out of valid range.")
-    except ValueError as e:
-        logger.error(f"Invalid angles at Boundary Point {index}: {e}")
-        return False
+def site_plan_list(request):
+    """
+    Lists site plans as JSON, one keyset-paginated page at a time.
+
+    Each page costs a single query. Follow `next` until it is null to walk
+    the full inventory; filter with city, address (prefix), updated_after
+    and updated_before, and order by id (default) or updated_at.
+    """
+    form = SitePlanListForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    params = form.cleaned_data
+    ordering = params['ordering'] or 'id'
 
+    queryset = filter_site_plans(
+        site_plan_list_queryset(),
+        city=params['city'],
+        address=params['address'],
+        updated_after=params['updated_after'],
+        updated_before=params['updated_before'],
+    )
     try:
-        length = float(length)
-        if length <= 0:
-            raise ValueError("Length must be positive.")
-    except ValueError as e:
-        logger.error(f"Invalid length at Boundary Point {index}: {e}")
-        return False
+        with stage('db'):
+            page = list_site_plans(queryset, ordering=ordering, cursor=params['cursor'], limit=params['limit'])
+    except InvalidCursorError as e:
+        return JsonResponse({'errors': {'cursor': [str(e)]}}, status=400)
+
+    results = []
+    for site_plan in page.site_plans:
+        summary = site_plan_summary(site_plan)
+        summary['preview_url'] = reverse('siteplans:drawing_preview', args=[site_plan.id])
+        results.append(summary)
 
-    return True
+    next_url = None
+    if page.next_cursor:
+        query = request.GET.copy()
+        query['cursor'] = page.next_cursor
+        next_url = f"{request.path}?{query.urlencode()}"
+    return JsonResponse({'results': results, 'next_cursor': page.next_cursor, 'next': next_url})
+
+def site_plan_spatial_search(request):
+    """
+    Lists the site plans whose parcel contains a point or overlaps a box, as JSON.
+
+    Coordinates are in the survey grid the plans' origins are given in.
+    Matches are exact against the parcel outline, not just its bounding box.
+    """
+    form = SpatialQueryForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    params = form.cleaned_data
+
+    if params['point'] is not None:
+        site_plan_ids = plans_containing_point(*params['point'])
+    else:
+        site_plan_ids = plans_intersecting_bbox(*params['bbox'])
+    limit = get_page_size(params['limit'])
+    site_plans = site_plan_list_queryset().filter(id__in=site_plan_ids[:limit]).order_by('id')
+
+    results = []
+    for site_plan in site_plans:
+        summary = site_plan_summary(site_plan)
+        summary['preview_url'] = reverse('siteplans:drawing_preview', args=[site_plan.id])
+        results.append(summary)
+    return JsonResponse({'count': len(site_plan_ids), 'results': results})
+
+@staff_member_required
+def render_stats(request):
+    """
+    Returns the aggregate render timings of the worker process that serves the request.
+    """
+    return JsonResponse(get_profile_stats())
+
+def parse_boundary_points(data, max_courses):
+    """
+    Parses and validates the D/AD/AM/AS/DO/L course fields posted by the drawing board.
+
+    Parameters:
+    - data: QueryDict (or dict) of submitted fields
+    - max_courses: Maximum number of courses accepted
+
+    Returns:
+    - List of unsaved BoundaryPoint instances for the valid courses, in order
+
+    Raises:
+    - ValidationError if more than max_courses courses were submitted
+    """
+    boundary_points = []
+    for index in itertools.count(1):
+        direction1 = data.get(f'D{index}')
+        if not direction1:
+            break
+        if index > max_courses:
+            raise ValidationError(f"A site plan can have at most {max_courses} boundary points.")
+
+        angle_degrees = data.get(f'AD{index}')
+        angle_minutes = data.get(f'AM{index}')
+        angle_seconds = data.get(f'AS{index}', 0)
+        direction2 = data.get(f'DO{index}')
+        length = data.get(f'L{index}')
+
+        try:
+            values = clean_boundary_point(direction1, direction2, angle_degrees, angle_minutes, angle_seconds, length)
+        except ValidationError as e:
+            logger.error(f"{e.messages[0]} at Boundary Point {index}")
+            continue
+        boundary_points.append(BoundaryPoint(**values))
+    return boundary_points
 
 def create_site_plan(request):
     if request.method == 'POST':
         form = SitePlanForm(request.POST)
         if form.is_valid():
-            site_plan = form.save()
-            index = 1
-            while True:
-                direction1 = request.POST.get(f'D{index}')
-                angle_degrees = request.POST.get(f'AD{index}')
-                angle_minutes = request.POST.get(f'AM{index}')
-                direction2 = request.POST.get(f'DO{index}')
-                length = request.POST.get(f'L{index}')
-
-                if not direction1:
-                    break
-
-                angle_seconds = request.POST.get(f'AS{index}', 0)
-
-                if validate_boundary_point(direction1, direction2, angle_degrees, angle_minutes, angle_seconds, length, index):
-                    BoundaryPoint.objects.create(
-                        site_plan=site_plan,
-                        direction1=direction1.upper(),
-                        angle_degrees=int(angle_degrees),
-                        angle_minutes=int(angle_minutes),
-                        angle_seconds=int(angle_seconds),
-                        direction2=direction2.upper(),
-                        length=float(length)
-                    )
-                index += 1
+            max_courses = getattr(settings, 'SITEPLANS_MAX_COURSES', DEFAULT_MAX_COURSES)
+            try:
+                boundary_points = parse_boundary_points(request.POST, max_courses)
+            except ValidationError as e:
+                form.add_error(None, e)
+                messages.error(request, e.messages[0])
+                return render(request, 'frontend/drawing_board.html', {'form': form})
+
+            # One transaction and one INSERT for all courses instead of an autocommit per point
+            with transaction.atomic():
+                site_plan = form.save()
+                for bp in boundary_points:
+                    bp.site_plan = site_plan
+                BoundaryPoint.objects.bulk_create(boundary_points)
+                # bulk_create skips the signals that keep the stored geometry and cached renders in sync
+                refresh_plan_geometry(site_plan.id, boundary_points)
+                invalidate_site_plan_renders(site_plan.id)
+
+            if getattr(settings, 'SITEPLANS_RENDER_JOBS', False):
+                # Render in the background worker instead of tying up this request
+                job = enqueue_render(site_plan)
+                return redirect('siteplans:render_job_status', job_id=job.id)
             return redirect('siteplans:drawing_preview', site_plan_id=site_plan.id)
     else:
         form = SitePlanForm()
     return render(request, 'frontend/drawing_board.html', {'form': form})
+
+@require_POST
+def import_survey_file(request):
+    """
+    Imports the site plans in an uploaded CSV or LandXML survey file.
+
+    The file is parsed as a stream and written in chunked bulk inserts; invalid
+    rows are reported in the JSON response without aborting the import. Each
+    chunk commits on its own, so when a file-level error stops the import the
+    response has complete=false and names the last parcel saved in
+    committed_through.
+    """
+    form = SurveyImportForm(request.POST, request.FILES)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    upload = form.cleaned_data['file']
+    file_format = form.cleaned_data['file_format'] or detect_format(upload.name)
+    if not file_format:
+        return JsonResponse({'errors': {'file_format': ["Could not detect the file format; choose one."]}}, status=400)
+
+    result = import_survey(upload.file, file_format, default_city=form.cleaned_data['city'])
+    return JsonResponse(result.as_dict())